@@ -1,164 +1,307 @@
-from flask import Flask, request, render_template_string, jsonify
+from flask import Flask, Response, g, request, render_template, jsonify, stream_with_context
 from flask_cors import CORS
 import os
-import json
-import re
 from dotenv import load_dotenv
-from perplexity import Perplexity
-from PIL import Image, ImageChops, ImageStat
-from PIL.ExifTags import TAGS
-import joblib
-import io
+import threading
+import time
+from verdict_cache import VerdictCache
+from similarity_index import SimilarityIndex
+from llm_executor import LLMExecutor
+from heuristics import DEFAULT_PHRASES_PATH, HeuristicEngine, load_phrases, set_engine
+from tiering import TierStats
+from image_cache import ImageCache, content_hash
+from model_registry import ModelRegistry
+from history_store import HistoryStore
+from forensic_signals import SIGNALS
+from forensics import ForensicsPool, PoolSaturated, analyze_image_bytes
+from upload_guard import GuardedRequest, UploadRejected, read_upload
+from rate_limits import ClientQuotas, SingleFlight, TokenBucket
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, NULL_TIMER, Registry, RequestTimer
+from pipeline import VerificationError, VerificationPipeline
+from json_provider import FastJSONProvider
+from datetime import datetime
+from werkzeug.exceptions import RequestEntityTooLarge
 
 # Load environment variables
 load_dotenv()
 api_key = os.getenv('PERPLEXITY_API_KEY')
+# Override the API endpoint, e.g. to point at benchmarks/fake_perplexity.py for load tests
+perplexity_base_url = os.getenv('PERPLEXITY_BASE_URL') or None
+
+# 'full' also serves the HTML form at /; 'api' is the JSON API alone, as wsgi.py and asgi.py deploy it
+server_profile = os.getenv('SERVER_PROFILE', 'full').lower()
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
-
-# Initialize Perplexity Client
-client = None
+app.json = FastJSONProvider(app)
+
+# Uploads are checked as they stream in (magic bytes, then header-declared dimensions) and held in
+# memory up to the size cap; larger request bodies are refused from their Content-Length
+app.request_class = GuardedRequest
+max_upload_mb = int(os.getenv('MAX_UPLOAD_MB', '20'))
+app.config['UPLOAD_MAX_BYTES'] = max_upload_mb * 1024 * 1024
+app.config['UPLOAD_MAX_PIXELS'] = int(os.getenv('MAX_IMAGE_PIXELS', '100000000'))
+# Slack for the multipart framing around the file
+app.config['MAX_CONTENT_LENGTH'] = app.config['UPLOAD_MAX_BYTES'] + 64 * 1024
+
+# Prometheus metrics at /metrics, and an optional Server-Timing header with each request's stage breakdown
+metrics = Registry(enabled=os.getenv('METRICS_ENABLED', '1') != '0')
+server_timing_enabled = os.getenv('SERVER_TIMING', '0') == '1'
+REQUEST_SECONDS = metrics.histogram('ba7ath_request_seconds', 'Request latency by route', ('route', 'status'))
+STAGE_SECONDS = metrics.histogram('ba7ath_stage_seconds', 'Time spent in each stage of a request', ('route', 'stage'))
+REQUESTS_IN_FLIGHT = metrics.gauge('ba7ath_requests_in_flight', 'Requests currently being served', ('route',))
+IMAGE_CACHE_LOOKUPS = metrics.counter('ba7ath_image_cache_lookups_total', 'Image cache lookups by outcome',
+                                      ('result',))
+# Read from the components' own counters at scrape time
+metrics.callback_gauge('ba7ath_llm_in_flight', 'Perplexity calls in flight',
+                       lambda: llm.stats()['in_flight'] if llm is not None else None)
+metrics.callback_gauge('ba7ath_llm_coalesced_in_flight', 'Distinct claims with an LLM call in flight',
+                       lambda: llm_flights.stats()['in_flight'])
+metrics.callback_gauge('ba7ath_forensics_pending', 'Image analyses running or queued in the process pool',
+                       lambda: forensics_pool.stats()['pending'] if forensics_pool is not None else None)
+
+# Pooled async Perplexity executor so workers aren't blocked on one call each
+llm = None
 if api_key:
-    client = Perplexity(api_key=api_key)
+    llm = LLMExecutor(
+        api_key,
+        base_url=perplexity_base_url,
+        max_concurrency=int(os.getenv('LLM_MAX_CONCURRENCY', '64')),
+        timeout=float(os.getenv('LLM_TIMEOUT_SECONDS', '60')),
+        max_retries=int(os.getenv('LLM_MAX_RETRIES', '3'))
+    )
 else:
     print("Warning: PERPLEXITY_API_KEY not found in .env")
 
-# Load local NLP model and vectorizer for classical fake-news classification
-ml_model = None
-ml_vectorizer = None
+# Persistent verdict cache so repeated claims skip the LLM round trip
+verdict_cache = None
+cache_path = os.getenv('VERDICT_CACHE_PATH', os.path.join(os.path.dirname(__file__), 'verdict_cache.sqlite3'))
+if cache_path:
+    try:
+        verdict_cache = VerdictCache(
+            cache_path,
+            max_entries=int(os.getenv('VERDICT_CACHE_MAX_ENTRIES', '50000')),
+            ttl_seconds=int(os.getenv('VERDICT_CACHE_TTL_SECONDS', '86400'))
+        )
+    except Exception as e:
+        print(f"Warning: Failed to open verdict cache: {e}")
+
+# Weighted, multilingual sensational-phrase dictionary for the heuristic risk layer
+heuristic_phrases_path = os.getenv('HEURISTIC_PHRASES_PATH', DEFAULT_PHRASES_PATH)
 try:
-    model_path = os.path.join(os.path.dirname(__file__), 'model.pkl')
-    vectorizer_path = os.path.join(os.path.dirname(__file__), 'vectorizer.pkl')
-    if os.path.exists(model_path) and os.path.exists(vectorizer_path):
-        ml_model = joblib.load(model_path)
-        ml_vectorizer = joblib.load(vectorizer_path)
-        print("Loaded local NLP model and vectorizer for ba7ath.tn.")
+    heuristic_engine = load_phrases(heuristic_phrases_path)
+    print(f"Heuristic scanner: {len(heuristic_engine.phrases)} phrases from {heuristic_phrases_path}.")
+except Exception as e:
+    print(f"Warning: Failed to load heuristic phrases from {heuristic_phrases_path}: {e}")
+    # Fall back to the shipped dictionary, or to structural features only if that is the one that failed
+    heuristic_engine = load_phrases(DEFAULT_PHRASES_PATH) if heuristic_phrases_path != DEFAULT_PHRASES_PATH \
+        else set_engine(HeuristicEngine())
+
+# Forensic result cache for re-uploaded images (exact bytes or perceptual copies)
+image_cache = None
+image_cache_path = os.getenv('IMAGE_CACHE_PATH', os.path.join(os.path.dirname(__file__), 'image_cache.sqlite3'))
+if image_cache_path:
+    try:
+        image_cache = ImageCache(
+            image_cache_path,
+            max_entries=int(os.getenv('IMAGE_CACHE_MAX_ENTRIES', '20000')),
+            max_distance=int(os.getenv('PHASH_MATCH_DISTANCE', '6'))
+        )
+    except Exception as e:
+        print(f"Warning: Failed to open image cache: {e}")
+
+# Append-only history of every verification and image analysis, searchable through /api/history
+history = None
+history_path = os.getenv('HISTORY_PATH', os.path.join(os.path.dirname(__file__), 'history.sqlite3'))
+if history_path:
+    try:
+        history = HistoryStore(history_path, queue_size=int(os.getenv('HISTORY_QUEUE_SIZE', '10000')))
+    except Exception as e:
+        print(f"Warning: Failed to open history store: {e}")
+history_page_max = int(os.getenv('HISTORY_PAGE_MAX', '200'))
+
+# Keys the API adds around an LLM verdict; the verdict cache holds the verdict alone
+LOCAL_ANALYSIS_KEYS = ('ml_model', 'meta_analysis', 'tier', 'coalesced', 'cache', 'rate_limited')
+
+# Refill the caches from history (e.g. a fresh or evicted cache file); entries already cached are kept
+history_warm_limit = int(os.getenv('HISTORY_WARM_LIMIT', '10000'))
+if history is not None and history_warm_limit > 0:
+    try:
+        warm_started = time.perf_counter()
+        warmed_verdicts = warmed_images = 0
+        if verdict_cache is not None:
+            since = time.time() - verdict_cache.ttl_seconds if verdict_cache.ttl_seconds else 0
+            entries = history.recent_claims(since, min(history_warm_limit, verdict_cache.max_entries))
+            warmed_verdicts = verdict_cache.warm(
+                (claim, {k: v for k, v in result.items() if k not in LOCAL_ANALYSIS_KEYS}, created_at)
+                for claim, result, created_at in entries
+            )
+        if image_cache is not None:
+            room = min(history_warm_limit, image_cache.max_entries - image_cache.stats()['size'])
+            for sha256, phash, result, first_seen in history.recent_images(0, room) if room > 0 else []:
+                result.pop('seen_before', None)
+                image_cache.put(sha256, phash, result, first_seen=first_seen)
+                warmed_images += 1
+        if warmed_verdicts or warmed_images:
+            print(f"Warmed caches from history with {warmed_verdicts} verdicts and {warmed_images} image results "
+                  f"in {time.perf_counter() - warm_started:.2f}s.")
+    except Exception as e:
+        print(f"Warning: Failed to warm caches from history: {e}")
+
+# ELA analysis resolution and memory cap for large uploads
+ela_max_pixels = int(os.getenv('ELA_MAX_PIXELS', '4000000'))
+ela_max_memory_bytes = int(os.getenv('ELA_MAX_MEMORY_MB', '256')) * 1024 * 1024
+ela_tile_size = int(os.getenv('ELA_TILE_SIZE', '256'))
+# Forensic signals to run on uploads (comma-separated names; default: all registered ones)
+forensic_signals = None
+if os.getenv('FORENSIC_SIGNALS'):
+    forensic_signals = [name.strip() for name in os.getenv('FORENSIC_SIGNALS').split(',') if name.strip()]
+    unknown = [name for name in forensic_signals if name not in SIGNALS]
+    if unknown:
+        print(f"Warning: Ignoring unknown forensic signals: {', '.join(unknown)}")
+        forensic_signals = [name for name in forensic_signals if name in SIGNALS]
+ela_options = {
+    'ela_max_pixels': ela_max_pixels,
+    'ela_max_memory_bytes': ela_max_memory_bytes,
+    'ela_tile_size': ela_tile_size,
+    'forensic_signals': forensic_signals
+}
+
+# Image forensics run in a bounded process pool so they don't hold the GIL in request threads
+forensics_pool = None
+forensics_workers = int(os.getenv('FORENSICS_WORKERS', str(os.cpu_count() or 1)))
+if forensics_workers > 0:
+    try:
+        max_queue = os.getenv('FORENSICS_MAX_QUEUE')
+        forensics_pool = ForensicsPool(
+            workers=forensics_workers,
+            max_queue=int(max_queue) if max_queue else None,
+            timeout=float(os.getenv('FORENSICS_TIMEOUT_SECONDS', '30')),
+            start_method=os.getenv('FORENSICS_START_METHOD') or None,
+            **ela_options
+        )
+    except Exception as e:
+        print(f"Warning: Failed to start forensics pool, analyzing images inline: {e}")
+
+# Near-duplicate index over the TF-IDF space so paraphrased claims reuse cached verdicts (opt-in: a paraphrase
+# match reuses another claim's verdict, so it is off unless NEAR_MATCH_THRESHOLD is set, e.g. to 0.85)
+near_match_threshold = float(os.getenv('NEAR_MATCH_THRESHOLD', '0'))
+
+def _attach_similarity_index(version):
+    """Give a newly active model version its own index (it lives in that vectorizer's feature space)."""
+    if verdict_cache is None or near_match_threshold <= 0:
+        return
+    index = SimilarityIndex(threshold=near_match_threshold)
+    version.similarity_index = index
+
+    def _warm_similarity_index():
+        try:
+            for batch in verdict_cache.iter_claims():
+                keys = [key for key, _ in batch]
+                index.add(keys, version.vectorizer.transform([claim for _, claim in batch]))
+            print(f"Similarity index for model {version.version} warmed with {len(index)} cached claims.")
+        except Exception as e:
+            print(f"Warning: Failed to warm similarity index: {e}")
+
+    threading.Thread(target=_warm_similarity_index, daemon=True).start()
+
+# Local NLP models for classical fake-news classification, hot-reloaded from a versioned registry.
+# With no published versions, the model.pkl/vectorizer.pkl (or compact export) next to app.py is served.
+model_registry = None
+model_registry_dir = os.getenv('MODEL_REGISTRY_DIR', os.path.join(os.path.dirname(__file__), 'models'))
+try:
+    model_registry = ModelRegistry(
+        model_registry_dir,
+        fallback_dir=os.path.dirname(os.path.abspath(__file__)),
+        fallback_compact_dir=os.getenv('COMPACT_MODEL_DIR', os.path.join(os.path.dirname(__file__), 'model_compact')),
+        poll_seconds=float(os.getenv('MODEL_REGISTRY_POLL_SECONDS', '5')),
+        ab_log_path=os.getenv('MODEL_AB_LOG_PATH', os.path.join(model_registry_dir, 'ab_scores.jsonl')) or None,
+        on_activate=_attach_similarity_index
+    )
+    if model_registry.snapshot is not None:
+        print(f"Loaded local NLP model {model_registry.snapshot.active.version} "
+              f"({model_registry.snapshot.active.format}) for ba7ath.tn.")
     else:
         print("Warning: model.pkl or vectorizer.pkl not found; local NLP model disabled.")
+    model_registry.start()
 except Exception as e:
     print(f"Warning: Failed to load local NLP model: {e}")
 
-# HTML Template with Loading Animation
-HTML_TEMPLATE = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>ba7ath.tn AI Detector</title>
-    <style>
-        body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; max-width: 900px; margin: 0 auto; padding: 40px 20px; background-color: #050505; color: #f9fafb; }
-        .container { background: #111827; padding: 40px; border-radius: 12px; box-shadow: 0 4px 20px rgba(0,0,0,0.8); border: 1px solid #1f2937; }
-        h1 { color: #f9fafb; text-align: center; margin-bottom: 30px; font-weight: 300; letter-spacing: 2px; }
-        h1 span { color: #A22829; font-weight: 600; }
-        textarea { width: 100%; height: 120px; padding: 15px; margin: 10px 0; border: 2px solid #374151; border-radius: 8px; font-size: 16px; background-color: #020617; color: #f9fafb; resize: vertical; box-sizing: border-box; }
-        textarea:focus { outline: none; border-color: #A22829; box-shadow: 0 0 0 1px #A22829; }
-        button { background-color: #A22829; color: #0b0b0b; padding: 15px 20px; border: none; border-radius: 8px; cursor: pointer; font-size: 18px; width: 100%; transition: background 0.3s, transform 0.15s; font-weight: 600; }
-        button:hover { background-color: #9C2A2B; transform: translateY(-1px); }
-        
-        .result-box { margin-top: 30px; animation: fadeIn 0.5s; }
-        .verdict-badge { display: inline-block; padding: 8px 16px; border-radius: 999px; font-weight: bold; text-transform: uppercase; font-size: 1.2em; margin-bottom: 15px; letter-spacing: 1px; }
-        .verdict-TRUE { background-color: #15803d; color: #ecfdf3; box-shadow: 0 0 18px rgba(34, 197, 94, 0.5); }
-        .verdict-FALSE { background-color: #b91c1c; color: #fee2e2; box-shadow: 0 0 18px rgba(248, 113, 113, 0.5); }
-        .verdict-MIXED { background-color: #f97316; color: #111827; box-shadow: 0 0 18px rgba(248, 171, 80, 0.6); }
-        .verdict-UNVERIFIABLE { background-color: #4b5563; color: #e5e7eb; }
-        
-        .card { background: #020617; border-radius: 8px; padding: 20px; margin-bottom: 20px; border-left: 4px solid #A22829; }
-        .card h3 { margin-top: 0; color: #C05E5A; font-size: 1.1em; text-transform: uppercase; letter-spacing: 1px; }
-        .card p { line-height: 1.6; color: #d1d5db; margin-bottom: 0; }
-        
-        .meta-grid { display: grid; grid-template-columns: 1fr 1fr; gap: 15px; margin-bottom: 20px; }
-        .meta-item { background: #020617; padding: 10px 15px; border-radius: 6px; border: 1px solid #1f2937; }
-        .meta-label { font-size: 0.8em; color: #9ca3af; text-transform: uppercase; display: block; margin-bottom: 5px; }
-        .meta-value { font-weight: bold; color: #f9fafb; }
-        
-        .sources-list { list-style: none; padding: 0; margin: 0; }
-        .sources-list li { margin-bottom: 8px; padding-left: 20px; position: relative; color: #e5e7eb; }
-        .sources-list li:before { content: "•"; color: #A22829; position: absolute; left: 0; }
-        
-        /* Loading Animation */
-        .loader-container { display: none; text-align: center; margin-top: 40px; }
-        .loader { display: inline-block; width: 50px; height: 50px; border: 3px solid rgba(249,250,251,.1); border-radius: 50%; border-top-color: #A22829; animation: spin 1s ease-in-out infinite; }
-        .loading-text { margin-top: 15px; color: #9ca3af; font-size: 0.9em; letter-spacing: 1px; }
-        @keyframes spin { to { transform: rotate(360deg); } }
-        @keyframes fadeIn { from { opacity: 0; transform: translateY(10px); } to { opacity: 1; transform: translateY(0); } }
-    </style>
-    <script>
-        function showLoader() {
-            document.getElementById('loader-container').style.display = 'block';
-            var resultBox = document.getElementById('result-box');
-            if (resultBox) {
-                resultBox.style.display = 'none';
-            }
-        }
-    </script>
-</head>
-<body>
-    <div class="container">
-        <h1>ba7ath.tn <span>AI</span></h1>
-        <p style="text-align: center; color: #888; margin-bottom: 30px;">Universal Fact-Checking Assistant</p>
-        
-        <form method="post" onsubmit="showLoader()">
-            <textarea name="text" placeholder="Enter a claim to verify (e.g., historical events, scientific facts, news)..." required>{{ text }}</textarea>
-            <button type="submit">Verify Claim</button>
-        </form>
-
-        <div id="loader-container" class="loader-container">
-            <div class="loader"></div>
-            <p class="loading-text">SEARCHING HISTORICAL ARCHIVES & DATABASES...</p>
-        </div>
-
-        {% if result %}
-            <div id="result-box" class="result-box">
-                <div style="text-align: center; margin-bottom: 30px;">
-                    <span class="verdict-badge verdict-{{ result.verdict }}">{{ result.verdict }}</span>
-                    <div style="color: #888; margin-top: 10px;">Confidence Score: <span style="color: #fff;">{{ result.confidence }}</span></div>
-                </div>
-
-                <div class="meta-grid">
-                    <div class="meta-item">
-                        <span class="meta-label">First Verified</span>
-                        <span class="meta-value">{{ result.first_verified }}</span>
-                    </div>
-                    <div class="meta-item">
-                        <span class="meta-label">Last Updated</span>
-                        <span class="meta-value">{{ result.last_updated }}</span>
-                    </div>
-                </div>
-
-                <div class="card">
-                    <h3>Explanation</h3>
-                    <p>{{ result.explanation }}</p>
-                </div>
-
-                <div class="card">
-                    <h3>Historical Context</h3>
-                    <p>{{ result.historical_context }}</p>
-                </div>
-
-                <div class="card" style="border-left-color: #4b5563;">
-                    <h3>Sources</h3>
-                    <ul class="sources-list">
-                        {% for source in result.sources %}
-                            <li>{{ source }}</li>
-                        {% endfor %}
-                    </ul>
-                </div>
-            </div>
-        {% endif %}
-        
-        {% if error %}
-            <div class="result-box" style="color: #dc3545; text-align: center; padding: 20px;">
-                {{ error }}
-            </div>
-        {% endif %}
-    </div>
-</body>
-</html>
-"""
-
-@app.route('/', methods=['GET', 'POST'])
+# Verification mode: 'full' always consults the LLM, 'tiered' lets confident local verdicts answer alone
+verify_mode = os.getenv('VERIFY_MODE', 'full').lower()
+local_confidence_threshold = float(os.getenv('LOCAL_CONFIDENCE_THRESHOLD', '90'))
+tier_stats = TierStats()
+
+# Batch verification limits
+batch_max_claims = int(os.getenv('BATCH_MAX_CLAIMS', '1000'))
+
+# LLM admission control: identical in-flight claims share one call, and upstream calls are rate limited
+# globally and per client; requests over a limit get the local model's verdict instead of an error
+llm_flights = SingleFlight()
+llm_rate_per_minute = float(os.getenv('LLM_RATE_PER_MINUTE', '300'))
+llm_bucket = TokenBucket(llm_rate_per_minute / 60.0, float(os.getenv('LLM_RATE_BURST', '60'))) \
+    if llm_rate_per_minute > 0 else None
+client_rate_per_minute = float(os.getenv('CLIENT_RATE_PER_MINUTE', '60'))
+client_rate_burst = float(os.getenv('CLIENT_RATE_BURST', '20'))
+client_keys_path = os.getenv('CLIENT_KEYS_PATH')
+client_quotas = ClientQuotas(client_rate_per_minute, client_rate_burst)
+if client_keys_path:
+    try:
+        client_quotas = ClientQuotas.load(client_keys_path, client_rate_per_minute, client_rate_burst)
+    except Exception as e:
+        print(f"Warning: Failed to load client API keys from {client_keys_path}: {e}")
+
+# Everything between a claim's text and its verdict; the routes below only translate HTTP to and from it
+pipeline = VerificationPipeline(
+    metrics,
+    model_registry=model_registry,
+    verdict_cache=verdict_cache,
+    llm=llm,
+    tier_stats=tier_stats,
+    llm_flights=llm_flights,
+    llm_bucket=llm_bucket,
+    client_quotas=client_quotas,
+    verify_mode=verify_mode,
+    local_confidence_threshold=local_confidence_threshold
+)
+
+@app.before_request
+def start_request_timer():
+    if metrics.enabled or server_timing_enabled:
+        g.timer = RequestTimer(STAGE_SECONDS, request.endpoint or 'unmatched')
+        REQUESTS_IN_FLIGHT.inc(route=g.timer.route)
+
+@app.after_request
+def add_server_timing(response):
+    timer = g.get('timer')
+    if timer is not None:
+        timer.status = response.status_code
+        # Streamed bodies are produced after the headers are sent; their header only covers the setup
+        timer.streaming = response.is_streamed
+        if server_timing_enabled:
+            response.headers['Server-Timing'] = timer.server_timing()
+            # Lets the frontend's origin see the breakdown in devtools and the Resource Timing API
+            response.headers['Timing-Allow-Origin'] = '*'
+    return response
+
+@app.teardown_request
+def finish_request_timer(error=None):
+    timer = g.get('timer')
+    if timer is None:
+        return
+    if getattr(timer, 'streaming', False):
+        # Teardown also runs before a stream_with_context body; the timer stays until the stream ends
+        timer.streaming = False
+        return
+    g.pop('timer', None)
+    REQUESTS_IN_FLIGHT.dec(route=timer.route)
+    REQUEST_SECONDS.observe(time.perf_counter() - timer.started, route=timer.route,
+                            status=getattr(timer, 'status', 500))
+
+def request_timer():
+    """The current request's stage timer; a shared no-op when metrics and Server-Timing are off."""
+    return g.get('timer', NULL_TIMER)
+
 def index():
     result = None
     error = None
@@ -166,50 +309,44 @@ def index():
 
     if request.method == 'POST':
         text = request.form['text']
-        if client:
-            try:
-                prompt = (
-                    "Act as a universal fact-checking assistant with access to historical records dating back to the 1800s and 1900s. "
-                    "For the following statement, provide a verdict (TRUE, FALSE, MIXED, UNVERIFIABLE), confidence score (0-100%), "
-                    "and a concise but thorough explanation including relevant historical evidence, scientific findings, and authoritative references. "
-                    "Crucially, investigate historical context to see if this claim has roots in the 19th or 20th centuries. "
-                    "List sources and indicate the first time the claim was verified or disproven in history, plus the last update.\n\n"
-                    f"Statement: '{text}'\n\n"
-                    "Respond ONLY in valid JSON format with the following keys: "
-                    "'verdict' (enum: TRUE, FALSE, MIXED, UNVERIFIABLE), "
-                    "'confidence' (string, e.g. '95%'), "
-                    "'explanation' (string), "
-                    "'historical_context' (string), "
-                    "'first_verified' (string, date or era), "
-                    "'last_updated' (string, date or era), "
-                    "'sources' (list of strings)."
-                )
-                
-                response = client.chat.completions.create(
-                    model="sonar-pro",
-                    messages=[
-                        {"role": "system", "content": "You are a rigorous fact-checking AI that outputs only valid JSON."},
-                        {"role": "user", "content": prompt}
-                    ]
-                )
-                
-                content = response.choices[0].message.content
-                # Clean up code blocks if present
-                if "```json" in content:
-                    content = content.split("```json")[1].split("```")[0]
-                elif "```" in content:
-                    content = content.split("```")[1].split("```")[0]
-                
-                result = json.loads(content.strip())
-                
-            except json.JSONDecodeError:
-                error = "Error: Failed to parse AI response. Please try again."
-            except Exception as e:
-                error = f"Error calling AI API: {str(e)}"
-        else:
-            error = "Error: Perplexity API Key not configured."
-
-    return render_template_string(HTML_TEMPLATE, result=result, error=error, text=text)
+        try:
+            result = record_claim(text, pipeline.verify(text, request_client(), request_timer(), route='index'))
+        except VerificationError as e:
+            error = e.message
+
+    return render_template('index.html', result=result, error=error, text=text)
+
+# The HTML form (and Jinja with it) stays out of the API-only profile
+if server_profile != 'api':
+    app.add_url_rule('/', 'index', index, methods=['GET', 'POST'])
+
+def request_client():
+    """(API key, remote address) identifying the caller for per-client quotas."""
+    return request.headers.get('X-API-Key'), request.remote_addr
+
+def record_claim(text, result):
+    """Append a verification result to the history; returns ``result`` so responses can wrap it."""
+    if history is not None:
+        history.append_claim(text, result, client=client_quotas.client_id(*request_client()))
+    return result
+
+def record_image(result):
+    if history is not None:
+        image_hash = result.get('image_hash') or {}
+        phash = image_hash.get('phash')
+        history.append_image(image_hash.get('sha256'), int(phash, 16) if phash else None, result,
+                             client=client_quotas.client_id(*request_client()))
+    return result
+
+def verification_error_response(error):
+    response = jsonify(error.to_dict())
+    response.status_code = error.status
+    if error.rate_limited is not None:
+        response.headers['Retry-After'] = str(max(1, int(error.rate_limited['retry_after_seconds'] + 0.999)))
+    return response
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {app.json.dumps(data)}\n\n"
 
 @app.route('/api/verify', methods=['POST'])
 def verify_claim():
@@ -218,281 +355,255 @@ def verify_claim():
         return jsonify({'error': 'No text provided'}), 400
     
     text = data['text']
-
-    # Run local NLP model if available
-    ml_result = None
     try:
-        if ml_model is not None and ml_vectorizer is not None:
-            X = ml_vectorizer.transform([text])
-            if hasattr(ml_model, 'predict_proba'):
-                proba = ml_model.predict_proba(X)[0]
-                fake_prob = float(proba[0])
-                real_prob = float(proba[1]) if len(proba) > 1 else 1.0 - fake_prob
-                if real_prob >= fake_prob:
-                    ml_label = 'Real'
-                    ml_conf = real_prob
-                else:
-                    ml_label = 'Fake'
-                    ml_conf = fake_prob
-                ml_result = {
-                    'label': ml_label,
-                    'confidence': round(ml_conf * 100, 1),
-                    'raw_probs': {
-                        'real': round(real_prob, 4),
-                        'fake': round(fake_prob, 4)
-                    }
-                }
-            else:
-                pred = ml_model.predict(X)[0]
-                ml_label = 'Real' if int(pred) == 1 else 'Fake'
-                ml_result = {
-                    'label': ml_label,
-                    'confidence': 0
-                }
-    except Exception as e:
-        print(f"Warning: local NLP model prediction failed: {e}")
-
-    if not client:
-        # If LLM is not available, fall back to local model only
-        if ml_result is None:
-            return jsonify({'error': 'Perplexity API Key not configured and no local model available'}), 500
-        return jsonify({
-            'verdict': 'UNVERIFIABLE',
-            'confidence': f"{ml_result['confidence']}%",
-            'explanation': 'LLM fact-checking is unavailable. Showing local classifier output only.',
-            'historical_context': '',
-            'first_verified': '',
-            'last_updated': '',
-            'sources': [],
-            'ml_model': ml_result
-        })
+        result = pipeline.verify(text, request_client(), request_timer())
+    except VerificationError as e:
+        return verification_error_response(e)
+    return jsonify(record_claim(text, result))
 
+@app.route('/api/verify/stream', methods=['POST'])
+def verify_claim_stream():
+    data = request.get_json()
+    if not data or 'text' not in data:
+        return jsonify({'error': 'No text provided'}), 400
+
+    text = data['text']
+    client_key = request_client()
+
+    def generate():
+        for event, payload in pipeline.stream(text, client_key, request_timer()):
+            if event == 'result':
+                record_claim(text, payload)
+            yield sse_event(event, payload)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/verify/batch', methods=['POST'])
+def verify_batch():
+    data = request.get_json(silent=True)
+    claims = data.get('claims') if isinstance(data, dict) else None
+    if not isinstance(claims, list) or not claims:
+        return jsonify({'error': 'No claims provided'}), 400
+    if len(claims) > batch_max_claims:
+        return jsonify({'error': f'Too many claims in one batch (max {batch_max_claims})'}), 413
+
+    results = [None] * len(claims)
+    valid = []
+    for i, claim in enumerate(claims):
+        if isinstance(claim, str) and claim.strip():
+            valid.append(i)
+        else:
+            results[i] = {'error': 'Claim must be a non-empty string'}
+    texts = [claims[i] for i in valid]
+
+    # One vectorize/predict_proba call for the whole batch
+    for pos, result in enumerate(pipeline.verify_batch(texts, request_client(), request_timer())):
+        if 'error' not in result:
+            record_claim(texts[pos], result)
+        results[valid[pos]] = result
+
+    return jsonify({'results': results})
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    if not metrics.enabled:
+        return jsonify({'enabled': False}), 404
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    if verdict_cache is None:
+        return jsonify({'enabled': False})
+    stats = verdict_cache.stats()
+    stats['enabled'] = True
+    models = pipeline.current_models()
+    similarity_index = models.active.similarity_index if models is not None else None
+    stats['near_match'] = similarity_index.stats() if similarity_index is not None else None
+    return jsonify(stats)
+
+@app.route('/api/tiers/stats', methods=['GET'])
+def tiers_stats():
+    report = tier_stats.report()
+    report['mode'] = verify_mode
+    report['local_confidence_threshold'] = local_confidence_threshold
+    return jsonify(report)
+
+@app.route('/api/image-cache/stats', methods=['GET'])
+def image_cache_stats():
+    if image_cache is None:
+        return jsonify({'enabled': False})
+    stats = image_cache.stats()
+    stats['enabled'] = True
+    return jsonify(stats)
+
+@app.route('/api/models/stats', methods=['GET'])
+def models_stats():
+    if model_registry is None:
+        return jsonify({'enabled': False})
+    stats = model_registry.stats()
+    stats['enabled'] = True
+    return jsonify(stats)
+
+@app.route('/api/forensics/stats', methods=['GET'])
+def forensics_stats():
+    if forensics_pool is None:
+        return jsonify({'enabled': False})
+    stats = forensics_pool.stats()
+    stats['enabled'] = True
+    return jsonify(stats)
+
+@app.route('/api/limits/stats', methods=['GET'])
+def limits_stats():
+    return jsonify({
+        'coalescing': llm_flights.stats(),
+        'global': llm_bucket.stats() if llm_bucket is not None else None,
+        'clients': client_quotas.stats()
+    })
+
+@app.route('/api/llm/stats', methods=['GET'])
+def llm_stats():
+    if llm is None:
+        return jsonify({'enabled': False})
+    stats = llm.stats()
+    stats['enabled'] = True
+    return jsonify(stats)
+
+def parse_time(value):
+    """Unix seconds or an ISO 8601 date/time."""
     try:
-        prompt = (
-            "Act as a universal fact-checking assistant with access to historical records dating back to the 1800s and 1900s. "
-            "For the following statement, provide a verdict (TRUE, FALSE, MIXED, UNVERIFIABLE), confidence score (0-100%), "
-            "and a concise but thorough explanation including relevant historical evidence, scientific findings, and authoritative references. "
-            "Crucially, investigate historical context to see if this claim has roots in the 19th or 20th centuries. "
-            "List sources and indicate the first time the claim was verified or disproven in history, plus the last update.\n\n"
-            f"Statement: '{text}'\n\n"
-            "Respond ONLY in valid JSON format with the following keys: "
-            "'verdict' (enum: TRUE, FALSE, MIXED, UNVERIFIABLE), "
-            "'confidence' (string, e.g. '95%'), "
-            "'explanation' (string), "
-            "'historical_context' (string), "
-            "'first_verified' (string, date or era), "
-            "'last_updated' (string, date or era), "
-            "'sources' (list of strings)."
-        )
-        
-        response = client.chat.completions.create(
-            model="sonar-pro",
-            messages=[
-                {"role": "system", "content": "You are a rigorous fact-checking AI that outputs only valid JSON."},
-                {"role": "user", "content": prompt}
-            ]
-        )
-        
-        content = response.choices[0].message.content
-        # Clean up code blocks if present
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0]
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0]
-        
-        result = json.loads(content.strip())
-
-        # Attach local NLP model output if available so frontend can show dual-engine verdicts
-        if ml_result is not None:
-            result['ml_model'] = ml_result
-
-        # --- Heuristic + combined scoring layer ---
-        # Parse LLM confidence (string like "95%") into a float 0-100
-        llm_conf = 0.0
-        try:
-            if isinstance(result.get('confidence'), str):
-                llm_conf = float(result['confidence'].replace('%', '').strip())
-        except Exception:
-            llm_conf = 0.0
-
-        # Basic text heuristics for extra signal
-        text_len = len(text or "")
-        words = text.split()
-        num_words = len(words)
-        num_exclam = text.count('!')
-        has_all_caps_word = any(len(w) > 4 and w.isupper() for w in words)
-        url_matches = re.findall(r"https?://\S+", text)
-        num_urls = len(url_matches)
-        sensational_phrases = [
-            "you won't believe",
-            "shocking truth",
-            "what they don't want you to know",
-            "breaking news"
-        ]
-        has_sensational_phrase = any(p.lower() in text.lower() for p in sensational_phrases)
-
-        heuristic_risk = 0
-        if num_exclam >= 3:
-            heuristic_risk += 10
-        if has_all_caps_word:
-            heuristic_risk += 10
-        if num_urls >= 2:
-            heuristic_risk += 10
-        if has_sensational_phrase:
-            heuristic_risk += 15
-        if num_words < 8 or num_words > 200:
-            heuristic_risk += 5
-        heuristic_risk = min(40, heuristic_risk)
-
-        # Combined risk score from LLM + local model (+ heuristics)
-        combined_score = llm_conf
-        engines_agree = None
-        ml_conf = ml_result['confidence'] if ml_result and 'confidence' in ml_result else None
-        if ml_result and ml_conf is not None:
-            # If engines agree, average them closer to their agreement; if they disagree, penalize confidence
-            engines_agree = (ml_result.get('label') == ('Real' if result.get('verdict') == 'TRUE' else 'Fake'))
-            if engines_agree:
-                combined_score = (llm_conf * 0.6) + (ml_conf * 0.4)
-            else:
-                combined_score = max(0, (llm_conf * 0.5) + (ml_conf * 0.5) - 15)
-
-        combined_score = max(0, min(100, combined_score + heuristic_risk * 0.5))
-
-        result['meta_analysis'] = {
-            'combined_confidence_score': round(combined_score, 1),
-            'engines_agree': engines_agree,
-            'heuristics': {
-                'length_chars': text_len,
-                'length_words': num_words,
-                'num_exclamation_marks': num_exclam,
-                'num_urls': num_urls,
-                'has_all_caps_word': has_all_caps_word,
-                'has_sensational_phrase': has_sensational_phrase,
-                'heuristic_risk_bonus': heuristic_risk
-            }
-        }
-
-        return jsonify(result)
-        
-    except json.JSONDecodeError:
-        return jsonify({'error': 'Failed to parse AI response'}), 500
-    except Exception as e:
-        return jsonify({'error': f'Error calling AI API: {str(e)}'}), 500
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+@app.route('/api/history', methods=['GET'])
+def history_search():
+    if history is None:
+        return jsonify({'enabled': False}), 404
+    args = request.args
+    try:
+        limit = min(max(1, int(args.get('limit', 50))), history_page_max)
+        cursor = int(args['cursor']) if args.get('cursor') else None
+        since = parse_time(args['since']) if args.get('since') else None
+        until = parse_time(args['until']) if args.get('until') else None
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query parameter: {e}'}), 400
+    kind = args.get('kind') or None
+    if kind not in (None, 'claim', 'image'):
+        return jsonify({'error': "kind must be 'claim' or 'image'"}), 400
+    items, next_cursor = history.query(
+        text=args.get('q') or None,
+        kind=kind,
+        verdict=args.get('verdict') or None,
+        tier=args.get('tier') or None,
+        since=since,
+        until=until,
+        cursor=cursor,
+        limit=limit,
+        full=args.get('full', '0').lower() in ('1', 'true', 'yes')
+    )
+    return jsonify({'items': items, 'next_cursor': next_cursor})
+
+@app.route('/api/history/<int:record_id>', methods=['GET'])
+def history_record(record_id):
+    if history is None:
+        return jsonify({'enabled': False}), 404
+    record = history.get(record_id)
+    if record is None:
+        return jsonify({'error': 'No such history record'}), 404
+    return jsonify(record)
+
+@app.route('/api/history/stats', methods=['GET'])
+def history_stats():
+    if history is None:
+        return jsonify({'enabled': False})
+    stats = history.stats()
+    stats['enabled'] = True
+    return jsonify(stats)
+
+@app.errorhandler(UploadRejected)
+def upload_rejected(e):
+    return jsonify({'error': str(e)}), e.status
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    return jsonify({'error': f'Request is larger than the {max_upload_mb} MB upload limit'}), 413
 
 @app.route('/api/analyze-image', methods=['POST'])
 def analyze_image():
-    if 'image' not in request.files:
-        return jsonify({'error': 'No image file provided'}), 400
-    
-    file = request.files['image']
-    if file.filename == '':
-        return jsonify({'error': 'No selected file'}), 400
+    timer = request_timer()
+    # Parsing the form streams the upload through its checks; a rejected upload raises UploadRejected
+    with timer.stage('read'):
+        file = request.files.get('image')
+        if file is None:
+            return jsonify({'error': 'No image file provided'}), 400
+        if file.filename == '':
+            return jsonify({'error': 'No selected file'}), 400
+        data = read_upload(file)
 
     try:
-        image = Image.open(file)
-        exif_data = {}
-
-        # Extract EXIF data
-        if hasattr(image, '_getexif'):
-            exif = image._getexif()
-            if exif:
-                for tag_id, value in exif.items():
-                    tag = TAGS.get(tag_id, tag_id)
-                    # Decode bytes to string if necessary
-                    if isinstance(value, bytes):
-                        try:
-                            value = value.decode()
-                        except:
-                            value = str(value)
-                    exif_data[tag] = str(value)
-
-        # Basic Forensic Analysis Simulation (since we don't have a real forensic model yet)
-        # In a real app, we would check for compression artifacts, metadata inconsistencies, etc.
-        software = exif_data.get('Software', 'Unknown')
-        camera = exif_data.get('Model', 'Unknown')
-
-        # Simple heuristic: if 'Photoshop' or 'GIMP' is in software, flag it
-        is_suspicious = 'photoshop' in software.lower() or 'gimp' in software.lower()
-
-        # Lightweight CV-style Error Level Analysis (ELA)
-        ela_score = 0.0
-        ela_summary = ""
-        try:
-            rgb_image = image.convert('RGB')
-            
-            # Use in-memory buffer instead of file to avoid locking issues
-            buffer = io.BytesIO()
-            rgb_image.save(buffer, 'JPEG', quality=90)
-            buffer.seek(0)
-            
-            recompressed = Image.open(buffer).convert('RGB')
-            diff = ImageChops.difference(rgb_image, recompressed)
-            stat = ImageStat.Stat(diff)
-            mean_diff = sum(stat.mean) / (3 * 255.0)
-            ela_score = float(round(mean_diff, 4))
-            if ela_score < 0.02:
-                ela_summary = "Low compression anomalies; image appears structurally consistent."
-            elif ela_score < 0.06:
-                ela_summary = "Moderate localized anomalies; possible light editing."
-            else:
-                ela_summary = "Strong localized anomalies; potential heavy editing or compositing detected."
-        except Exception as e:
-            print(f"ELA Error: {e}")
-            ela_summary = f"ELA analysis unavailable: {e}"
-
-        # Combine metadata suspicion and ELA score into an authenticity score
-        base_score = 95
-        if is_suspicious:
-            base_score -= 40
-        base_score -= min(40, int(ela_score * 100))
-
-        # Additional image heuristics
-        width, height = image.size
-        has_small_resolution = (width * height) < (512 * 512)
-        extreme_aspect_ratio = (width / float(height)) > 3 or (height / float(width)) > 3
-        has_no_exif = len(exif_data) == 0
-
-        tamper_risk = 0
-        if has_small_resolution:
-            tamper_risk += 5
-        if extreme_aspect_ratio:
-            tamper_risk += 5
-        if has_no_exif:
-            tamper_risk += 10
-        if is_suspicious:
-            tamper_risk += 15
-        if ela_score >= 0.06:
-            tamper_risk += 20
-        tamper_risk = max(0, min(100, tamper_risk))
-
-        authenticity_score = max(0, min(100, base_score))
-        verdict = "Tampering Detected" if authenticity_score < 60 or tamper_risk >= 40 else "Original"
-
-        return jsonify({
-            'verdict': verdict,
-            'authenticity_score': authenticity_score,
-            'exif_metadata': {
-                'camera': camera,
-                'software': software,
-                'datetime': exif_data.get('DateTime', 'Unknown')
-            },
-            'ela_score': ela_score,
-            'ela_summary': ela_summary,
-            'tamper_risk': tamper_risk,
-            'forensic_flags': {
-                'has_no_exif': has_no_exif,
-                'is_suspicious_software': is_suspicious,
-                'has_small_resolution': has_small_resolution,
-                'extreme_aspect_ratio': extreme_aspect_ratio,
-                'width': width,
-                'height': height
-            }
-        })
+        with timer.stage('hash'):
+            sha256 = content_hash(data)
+
+        # Byte-identical re-uploads skip decoding and forensics entirely
+        if image_cache is not None:
+            with timer.stage('cache_lookup'):
+                cached = image_cache.get(sha256)
+            if cached is not None:
+                IMAGE_CACHE_LOOKUPS.inc(result='exact')
+                result = cached['result']
+                result['seen_before'] = {
+                    'match': 'exact',
+                    'first_seen': cached['first_seen'],
+                    'times_seen': cached['times_seen']
+                }
+                return jsonify(record_image(result))
+
+        forensics_started = time.perf_counter()
+        if forensics_pool is not None:
+            try:
+                result, phash = forensics_pool.run(data)
+            except PoolSaturated:
+                response = jsonify({'error': 'Image analysis is at capacity, please retry shortly'})
+                response.headers['Retry-After'] = '2'
+                return response, 429
+            except TimeoutError as e:
+                return jsonify({'error': f'Failed to process image: {e}'}), 504
+        else:
+            result, phash = analyze_image_bytes(data, **ela_options)
+        # Stages measured inside the (possibly pooled) analysis; the rest of the wall time is queueing and IPC
+        stage_seconds = result.pop('stage_seconds', {})
+        for name, seconds in stage_seconds.items():
+            timer.record(name, seconds)
+        overhead = time.perf_counter() - forensics_started - sum(stage_seconds.values())
+        timer.record('forensics_overhead', max(0.0, overhead))
+
+        # Re-encoded or resized copies of an earlier upload keep (almost) the same perceptual hash
+        result['image_hash'] = {'sha256': sha256, 'phash': f'{phash:016x}'}
+        seen_before = None
+        if image_cache is not None:
+            match = image_cache.find_similar(phash)
+            IMAGE_CACHE_LOOKUPS.inc(result='perceptual' if match is not None else 'miss')
+            if match is not None:
+                seen_before = {'match': 'perceptual', 'distance': match[0], 'first_seen': match[1]}
+            image_cache.put(sha256, phash, result, first_seen=match[1] if match else None)
+        result['seen_before'] = seen_before
+
+        return jsonify(record_image(result))
 
     except Exception as e:
         return jsonify({'error': f'Failed to process image: {str(e)}'}), 500
 
 if __name__ == '__main__':
+    port = int(os.getenv('PORT', '5000'))
     print("Starting ba7ath.tn AI App...")
-    print("Go to http://127.0.0.1:5000 in your browser.")
-    app.run(debug=True, port=5000)
+    if server_profile == 'api':
+        # No debugger or reloader; the reloader's file polling competes with requests for CPU
+        print(f"Serving the JSON API at http://127.0.0.1:{port} (use wsgi.py or asgi.py in production).")
+        app.run(port=port, threaded=True)
+    else:
+        print(f"Go to http://127.0.0.1:{port} in your browser.")
+        app.run(debug=True, port=port)
@@ -0,0 +1,20 @@
+"""ASGI entry point for the API-only server profile.
+
+    uvicorn --workers 4 asgi:application
+
+Flask is a WSGI framework, so a2wsgi runs each request on a thread pool
+(``ASGI_THREADS`` per process) while the server's event loop handles the
+connections and streams SSE bodies out.  asgiref's adapter is not used:
+it runs every request on one shared thread, so a request waiting on the
+LLM would hold up all the others.  Needs ``pip install a2wsgi uvicorn``.
+Same profile as ``wsgi.py``.
+"""
+import os
+
+os.environ.setdefault('SERVER_PROFILE', 'api')
+
+from a2wsgi import WSGIMiddleware  # noqa: E402
+
+from app import app  # noqa: E402
+
+application = WSGIMiddleware(app, workers=int(os.getenv('ASGI_THREADS', '32')))
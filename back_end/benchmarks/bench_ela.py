@@ -0,0 +1,112 @@
+"""Benchmark the served, tiled ELA signal against the original full-frame implementation.
+
+For each image size a synthetic camera-like JPEG is generated, then every
+implementation runs in a fresh subprocess so its latency and peak RSS are
+measured in isolation.  ``tiled`` is the ``ela`` forensic signal as
+``/api/analyze-image`` runs it, JPEG-ghost passes included (they only run
+on images analysed at full resolution).
+
+    python benchmarks/bench_ela.py [--sizes 1,4,12,24,50] [--json out.json]
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def legacy_ela(image):
+    # The ELA /api/analyze-image ran before ela.py
+    from PIL import Image, ImageChops, ImageStat
+    rgb_image = image.convert('RGB')
+    buffer = io.BytesIO()
+    rgb_image.save(buffer, 'JPEG', quality=90)
+    buffer.seek(0)
+    recompressed = Image.open(buffer).convert('RGB')
+    stat = ImageStat.Stat(ImageChops.difference(rgb_image, recompressed))
+    return float(round(sum(stat.mean) / (3 * 255.0), 4))
+
+
+def tiled_ela(image):
+    from forensic_signals import ForensicEngine
+    return ForensicEngine(signals=['ela']).analyze(image, {})['ela']['score']
+
+
+def make_jpeg(path, megapixels):
+    import numpy as np
+    from PIL import Image
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    rng = np.random.default_rng(0)
+    # Smooth gradients plus sensor-like noise, so the JPEG behaves like a photo rather than flat color
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    x = np.linspace(0, 255, width, dtype=np.float32)[None, :]
+    pixels = np.empty((height, width, 3), dtype=np.uint8)
+    for channel, (a, b) in enumerate(((0.6, 0.4), (0.3, 0.7), (0.5, 0.5))):
+        plane = a * y + b * x + rng.normal(0, 6, (height, width)).astype(np.float32)
+        pixels[:, :, channel] = np.clip(plane, 0, 255).astype(np.uint8)
+    Image.fromarray(pixels).save(path, 'JPEG', quality=92)
+    return width, height
+
+
+def peak_rss_kb():
+    # VmHWM belongs to this process image; ru_maxrss would inherit the parent's peak across exec
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1])
+    return 0
+
+
+def child(impl, path):
+    from PIL import Image
+    Image.MAX_IMAGE_PIXELS = None
+    with open(path, 'rb') as f:
+        data = f.read()
+    baseline = peak_rss_kb()
+    started = time.perf_counter()
+    image = Image.open(io.BytesIO(data))
+    score = (legacy_ela if impl == 'legacy' else tiled_ela)(image)
+    elapsed = time.perf_counter() - started
+    peak = peak_rss_kb()
+    print(json.dumps({'seconds': elapsed, 'peak_rss_mb': peak / 1024, 'rss_growth_mb': (peak - baseline) / 1024,
+                      'ela_score': score}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', default='1,4,12,24', help='Comma-separated megapixel counts')
+    parser.add_argument('--json', help='Also write results to this file')
+    parser.add_argument('--child', nargs=2, metavar=('IMPL', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'MP':>5} {'impl':<7} {'seconds':>8} {'peak MB':>8} {'growth MB':>10} {'ela':>7}")
+        for megapixels in [float(s) for s in args.sizes.split(',')]:
+            path = os.path.join(tmp, f'{megapixels}mp.jpg')
+            width, height = make_jpeg(path, megapixels)
+            for impl in ('legacy', 'tiled'):
+                out = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', impl, path],
+                                     capture_output=True, text=True, check=True)
+                row = json.loads(out.stdout.strip().splitlines()[-1])
+                row.update({'megapixels': megapixels, 'width': width, 'height': height, 'impl': impl})
+                results.append(row)
+                print(f"{megapixels:>5g} {impl:<7} {row['seconds']:>8.3f} {row['peak_rss_mb']:>8.1f} "
+                      f"{row['rss_growth_mb']:>10.1f} {row['ela_score']:>7.4f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
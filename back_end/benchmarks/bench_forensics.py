@@ -0,0 +1,115 @@
+"""Measure image forensics throughput inline vs in the process pool.
+
+A fixed set of synthetic JPEGs is analyzed by ``--clients`` concurrent
+threads, first inline (the old request-thread behaviour) then through
+``ForensicsPool`` at each worker count.  Meanwhile a probe thread runs a
+small pure-Python task repeatedly, standing in for a text verification; its
+p95 latency shows how much image work stalls the rest of the process.
+
+    python benchmarks/bench_forensics.py [--images 24] [--clients 8] [--workers 1,2,4] [--json out.json]
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image
+
+from forensics import ForensicsPool, analyze_image_bytes
+from heuristics import compute_heuristics
+
+PROBE_TEXT = 'BREAKING: You won\'t believe what scientists found!!! http://example.com ' * 4
+
+
+def make_jpegs(count, megapixels):
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    rng = np.random.default_rng(0)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    x = np.linspace(0, 255, width, dtype=np.float32)[None, :]
+    images = []
+    for i in range(count):
+        plane = 0.5 * y + 0.5 * x + rng.normal(0, 8, (height, width)).astype(np.float32)
+        pixels = np.repeat(np.clip(plane, 0, 255).astype(np.uint8)[:, :, None], 3, axis=2)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).save(buffer, 'JPEG', quality=85 + i % 10)
+        images.append(buffer.getvalue())
+    return images
+
+
+def run(label, analyze, images, clients):
+    latencies = []
+    stop = threading.Event()
+
+    def probe():
+        while not stop.is_set():
+            started = time.perf_counter()
+            for _ in range(20):
+                compute_heuristics(PROBE_TEXT)
+            latencies.append(time.perf_counter() - started)
+            time.sleep(0.005)
+
+    prober = threading.Thread(target=probe, daemon=True)
+    prober.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as threads:
+        list(threads.map(analyze, images))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    prober.join()
+    latencies.sort()
+    row = {
+        'mode': label,
+        'images': len(images),
+        'seconds': round(elapsed, 3),
+        'images_per_second': round(len(images) / elapsed, 2),
+        'probe_p50_ms': round(latencies[len(latencies) // 2] * 1000, 2) if latencies else None,
+        'probe_p95_ms': round(latencies[int(len(latencies) * 0.95)] * 1000, 2) if latencies else None
+    }
+    print(f"{label:<12} {row['seconds']:>8.2f} {row['images_per_second']:>8.2f} "
+          f"{row['probe_p50_ms']:>10} {row['probe_p95_ms']:>10}")
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--images', type=int, default=24)
+    parser.add_argument('--megapixels', type=float, default=4.0)
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent request threads')
+    parser.add_argument('--workers', default=None, help='Comma-separated pool sizes (default: 1,2,4,...,cpu_count)')
+    parser.add_argument('--json', help='Also write results to this file')
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    if args.workers:
+        worker_counts = [int(w) for w in args.workers.split(',')]
+    else:
+        worker_counts = sorted({min(cpus, 2 ** i) for i in range(cpus.bit_length() + 1)})
+    images = make_jpegs(args.images, args.megapixels)
+    print(f"{len(images)} x {args.megapixels:g} MP JPEGs, {args.clients} clients, {cpus} CPUs")
+    print(f"{'mode':<12} {'seconds':>8} {'img/s':>8} {'probe p50':>10} {'probe p95':>10}")
+
+    results = [run('inline', analyze_image_bytes, images, args.clients)]
+    for workers in worker_counts:
+        # Queue large enough that the benchmark measures throughput, not rejections
+        pool = ForensicsPool(workers=workers, max_queue=args.clients, timeout=300)
+        pool.run(images[0])  # start the workers outside the timed region
+        try:
+            results.append(run(f'pool x{workers}', pool.run, images, args.clients))
+        finally:
+            pool.shutdown()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'cpus': cpus, 'clients': args.clients, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
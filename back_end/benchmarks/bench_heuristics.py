@@ -0,0 +1,125 @@
+"""Throughput of the heuristic scanner, in MB/s of claim text.
+
+Compares, for dictionaries of growing size, on a synthetic mix of English,
+French, Arabic and Arabizi claims:
+
+* ``legacy``: the original implementation, one substring check per phrase
+  (no word boundaries, no Arabic normalization);
+* ``per-phrase``: the same matching rules as the engine, one regex per phrase;
+* ``engine``: ``HeuristicEngine``, one trie-shaped regex for the dictionary.
+
+    python benchmarks/bench_heuristics.py [--mb 4] [--phrases 4,67,1000,5000] [--json out.json]
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from heuristics import DEFAULT_PHRASES_PATH, HeuristicEngine, normalize_for_matching
+
+WORDS = {
+    'en': 'the president said new vaccine election results people video government secret truth share news today'.split(),
+    'fr': 'le président a dit nouveau vaccin élection résultats les gens vidéo gouvernement vérité partagez'.split(),
+    'ar': 'الرئيس قال لقاح جديد الانتخابات النتائج الناس فيديو الحكومة الحقيقة انشر خبر اليوم'.split(),
+    'aeb-Latn': 'chouf 3ajel barcha nes el 7koma sar famma fi tounes lyoum video el 7a9i9a'.split(),
+}
+
+
+def legacy_heuristics(text, phrases):
+    # The pre-engine implementation, generalized to a phrase list
+    text_len = len(text or "")
+    words = text.split()
+    num_words = len(words)
+    num_exclam = text.count('!')
+    has_all_caps_word = any(len(w) > 4 and w.isupper() for w in words)
+    num_urls = len(re.findall(r"https?://\S+", text))
+    lowered = text.lower()
+    has_sensational_phrase = any(p in lowered for p in phrases)
+    return text_len, num_words, num_exclam, has_all_caps_word, num_urls, has_sensational_phrase
+
+
+def per_phrase_matcher(phrases):
+    patterns = [re.compile(r'(?<!\w)' + re.escape(normalize_for_matching(p)) + r'(?!\w)', re.IGNORECASE)
+                for p in phrases]
+
+    def match(text):
+        scan = normalize_for_matching(text)
+        return [p for p in patterns if p.search(scan)]
+    return match
+
+
+def make_claims(megabytes, phrases, rng):
+    claims = []
+    size = 0
+    while size < megabytes * 1e6:
+        words = rng.choices(WORDS[rng.choice(list(WORDS))], k=rng.randint(8, 60))
+        if rng.random() < 0.2:
+            words.insert(rng.randrange(len(words)), rng.choice(phrases))
+        if rng.random() < 0.1:
+            words.append('https://t.co/' + str(rng.randint(0, 10 ** 6)))
+        if rng.random() < 0.1:
+            words[0] = words[0].upper() + '!!!'
+        claim = ' '.join(words)
+        claims.append(claim)
+        size += len(claim.encode('utf-8'))
+    return claims, size
+
+
+def synthetic_phrases(count, base, rng):
+    phrases = list(base)
+    while len(phrases) < count:
+        lang = rng.choice(list(WORDS))
+        phrases.append(' '.join(rng.choices(WORDS[lang], k=rng.randint(2, 4))) + f' {rng.randint(0, 99999)}')
+    return phrases[:count]
+
+
+def measure(fn, claims, size, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for claim in claims:
+            fn(claim)
+        best = min(best, time.perf_counter() - started)
+    return size / 1e6 / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--mb', type=float, default=4.0, help='Megabytes of claim text to scan')
+    parser.add_argument('--phrases', default='4,67,1000,5000', help='Dictionary sizes to test')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help='Also write results to this file')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with open(DEFAULT_PHRASES_PATH, encoding='utf-8') as f:
+        shipped = [p['text'].lower() for p in json.load(f)['phrases']]
+
+    results = []
+    print(f"{'phrases':>8} {'legacy MB/s':>12} {'per-phrase MB/s':>16} {'engine MB/s':>12} {'build ms':>9}")
+    for count in [int(c) for c in args.phrases.split(',')]:
+        phrases = synthetic_phrases(count, shipped, rng)
+        claims, size = make_claims(args.mb, phrases, rng)
+        started = time.perf_counter()
+        engine = HeuristicEngine([{'text': p, 'weight': 10} for p in phrases])
+        build_ms = (time.perf_counter() - started) * 1000
+        legacy = measure(lambda text: legacy_heuristics(text, phrases), claims, size, args.repeat)
+        per_phrase = measure(per_phrase_matcher(phrases), claims, size, args.repeat)
+        compiled = measure(engine.analyze, claims, size, args.repeat)
+        results.append({'phrases': count, 'legacy_mb_s': round(legacy, 2), 'per_phrase_mb_s': round(per_phrase, 2),
+                        'engine_mb_s': round(compiled, 2), 'build_ms': round(build_ms, 1),
+                        'megabytes': round(size / 1e6, 2)})
+        print(f"{count:>8} {legacy:>12.2f} {per_phrase:>16.2f} {compiled:>12.2f} {build_ms:>9.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""Write throughput and query latency of the history store at scale.
+
+Fills a fresh database with ``--records`` synthetic claim verifications
+(mixed languages, built from ``corpus/claims.txt``) spread over the last
+``--days`` days, with one image analysis per 20 claims, then times the
+queries ``/api/history`` serves: the newest page, a page deep into the
+cursor chain, full-text searches for common and rare words, time ranges,
+filters, and the ``train.py`` / cache-warming scans.
+
+    python benchmarks/bench_history.py [--records 1000000] [--days 90] [--keep db.sqlite3] [--json out.json]
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BACK_END = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACK_END)
+
+from history_store import HistoryStore
+
+VERDICTS = ('TRUE', 'FALSE', 'MIXED', 'UNVERIFIABLE')
+TIERS = ('llm', 'llm', 'cache', 'cache', 'cache', 'local')
+
+
+def load_claims():
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus', 'claims.txt'), encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def spread_clock(records, days):
+    """A clock for the store's writer that steps from ``days`` ago to now, one step per record written."""
+    stamps = itertools.count()
+    start = time.time() - days * 86400.0
+    step = days * 86400.0 / records
+    return lambda: start + next(stamps) * step
+
+
+def fill(store, records, seed=0):
+    rng = random.Random(seed)
+    claims = load_claims()
+    words = ' '.join(claims).split()
+    started = time.perf_counter()
+    for i in range(records):
+        if i % 20 == 19:
+            store.append_image(f'{rng.getrandbits(256):064x}', rng.getrandbits(64), {
+                'verdict': rng.choice(('Original', 'Tampering Detected')),
+                'authenticity_score': rng.randint(20, 95),
+                'ela_summary': 'Low compression anomalies; image appears structurally consistent.',
+                'exif_metadata': {'camera': rng.choice(('Canon EOS 80D', 'iPhone 13', 'Unknown')), 'software': 'Unknown'}
+            }, client=f'ip:10.0.0.{i % 50}')
+        else:
+            # A known claim with a few random words, so texts repeat like viral claims but aren't all identical
+            text = rng.choice(claims) + ' ' + ' '.join(rng.choices(words, k=rng.randint(0, 6)))
+            store.append_claim(text, {
+                'verdict': rng.choice(VERDICTS),
+                'confidence': f'{rng.randint(50, 99)}%',
+                'explanation': ' '.join(rng.choices(words, k=40)),
+                'sources': ['https://example.org/fact-check'],
+                'tier': rng.choice(TIERS),
+                'meta_analysis': {'combined_confidence_score': rng.uniform(30, 95), 'engines_agree': True}
+            }, client=f'ip:10.0.0.{i % 50}')
+        if store.dropped:
+            # The writer is behind; this is a bulk load, so wait for it instead of dropping records
+            store.dropped = 0
+            store.flush()
+    store.flush()
+    return time.perf_counter() - started
+
+
+def timed(fn, repeat=5):
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        runs.append(time.perf_counter() - started)
+    return statistics.median(runs) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--records', type=int, default=1000000)
+    parser.add_argument('--days', type=float, default=90)
+    parser.add_argument('--keep', help='Write the database here and keep it (default: a temporary file)')
+    parser.add_argument('--json', help='Also write results to this file')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    path = args.keep or os.path.join(directory, 'history.sqlite3')
+    store = HistoryStore(path, queue_size=50000, batch_size=5000, clock=spread_clock(args.records, args.days))
+    seconds = fill(store, args.records)
+    size = sum(os.path.getsize(path + suffix) for suffix in ('', '-wal') if os.path.exists(path + suffix))
+    print(f"Appended {args.records} records in {seconds:.1f}s ({args.records / seconds:,.0f}/s), "
+          f"{size / 1e6:.0f} MB on disk")
+    results = {'records': args.records, 'append_per_second': args.records / seconds, 'bytes': size, 'queries_ms': {}}
+
+    now = time.time()
+    _, cursor = store.query(limit=50)
+    deep_cursor = str(args.records // 50)
+    claims = load_claims()
+    queries = [
+        ('newest page', lambda: store.query(limit=50)),
+        ('second page', lambda: store.query(limit=50, cursor=cursor)),
+        ('page near the oldest record', lambda: store.query(limit=50, cursor=deep_cursor)),
+        ('search, common word', lambda: store.query(text=claims[0].split()[0], limit=50)),
+        ('search, two words', lambda: store.query(text=' '.join(claims[1].split()[2:4]), limit=50)),
+        ('search, Arabic', lambda: store.query(text=next(c for c in claims if 'ال' in c).split()[0], limit=50)),
+        ('search, no match', lambda: store.query(text='zzyzx', limit=50)),
+        ('search, prefix', lambda: store.query(text='vacc*', limit=50)),
+        ('last hour', lambda: store.query(since=now - 3600, limit=50)),
+        ('one day a month ago', lambda: store.query(since=now - 31 * 86400, until=now - 30 * 86400, limit=50)),
+        ('search within a week', lambda: store.query(text='cancer', since=now - 14 * 86400,
+                                                     until=now - 7 * 86400, limit=50)),
+        ('images only', lambda: store.query(kind='image', limit=50)),
+        ('LLM tier, FALSE verdicts', lambda: store.query(tier='llm', verdict='FALSE', limit=50)),
+        ('record by id', lambda: store.get(args.records // 2)),
+    ]
+    for name, query in queries:
+        ms, _ = timed(query)
+        results['queries_ms'][name] = ms
+        print(f"  {name:<30} {ms:8.2f} ms")
+
+    ms, entries = timed(lambda: store.recent_claims(now - 86400, 10000), repeat=1)
+    print(f"  {'cache warm scan (1 day)':<30} {ms:8.2f} ms  ({len(entries)} verdicts)")
+    results['queries_ms']['cache warm scan'] = ms
+    started = time.perf_counter()
+    labeled = sum(len(batch) for batch in store.iter_labeled())
+    elapsed = time.perf_counter() - started
+    print(f"  {'train.py scan':<30} {elapsed * 1000:8.0f} ms  ({labeled} labelled claims)")
+    results['queries_ms']['train.py scan'] = elapsed * 1000
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
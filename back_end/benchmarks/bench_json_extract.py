@@ -0,0 +1,79 @@
+"""Benchmark the LLM verdict extractor against the old fence-splitting parser.
+
+Reports, over the response corpus, how many responses each parser recovers
+(every failure used to cost a 500 and a second LLM call) and the parse cost
+for whole responses and for streamed 16-character deltas.
+
+    python benchmarks/bench_json_extract.py [--repeat 2000]
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_extract import JSONObjectExtractor, extract_verdict  # noqa: E402
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus', 'llm_responses')
+
+
+def legacy_parse(content):
+    # The parser /api/verify used before json_extract
+    if "```json" in content:
+        content = content.split("```json")[1].split("```")[0]
+    elif "```" in content:
+        content = content.split("```")[1].split("```")[0]
+    return json.loads(content.strip())
+
+
+def streamed_parse(content, chunk_size=16):
+    extractor = JSONObjectExtractor()
+    for i in range(0, len(content), chunk_size):
+        if extractor.feed(content[i:i + chunk_size]) is not None:
+            break
+    return extractor.close()
+
+
+def run(parser, corpus, repeat):
+    ok = 0
+    for content in corpus:
+        try:
+            parser(content)
+            ok += 1
+        except ValueError:
+            pass
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for content in corpus:
+            try:
+                parser(content)
+            except ValueError:
+                pass
+    elapsed = time.perf_counter() - started
+    return ok, elapsed / (repeat * len(corpus)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=2000)
+    parser.add_argument('--corpus', default=CORPUS_DIR)
+    args = parser.parse_args()
+
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(args.corpus, '*.txt'))):
+        with open(path, encoding='utf-8') as f:
+            corpus.append(f.read())
+    total_bytes = sum(len(c.encode('utf-8')) for c in corpus)
+    print(f"{len(corpus)} responses, {total_bytes} bytes, {args.repeat} rounds")
+    print(f"{'parser':<12} {'recovered':>10} {'us/response':>12} {'MB/s':>8}")
+    for name, fn in (('legacy', legacy_parse), ('extract', extract_verdict), ('streamed', streamed_parse)):
+        ok, us = run(fn, corpus, args.repeat)
+        mbps = total_bytes / len(corpus) / us if us else 0
+        print(f"{name:<12} {ok:>6}/{len(corpus):<3} {us:>12.1f} {mbps:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
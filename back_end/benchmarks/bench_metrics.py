@@ -0,0 +1,76 @@
+"""Overhead of the metrics and Server-Timing instrumentation on /api/verify.
+
+Each configuration runs in a fresh process (the app reads its settings at
+import) and sends ``--requests`` claims through Flask's test client with no
+LLM configured, so the local-model path, where instrumentation is the
+largest share of the work, is what gets timed.
+
+    python benchmarks/bench_metrics.py [--requests 3000] [--json out.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACK_END = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIGS = {
+    'off': {'METRICS_ENABLED': '0', 'SERVER_TIMING': '0'},
+    'metrics': {'METRICS_ENABLED': '1', 'SERVER_TIMING': '0'},
+    'metrics+server-timing': {'METRICS_ENABLED': '1', 'SERVER_TIMING': '1'},
+}
+
+
+def child(requests):
+    sys.path.insert(0, BACK_END)
+    import app
+
+    client = app.app.test_client()
+    claims = [f'Claim number {i}: the water supply was poisoned, share before it is deleted' for i in range(requests)]
+    for claim in claims[:100]:
+        client.post('/api/verify', json={'text': claim})
+    latencies = []
+    for claim in claims:
+        started = time.perf_counter()
+        client.post('/api/verify', json={'text': claim})
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    print(json.dumps({
+        'mean_ms': sum(latencies) / len(latencies) * 1000,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p99_ms': latencies[int(len(latencies) * 0.99)] * 1000
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--requests', type=int, default=3000)
+    parser.add_argument('--json', help='Also write results to this file')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.requests)
+        return
+
+    results = []
+    print(f"{'config':>22} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    with tempfile.TemporaryDirectory() as empty_registry:
+        for name, settings in CONFIGS.items():
+            env = dict(os.environ, PERPLEXITY_API_KEY='', VERDICT_CACHE_PATH='', IMAGE_CACHE_PATH='',
+                       FORENSICS_WORKERS='0', MODEL_REGISTRY_DIR=empty_registry, MODEL_REGISTRY_POLL_SECONDS='0',
+                       **settings)
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', '--requests',
+                                  str(args.requests)], env=env, capture_output=True, text=True, check=True)
+            row = dict(json.loads(out.stdout.strip().splitlines()[-1]), config=name)
+            results.append(row)
+            print(f"{name:>22} {row['mean_ms']:>9.3f} {row['p50_ms']:>9.3f} {row['p99_ms']:>9.3f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
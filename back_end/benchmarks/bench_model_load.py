@@ -0,0 +1,87 @@
+"""Compare cold start and per-worker memory of the pickled vs compact local model.
+
+Starts ``--workers`` fresh interpreters per format, the way gunicorn would,
+each importing what it needs, loading the model and scoring one claim.  Once
+all of them are alive, each reports its RSS and PSS (proportional set size,
+where pages shared between processes, like the memory-mapped export, are
+split between them).
+
+    python benchmarks/bench_model_load.py [--workers 4] [--json out.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BACK_END = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import time
+started = time.perf_counter()
+import os, sys, warnings
+warnings.simplefilter('ignore')
+sys.path.insert(0, {back_end!r})
+if {fmt!r} == 'pickle':
+    import joblib
+    model = joblib.load(os.path.join({back_end!r}, 'model.pkl'))
+    vectorizer = joblib.load(os.path.join({back_end!r}, 'vectorizer.pkl'))
+else:
+    from compact_model import CompactModel
+    model = vectorizer = CompactModel(os.path.join({back_end!r}, 'model_compact'))
+model.predict_proba(vectorizer.transform(['Breaking: scientists confirm the moon landing was staged']))
+elapsed = time.perf_counter() - started
+print('ready', flush=True)
+sys.stdin.readline()
+stats = {{'startup_ms': elapsed * 1000, 'sklearn_imported': 'sklearn' in sys.modules}}
+with open('/proc/self/smaps_rollup') as f:
+    for line in f:
+        parts = line.split()
+        if parts[0] in ('Rss:', 'Pss:', 'Shared_Clean:', 'Private_Clean:', 'Private_Dirty:'):
+            stats[parts[0].rstrip(':').lower() + '_mb'] = int(parts[1]) / 1024
+import json
+print(json.dumps(stats), flush=True)
+'''
+
+
+def measure(fmt, workers):
+    code = CHILD.format(back_end=BACK_END, fmt=fmt)
+    procs = [subprocess.Popen([sys.executable, '-c', code], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+             for _ in range(workers)]
+    for proc in procs:
+        proc.stdout.readline()
+    rows = []
+    for proc in procs:
+        proc.stdin.write('\n')
+        proc.stdin.flush()
+        rows.append(json.loads(proc.stdout.readline()))
+    for proc in procs:
+        proc.wait()
+    summary = {'format': fmt, 'workers': workers, 'sklearn_imported': rows[0]['sklearn_imported']}
+    for key in rows[0]:
+        if key.endswith('_ms') or key.endswith('_mb'):
+            summary[key] = round(sum(r[key] for r in rows) / len(rows), 1)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--json', help='Also write results to this file')
+    args = parser.parse_args()
+
+    results = [measure('pickle', args.workers), measure('compact', args.workers)]
+    print(f"{'format':<8} {'startup ms':>10} {'RSS MB':>8} {'PSS MB':>8} {'private MB':>10} {'sklearn':>8}")
+    for row in results:
+        private = row['private_clean_mb'] + row['private_dirty_mb']
+        print(f"{row['format']:<8} {row['startup_ms']:>10.1f} {row['rss_mb']:>8.1f} {row['pss_mb']:>8.1f} "
+              f"{private:>10.1f} {str(row['sklearn_imported']):>8}")
+    print(f"(averages over {args.workers} concurrently running workers)")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
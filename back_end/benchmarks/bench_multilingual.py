@@ -0,0 +1,188 @@
+"""Local accuracy and escalation rate of per-language models on multilingual traffic.
+
+Generates labelled synthetic claims in English, French, Arabic and Tunizi
+(with the spelling drift real Tunizi has: ch/sh, 7/h, 9/q, 3/a, stretched
+vowels).  The English ones go in a Truth Seeker shaped CSV, the rest in an
+API history database as LLM verdicts, which is where non-English training
+data comes from in production.  ``train.py`` then trains, in a scratch
+directory (nothing is published):
+
+* ``tfidf``: the English word model, on the CSV alone, as served today;
+* ``tfidf+history``: the same word model on the CSV plus the history;
+* ``multilingual``: ``--multilingual --history``, one character n-gram model per language.
+
+Each is scored on freshly generated claims per language: accuracy, the share
+of claims the tiered mode would answer locally (confidence at or above
+``--threshold``) and their accuracy, and the vectorize + predict latency of
+one claim, which is what ``/api/verify`` pays.  The data is synthetic, so the
+absolute accuracies say little; the gap between models on the same data is
+the point.
+
+    python benchmarks/bench_multilingual.py [--rows 3000] [--test-rows 500] [--threshold 90] [--json out.json]
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACK_END = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACK_END)
+
+import joblib
+
+from history_store import HistoryStore
+from language_id import LANGUAGES, detect_language
+
+WORDS = {
+    'en': {
+        'common': 'people president vaccine election water bread school bank price government health police '
+                  'tunisia minister month today video children hospital money'.split(),
+        'true': 'report official according data study confirmed ministry statistics published institute'.split(),
+        'fake': 'shocking hoax secret exposed miracle banned share hidden truth urgent'.split(),
+        'glue': 'the is are will and of to in that for with'.split(),
+    },
+    'fr': {
+        'common': 'gouvernement vaccin élections eau pain école banque prix santé police tunisie ministre '
+                  'mois aujourd hui vidéo enfants hôpital argent carburant'.split(),
+        'true': 'rapport officiel selon données étude confirmé ministère statistiques publié institut'.split(),
+        'fake': 'choquant urgent partagez secret incroyable complot caché miracle vérité scandale'.split(),
+        'glue': 'le la les des est et du de pour dans que qui'.split(),
+    },
+    'ar': {
+        'common': 'الحكومة اللقاح الانتخابات الماء الخبز المدارس البنوك الأسعار الصحة الشرطة تونس الوزير '
+                  'الشهر اليوم فيديو الأطفال المستشفى الفلوس البنزين'.split(),
+        'true': 'تقرير رسمي حسب بيانات دراسة أكدت وزارة إحصائيات نشر المعهد'.split(),
+        'fake': 'عاجل صادم شاركوا سري فضيحة مؤامرة مخبي معجزة الحقيقة خطير'.split(),
+        'glue': 'في من على أن باش متاع فما هذا إلى'.split(),
+    },
+    'tunizi': {
+        'common': 'el7okouma lqa7 intikhabat el ma el khobz ecole el banka soum e55idma sa7a police tounes '
+                  'wazir chhar elyoum video sghar sbitar flous essence'.split(),
+        'true': 'rasmi ta9rir 7asb bayanet dirasa akdet wizara i7sa2iyat nchret ma3had'.split(),
+        'fake': '3ajel fadhi7a partagiwha sirri chouf mo2amra makhbi mou3jiza 7a9i9a khtir'.split(),
+        'glue': 'bech mta3 fama elli fel mel 3la w ya barcha'.split(),
+    },
+}
+# Tunizi has no fixed spelling: the same word shows up many ways
+TUNIZI_DRIFT = [('ch', 'sh'), ('7', 'h'), ('9', 'q'), ('3', 'a'), ('ou', 'u'), ('kh', '5')]
+
+
+def tunizi_spelling(word, rng):
+    for old, new in TUNIZI_DRIFT:
+        if old in word and rng.random() < 0.3:
+            word = word.replace(old, new)
+    if rng.random() < 0.15 and word[-1] in 'aeiou':
+        word += word[-1] * rng.randint(2, 4)
+    return word
+
+
+def make_claims(language, rows, seed):
+    rng = random.Random(f'{language}-{seed}')
+    words = WORDS[language]
+    claims = []
+    for _ in range(rows):
+        label = int(rng.random() < 0.5)
+        # Signal words are only a tendency, so the task is learnable but not trivial
+        signal = words['true'] if (rng.random() < 0.85) == bool(label) else words['fake']
+        tokens = (rng.choices(words['common'], k=rng.randint(4, 10)) + rng.choices(words['glue'], k=rng.randint(2, 5))
+                  + rng.choices(signal, k=rng.randint(1, 2)))
+        rng.shuffle(tokens)
+        if language == 'tunizi':
+            tokens = [tunizi_spelling(t, rng) for t in tokens]
+        claims.append((' '.join(tokens), label))
+    return claims
+
+
+def write_training_data(workdir, rows):
+    csv_path = os.path.join(workdir, 'claims.csv')
+    with open(csv_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['author', 'statement', 'target', 'BinaryNumTarget', 'manual_keywords', 'tweet',
+                         '5_label_majority_answer', '3_label_majority_answer'])
+        for text, label in make_claims('en', rows, seed=0):
+            writer.writerow(['Author', text, bool(label), label, 'news', text, 'Agree', 'Agree'])
+    history_path = os.path.join(workdir, 'history.sqlite3')
+    store = HistoryStore(history_path)
+    for language in ('fr', 'ar', 'tunizi'):
+        for text, label in make_claims(language, rows, seed=0):
+            store.append_claim(text, {'verdict': 'TRUE' if label else 'FALSE', 'tier': 'llm'}, client='bench')
+    store.flush()
+    return csv_path, history_path
+
+
+def train(workdir, csv_path, options):
+    out = subprocess.run([sys.executable, os.path.join(BACK_END, 'train.py'), csv_path, '--no-publish', *options],
+                         cwd=workdir, capture_output=True, text=True,
+                         env=dict(os.environ, PYTHONPATH=BACK_END, PYTHONWARNINGS='ignore'))
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr)
+    return joblib.load(os.path.join(workdir, 'model.pkl')), joblib.load(os.path.join(workdir, 'vectorizer.pkl'))
+
+
+def evaluate(model, vectorizer, claims, threshold):
+    texts = [text for text, _ in claims]
+    proba = model.predict_proba(vectorizer.transform(texts))
+    correct = answered = answered_correct = 0
+    for (_, label), (fake, real) in zip(claims, proba):
+        predicted = int(real >= fake)
+        correct += predicted == label
+        if max(fake, real) * 100 >= threshold:
+            answered += 1
+            answered_correct += predicted == label
+    # One claim at a time, like /api/verify
+    runs = []
+    for text in texts[:200]:
+        started = time.perf_counter()
+        model.predict_proba(vectorizer.transform([text]))
+        runs.append(time.perf_counter() - started)
+    return {
+        'accuracy': correct / len(claims),
+        'answered_locally': answered / len(claims),
+        'local_accuracy': answered_correct / answered if answered else None,
+        'ms_per_claim': statistics.median(runs) * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, default=3000, help='Training claims per language')
+    parser.add_argument('--test-rows', type=int, default=500, help='Evaluation claims per language')
+    parser.add_argument('--threshold', type=float, default=90, help='Tiered-mode local confidence threshold')
+    parser.add_argument('--json', help='Also write results to this file')
+    args = parser.parse_args()
+
+    test_sets = {language: make_claims(language, args.test_rows, seed=1) for language in LANGUAGES}
+    detected = sum(detect_language(text) == language for language, claims in test_sets.items() for text, _ in claims)
+    print(f"Language ID: {detected / (args.test_rows * len(LANGUAGES)):.1%} of test claims detected correctly")
+
+    results = {'language_id_accuracy': detected / (args.test_rows * len(LANGUAGES)), 'models': {}}
+    with tempfile.TemporaryDirectory() as workdir:
+        csv_path, history_path = write_training_data(workdir, args.rows)
+        variants = [('tfidf', []), ('tfidf+history', ['--history', history_path]),
+                    ('multilingual', ['--multilingual', '--history', history_path])]
+        print(f"\n{'model':<15} {'language':<8} {'accuracy':>9} {'answered locally':>17} "
+              f"{'local accuracy':>15} {'ms/claim':>9}")
+        for name, options in variants:
+            started = time.perf_counter()
+            model, vectorizer = train(workdir, csv_path, options)
+            results['models'][name] = {'train_seconds': time.perf_counter() - started, 'languages': {}}
+            for language, claims in test_sets.items():
+                scores = evaluate(model, vectorizer, claims, args.threshold)
+                results['models'][name]['languages'][language] = scores
+                local_accuracy = f"{scores['local_accuracy']:.1%}" if scores['local_accuracy'] is not None else '-'
+                print(f"{name:<15} {language:<8} {scores['accuracy']:>9.1%} {scores['answered_locally']:>17.1%} "
+                      f"{local_accuracy:>15} {scores['ms_per_claim']:>9.2f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
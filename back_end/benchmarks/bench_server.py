@@ -0,0 +1,225 @@
+"""Per-request overhead and throughput of the server profiles on the local-only path.
+
+Every run uses no LLM and no caches, so ``/api/verify`` is answered by the
+local model and what gets measured is the server around it: routing, JSON
+in and out, templates, instrumentation, the HTTP server itself.
+
+* In process: ``--requests`` claims through Flask's test client, in a fresh
+  process per configuration (the app reads its settings at import).
+  ``full+stdlib-json`` is the app with Flask's default JSON provider, i.e.
+  how responses were serialized before ``json_provider``.
+* Over HTTP: each server is started in a subprocess and loaded closed-loop
+  by ``--concurrency`` keep-alive connections for ``--duration`` seconds.
+  ``dev`` is plain ``python app.py`` (debugger and reloader on), ``api`` is
+  ``SERVER_PROFILE=api python app.py``, and ``gunicorn`` (``wsgi.py``) and
+  ``uvicorn`` (``asgi.py``) run with ``--workers`` processes when installed.
+
+The load generator shares the machine with the server, so compare servers
+with each other rather than reading the RPS as capacity.
+
+    python benchmarks/bench_server.py [--requests 3000] [--duration 10] [--concurrency 8] [--workers 2]
+        [--servers dev,api,gunicorn,uvicorn] [--json out.json]
+"""
+import argparse
+import http.client
+import importlib.util
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACK_END = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IN_PROCESS_CONFIGS = {
+    'full+stdlib-json': {'SERVER_PROFILE': 'full', 'STDLIB_JSON': '1'},
+    'full': {'SERVER_PROFILE': 'full'},
+    'api': {'SERVER_PROFILE': 'api'},
+}
+SERVERS = ('dev', 'api', 'gunicorn', 'uvicorn')
+CLAIM = 'Claim number {}: the water supply was poisoned, share before it is deleted'
+
+
+def child(requests):
+    sys.path.insert(0, BACK_END)
+    import app
+
+    if os.environ.get('STDLIB_JSON') == '1':
+        from flask.json.provider import DefaultJSONProvider
+        app.app.json = DefaultJSONProvider(app.app)
+
+    client = app.app.test_client()
+    for i in range(100):
+        client.post('/api/verify', json={'text': CLAIM.format(i)})
+    latencies = []
+    for i in range(requests):
+        started = time.perf_counter()
+        client.post('/api/verify', json={'text': CLAIM.format(i)})
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    print(json.dumps({
+        'mean_ms': sum(latencies) / len(latencies) * 1000,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p99_ms': latencies[int(len(latencies) * 0.99)] * 1000
+    }))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def server_command(name, port, workers):
+    if name in ('dev', 'api'):
+        return [sys.executable, 'app.py']
+    if name == 'gunicorn':
+        return [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--threads', '8',
+                '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', 'wsgi:application']
+    return [sys.executable, '-m', 'uvicorn', '--workers', str(workers), '--host', '127.0.0.1', '--port', str(port),
+            '--log-level', 'warning', '--no-access-log', 'asgi:application']
+
+
+def start_server(name, env, workers, log):
+    port = free_port()
+    env = dict(env, PORT=str(port), SERVER_PROFILE='full' if name == 'dev' else 'api')
+    # Own session so the reloader's child and the servers' workers go down with it
+    process = subprocess.Popen(server_command(name, port, workers), cwd=BACK_END, env=env, stdout=log,
+                               stderr=subprocess.STDOUT, start_new_session=True)
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'{name} exited during start-up; see {log.name}')
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/api/llm/stats')
+            conn.getresponse().read()
+            conn.close()
+            return process, port
+        except OSError:
+            time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f'{name} did not start within 120s')
+
+
+def stop_server(process):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=10)
+    except ProcessLookupError:
+        pass
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+
+def load(port, duration, concurrency):
+    """Closed-loop keep-alive POST /api/verify from ``concurrency`` threads; returns (rps, p50 ms, p99 ms, errors)."""
+    deadline = time.perf_counter() + duration
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def worker(worker_id):
+        conn = None
+        mine = []
+        i = 0
+        while time.perf_counter() < deadline:
+            body = json.dumps({'text': CLAIM.format(f'{worker_id}-{i}')})
+            i += 1
+            started = time.perf_counter()
+            try:
+                if conn is None:
+                    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                conn.request('POST', '/api/verify', body, {'Content-Type': 'application/json'})
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    raise OSError(response.status)
+                if response.will_close:
+                    conn.close()
+                    conn = None
+                mine.append(time.perf_counter() - started)
+            except (OSError, http.client.HTTPException):
+                with lock:
+                    errors[0] += 1
+                if conn is not None:
+                    conn.close()
+                conn = None
+        with lock:
+            latencies.extend(mine)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    if not latencies:
+        return 0.0, None, None, errors[0]
+    return (len(latencies) / elapsed, latencies[len(latencies) // 2] * 1000,
+            latencies[int(len(latencies) * 0.99)] * 1000, errors[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--requests', type=int, default=3000, help='In-process requests per configuration')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds of HTTP load per server')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent HTTP connections')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='gunicorn/uvicorn worker processes')
+    parser.add_argument('--servers', default='dev,api,gunicorn,uvicorn')
+    parser.add_argument('--json', help='Also write results to this file')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.requests)
+        return
+    servers = [name for name in args.servers.split(',') if name]
+    unknown = set(servers) - set(SERVERS)
+    if unknown:
+        parser.error(f"unknown servers: {', '.join(sorted(unknown))} (choose from {', '.join(SERVERS)})")
+
+    results = {'in_process': [], 'http': []}
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ, PERPLEXITY_API_KEY='', VERDICT_CACHE_PATH='', IMAGE_CACHE_PATH='',
+                   HISTORY_PATH=os.path.join(workdir, 'history.sqlite3'), FORENSICS_WORKERS='0',
+                   MODEL_REGISTRY_DIR=os.path.join(workdir, 'models'), MODEL_REGISTRY_POLL_SECONDS='0')
+
+        print(f"{'in process':>18} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9}")
+        for name, settings in IN_PROCESS_CONFIGS.items():
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', '--requests',
+                                  str(args.requests)], env=dict(env, **settings), capture_output=True, text=True,
+                                 check=True)
+            row = dict(json.loads(out.stdout.strip().splitlines()[-1]), config=name)
+            results['in_process'].append(row)
+            print(f"{name:>18} {row['mean_ms']:>9.3f} {row['p50_ms']:>9.3f} {row['p99_ms']:>9.3f}")
+
+        print(f"\n{'http':>18} {'rps':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        for name in servers:
+            if name in ('gunicorn', 'uvicorn') and importlib.util.find_spec(name) is None:
+                print(f"{name:>18}   skipped ({name} is not installed)")
+                continue
+            if name == 'uvicorn' and importlib.util.find_spec('a2wsgi') is None:
+                print(f"{name:>18}   skipped (a2wsgi is not installed)")
+                continue
+            with open(os.path.join(workdir, f'{name}.log'), 'w') as log:
+                process, port = start_server(name, env, args.workers, log)
+                try:
+                    rps, p50, p99, errors = load(port, args.duration, args.concurrency)
+                finally:
+                    stop_server(process)
+            results['http'].append({'server': name, 'rps': rps, 'p50_ms': p50, 'p99_ms': p99, 'errors': errors})
+            print(f"{name:>18} {rps:>9.1f} {p50 or 0:>9.2f} {p99 or 0:>9.2f} {errors:>7}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
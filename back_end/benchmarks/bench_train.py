@@ -0,0 +1,90 @@
+"""Check that streaming training keeps memory flat as the dataset grows.
+
+Writes synthetic CSVs shaped like Truth_Seeker_Model_Dataset.csv at each
+size, then runs ``train.py`` on them in a scratch directory (nothing is
+published) and reports wall time, peak RSS and holdout accuracy.
+
+    python benchmarks/bench_train.py [--rows 100000,400000,1600000] [--modes streaming,tfidf] [--json out.json]
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+BACK_END = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TRUE_WORDS = ['report', 'official', 'data', 'study', 'confirmed', 'according', 'percent', 'budget', 'senate', 'court']
+FAKE_WORDS = ['shocking', 'hoax', 'secret', 'exposed', 'miracle', 'banned', 'cover', 'truth', 'wake', 'plandemic']
+COMMON_WORDS = ['people', 'president', 'vaccine', 'election', 'new', 'year', 'state', 'million', 'said', 'today',
+                'news', 'world', 'health', 'money', 'tax', 'video', 'police', 'china', 'climate', 'water']
+AUTHORS = [f'Author {i}' for i in range(500)]
+
+
+def write_csv(path, rows, seed=0):
+    rng = random.Random(seed)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['author', 'statement', 'target', 'BinaryNumTarget', 'manual_keywords', 'tweet',
+                         '5_label_majority_answer', '3_label_majority_answer'])
+        for _ in range(rows):
+            label = rng.random() < 0.5
+            # Signal words are only a tendency, so the task is learnable but not trivial
+            signal = TRUE_WORDS if (rng.random() < 0.8) == label else FAKE_WORDS
+            words = rng.choices(COMMON_WORDS, k=rng.randint(6, 25)) + rng.choices(signal, k=rng.randint(1, 3))
+            rng.shuffle(words)
+            statement = ' '.join(rng.choices(COMMON_WORDS, k=8) + rng.choices(signal, k=1))
+            writer.writerow([rng.choice(AUTHORS), statement, label, int(label), ','.join(rng.choices(COMMON_WORDS, k=3)),
+                             ' '.join(words) + f' #{rng.randint(0, 100000)}', 'Agree', 'Agree'])
+
+
+def run(mode, csv_path, workdir):
+    command = [sys.executable, os.path.join(BACK_END, 'train.py'), csv_path, '--no-publish']
+    if mode == 'streaming':
+        command.append('--streaming')
+    started = time.perf_counter()
+    out = subprocess.run(command, cwd=workdir, capture_output=True, text=True,
+                         env=dict(os.environ, PYTHONPATH=BACK_END, PYTHONWARNINGS='ignore'))
+    elapsed = time.perf_counter() - started
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr)
+    peak = re.search(r'Peak memory: (\d+) MB', out.stdout)
+    accuracy = re.search(r'accuracy\s+([\d.]+)', out.stdout)
+    return {
+        'seconds': round(elapsed, 1),
+        'peak_rss_mb': int(peak.group(1)) if peak else None,
+        'accuracy': float(accuracy.group(1)) if accuracy else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', default='100000,400000,1600000')
+    parser.add_argument('--modes', default='streaming,tfidf')
+    parser.add_argument('--json', help='Also write results to this file')
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'rows':>9} {'mode':<10} {'seconds':>8} {'peak MB':>8} {'accuracy':>9}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in [int(r) for r in args.rows.split(',')]:
+            csv_path = os.path.join(workdir, f'{rows}.csv')
+            write_csv(csv_path, rows)
+            for mode in args.modes.split(','):
+                row = dict(run(mode, csv_path, workdir), rows=rows, mode=mode)
+                results.append(row)
+                print(f"{rows:>9} {mode:<10} {row['seconds']:>8} {row['peak_rss_mb']:>8} {row['accuracy']:>9}")
+            os.remove(csv_path)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
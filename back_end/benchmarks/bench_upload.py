@@ -0,0 +1,88 @@
+"""Cost of /api/analyze-image uploads with and without streaming validation.
+
+Sends each case through Flask's test client twice: with the app's
+``GuardedRequest`` (uploads checked while they stream in) and with a plain
+``flask.Request`` (spool everything, then let Pillow find out).  Forensics
+run inline and the image cache is off, so every request does the full work.
+
+    python benchmarks/bench_upload.py [--repeat 5] [--json out.json]
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import struct
+import sys
+import time
+import zlib
+
+BACK_END = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def png_bomb(width, height):
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    header = chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+    # A few MB of zeros deflate to a few KB; the pixels only exist once decoded
+    return b'\x89PNG\r\n\x1a\n' + header + chunk(b'IDAT', zlib.compress(b'\0' * 4_000_000)) + chunk(b'IEND', b'')
+
+
+def cases():
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(0)
+
+    def jpeg(width, height):
+        pixels = rng.integers(0, 255, (height // 8, width // 8, 3), dtype='uint8')
+        out = io.BytesIO()
+        Image.fromarray(pixels).resize((width, height), Image.Resampling.BILINEAR).save(out, 'JPEG', quality=85)
+        return out.getvalue()
+
+    return [
+        ('12MP JPEG', 'photo.jpg', jpeg(4000, 3000)),
+        ('120MP JPEG', 'panorama.jpg', jpeg(16000, 7500)),
+        ('PNG bomb 30000x30000', 'bomb.png', png_bomb(30000, 30000)),
+        ('not an image', 'archive.zip', b'PK\x03\x04' + os.urandom(4 * 1024 * 1024)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', help='Also write results to this file')
+    args = parser.parse_args()
+
+    os.environ.update(PERPLEXITY_API_KEY='', VERDICT_CACHE_PATH='', IMAGE_CACHE_PATH='', FORENSICS_WORKERS='0',
+                      MODEL_REGISTRY_POLL_SECONDS='0', MAX_UPLOAD_MB='64')
+    sys.path.insert(0, BACK_END)
+    import flask
+    import app
+
+    guarded = app.app.request_class
+    client = app.app.test_client()
+    results = []
+    print(f"{'case':>22} {'MB':>6} {'mode':>9} {'status':>6} {'median ms':>10}")
+    for name, filename, data in cases():
+        for mode, request_class in (('plain', flask.Request), ('streaming', guarded)):
+            app.app.request_class = request_class
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                response = client.post('/api/analyze-image', data={'image': (io.BytesIO(data), filename)},
+                                       content_type='multipart/form-data')
+                timings.append(time.perf_counter() - started)
+            row = {'case': name, 'bytes': len(data), 'mode': mode, 'status': response.status_code,
+                   'median_ms': statistics.median(timings) * 1000}
+            results.append(row)
+            print(f"{name:>22} {len(data) / 2 ** 20:>6.1f} {mode:>9} {row['status']:>6} {row['median_ms']:>10.1f}")
+    app.app.request_class = guarded
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+"""Local stand-in for the Perplexity chat completions API, for load tests.
+
+Answers ``POST /chat/completions`` (plain and ``stream: true``) with a canned
+verdict for the claim in the prompt.  The verdict is derived from a hash of
+the claim, so repeated claims get the same answer.  Latency, upstream errors,
+429s and the shape of the answer are configurable, the latter to match what
+``json_extract`` has to cope with from the real model: bare JSON, fenced
+blocks, prose around the object, trailing commas, and malformed or truncated
+output.  ``GET /stats`` reports what was served.
+
+Point the backend at it with ``PERPLEXITY_BASE_URL``::
+
+    python benchmarks/fake_perplexity.py --port 8765 --latency-ms 800 --error-rate 0.02 --noise mixed
+    PERPLEXITY_BASE_URL=http://127.0.0.1:8765 PERPLEXITY_API_KEY=fake python app.py
+
+``load_test.py`` starts one in-process through ``FakePerplexity``.
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+VERDICTS = ('TRUE', 'FALSE', 'MIXED', 'UNVERIFIABLE')
+NOISE_STYLES = ('bare', 'fence', 'fence_plain', 'prose', 'trailing_commas')
+STATEMENT = re.compile(r"Statement: '(.*)'\n", re.DOTALL)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Callers that time out hang up mid-response; that is expected under load
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+
+def canned_verdict(claim):
+    digest = hashlib.sha1(claim.encode('utf-8')).digest()
+    return {
+        'verdict': VERDICTS[digest[0] % len(VERDICTS)],
+        'confidence': f'{55 + digest[1] % 44}%',
+        'explanation': f'Canned verdict from the load-test stand-in for a {len(claim)}-character claim. ' * 3,
+        'historical_context': 'Similar claims circulated in print in the early 20th century.',
+        'first_verified': str(1850 + digest[2] % 170),
+        'last_updated': '2026',
+        'sources': [f'https://example.org/fact-check/{digest.hex()[:12]}', 'https://example.org/archive']
+    }
+
+
+def render(verdict, style):
+    body = json.dumps(verdict, indent=2, ensure_ascii=False)
+    if style == 'fence':
+        return f'```json\n{body}\n```'
+    if style == 'fence_plain':
+        return f'```\n{body}\n```'
+    if style == 'prose':
+        return f'Here is my fact-check of the statement:\n\n{body}\n\nLet me know if you need more sources.'
+    if style == 'trailing_commas':
+        return body.replace('"\n}', '",\n}').replace(']\n}', '],\n}')
+    return body
+
+
+def malformed(verdict, rng):
+    if rng.random() < 0.5:
+        return 'I could not find reliable information about this statement.'
+    body = json.dumps(verdict, indent=2)
+    return body[:len(body) // 2]
+
+
+class FakePerplexity:
+    """Threaded fake API server; ``start()`` returns its base URL."""
+
+    def __init__(self, host='127.0.0.1', port=0, latency_ms=800.0, jitter_ms=200.0, error_rate=0.0,
+                 rate_limit_rate=0.0, noise='mixed', malformed_rate=0.0, stream_chunk_chars=24,
+                 stream_delay_ms=15.0, seed=None):
+        if noise not in NOISE_STYLES + ('none', 'mixed'):
+            raise ValueError(f'unknown noise style {noise!r}')
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.noise = noise
+        self.malformed_rate = malformed_rate
+        self.stream_chunk_chars = stream_chunk_chars
+        self.stream_delay_ms = stream_delay_ms
+        self.counts = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-perplexity', daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts)
+
+    def _count(self, outcome):
+        with self._lock:
+            self.counts[outcome] = self.counts.get(outcome, 0) + 1
+
+    def _plan(self, claim):
+        """Decide this response: (status, content, delay seconds)."""
+        with self._lock:
+            roll = self._rng.random()
+            delay = max(0.0, self._rng.gauss(self.latency_ms, self.jitter_ms)) / 1000.0
+            style = self._rng.choice(NOISE_STYLES) if self.noise == 'mixed' else self.noise
+            broken = self._rng.random() < self.malformed_rate
+            rng = random.Random(self._rng.random())
+        if roll < self.rate_limit_rate:
+            return 429, None, 0.0
+        if roll < self.rate_limit_rate + self.error_rate:
+            return rng.choice((500, 502, 503)), None, delay / 4
+        verdict = canned_verdict(claim)
+        if broken:
+            return 200, malformed(verdict, rng), delay
+        return 200, render(verdict, 'bare' if style == 'none' else style), delay
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status, payload, headers=()):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.rstrip('/') == '/stats':
+                    self._send_json(200, fake.stats())
+                else:
+                    self._send_json(404, {'error': {'message': 'not found'}})
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    request = json.loads(self.rfile.read(length) or b'{}')
+                except ValueError:
+                    self._send_json(400, {'error': {'message': 'invalid JSON'}})
+                    return
+                if not self.path.rstrip('/').endswith('/chat/completions'):
+                    self._send_json(404, {'error': {'message': 'not found'}})
+                    return
+                messages = request.get('messages') or [{}]
+                prompt = str(messages[-1].get('content', ''))
+                match = STATEMENT.search(prompt)
+                claim = match.group(1) if match else prompt
+
+                status, content, delay = fake._plan(claim)
+                time.sleep(delay)
+                if status != 200:
+                    fake._count(str(status))
+                    headers = [('Retry-After', '1')] if status == 429 else []
+                    self._send_json(status, {'error': {'message': f'simulated upstream {status}'}}, headers)
+                    return
+                fake._count('ok')
+                model = request.get('model', 'sonar-pro')
+                if request.get('stream'):
+                    self._stream(model, content)
+                    return
+                self._send_json(200, {
+                    'id': 'fake-' + hashlib.sha1(content.encode('utf-8')).hexdigest()[:12],
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': model,
+                    'choices': [{'index': 0, 'finish_reason': 'stop',
+                                 'message': {'role': 'assistant', 'content': content}}],
+                    'usage': {'prompt_tokens': len(prompt) // 4, 'completion_tokens': len(content) // 4,
+                              'total_tokens': (len(prompt) + len(content)) // 4}
+                })
+
+            def _chunk(self, data):
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+                self.wfile.flush()
+
+            def _stream(self, model, content):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                try:
+                    step = max(1, fake.stream_chunk_chars)
+                    for start in range(0, len(content), step):
+                        chunk = {'id': 'fake', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                                 'model': model, 'choices': [{'index': 0, 'delta': {
+                                     'role': 'assistant', 'content': content[start:start + step]}}]}
+                        self._chunk(f'data: {json.dumps(chunk)}\n\n'.encode('utf-8'))
+                        time.sleep(fake.stream_delay_ms / 1000.0)
+                    self._chunk(b'data: [DONE]\n\n')
+                    self.wfile.write(b'0\r\n\r\n')
+                except (BrokenPipeError, ConnectionResetError):
+                    # The backend stops reading once the verdict object is complete
+                    self.close_connection = True
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=800, help='Mean response latency')
+    parser.add_argument('--jitter-ms', type=float, default=200, help='Standard deviation of the latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with a 5xx')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Share of requests answered with a 429')
+    parser.add_argument('--noise', default='mixed', choices=NOISE_STYLES + ('none', 'mixed'),
+                        help='How the verdict JSON is wrapped')
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help='Share of answers with no usable JSON')
+    parser.add_argument('--stream-delay-ms', type=float, default=15, help='Delay between streamed chunks')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    fake = FakePerplexity(args.host, args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                          error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate, noise=args.noise,
+                          malformed_rate=args.malformed_rate, stream_delay_ms=args.stream_delay_ms, seed=args.seed)
+    print(f"Fake Perplexity API listening on {fake.base_url}")
+    try:
+        fake.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
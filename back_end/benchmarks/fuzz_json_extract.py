@@ -0,0 +1,139 @@
+"""Mutation fuzzer for the LLM verdict extractor.
+
+Starting from the response corpus, each round wraps a verdict in random
+prose, fences, whitespace and stray braces or re-serializes it with the
+defects the extractor claims to repair (trailing commas, single quotes), and feeds it in random-sized chunks.  The
+extractor must never raise anything but json.JSONDecodeError, and for
+recoverable mutations must return the same verdict as the clean input.
+
+    python benchmarks/fuzz_json_extract.py [--rounds 20000] [--seed 0]
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_extract import JSONObjectExtractor, extract_verdict  # noqa: E402
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus', 'llm_responses')
+
+PROSE = [
+    "Here is the fact-check you asked for:",
+    "Based on my research {see below}, ",
+    "Note: sources may be incomplete.",
+    "I'd rate this claim as follows.",
+    "Hope this helps! Let me know {if} you have questions [1][2].",
+    "Note {it's complicated}: ",
+    "My take {well, 'tis a rumour}: ",
+    "",
+]
+
+
+def with_trailing_commas(verdict):
+    """Serialize ``verdict`` with trailing commas after the last member and list item."""
+    members = []
+    for key, value in verdict.items():
+        if isinstance(value, list) and value:
+            value_text = '[' + ', '.join(json.dumps(v, ensure_ascii=False) for v in value) + ',]'
+        else:
+            value_text = json.dumps(value, ensure_ascii=False)
+        members.append(f'{json.dumps(key)}: {value_text}')
+    return '{' + ', '.join(members) + ',}'
+
+
+def with_single_quotes(verdict):
+    """Serialize ``verdict`` Python-style, with single-quoted strings."""
+    return repr(verdict)
+
+
+def recoverable_mutations(rng, text, verdict):
+    """Mutations that must not change the extracted verdict."""
+    choice = rng.randrange(7)
+    if choice == 0:
+        return f"```json\n{text}\n```"
+    if choice == 1:
+        return f"{rng.choice(PROSE)}\n{text}\n{rng.choice(PROSE)}"
+    if choice == 2:
+        return with_trailing_commas(verdict)
+    if choice == 3:
+        return f"{rng.choice(PROSE)}\n{with_single_quotes(verdict)}"
+    if choice == 4:
+        return f"{rng.choice(PROSE)} {{stray}} ```\n{text}\n``` {rng.choice(PROSE)}"
+    if choice == 5:
+        return json.dumps(verdict, indent=rng.randrange(0, 4), ensure_ascii=rng.random() < 0.5)
+    return "\n" * rng.randrange(3) + text + " " * rng.randrange(3)
+
+
+def destructive_mutation(rng, text):
+    """Arbitrary damage: only checks that the extractor fails cleanly."""
+    chars = list(text)
+    for _ in range(rng.randrange(1, 6)):
+        if not chars:
+            break
+        i = rng.randrange(len(chars))
+        op = rng.randrange(3)
+        if op == 0:
+            del chars[i]
+        elif op == 1:
+            chars.insert(i, rng.choice('{}[]"\',:\\ \n'))
+        else:
+            chars[i] = rng.choice('{}"\'')
+    return ''.join(chars)
+
+
+def feed_in_chunks(rng, text):
+    extractor = JSONObjectExtractor()
+    i = 0
+    while i < len(text):
+        step = rng.randrange(1, 40)
+        extractor.feed(text[i:i + step])
+        i += step
+    return extractor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rounds', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    seeds = []
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, '*.txt'))):
+        with open(path, encoding='utf-8') as f:
+            content = f.read()
+        try:
+            verdict = extract_verdict(content)
+        except json.JSONDecodeError:
+            continue
+        # Re-serialize so mutations start from well-formed JSON
+        seeds.append((json.dumps(verdict, ensure_ascii=False), verdict))
+
+    mismatches = crashes = 0
+    for round_no in range(args.rounds):
+        text, expected = rng.choice(seeds)
+        recoverable = rng.random() < 0.7
+        mutated = recoverable_mutations(rng, text, expected) if recoverable else destructive_mutation(rng, text)
+        try:
+            got = feed_in_chunks(rng, mutated)
+            if recoverable and got != expected:
+                mismatches += 1
+                print(f"[{round_no}] mismatch for input {mutated!r}")
+        except json.JSONDecodeError:
+            if recoverable:
+                mismatches += 1
+                print(f"[{round_no}] failed to recover {mutated!r}")
+        except Exception as e:
+            crashes += 1
+            print(f"[{round_no}] crash {type(e).__name__}: {e} for input {mutated!r}")
+
+    print(f"{args.rounds} rounds, {len(seeds)} seeds: {mismatches} mismatches, {crashes} crashes")
+    sys.exit(1 if mismatches or crashes else 0)
+
+
+if __name__ == '__main__':
+    main()
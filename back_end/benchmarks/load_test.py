@@ -0,0 +1,542 @@
+"""Capacity and latency under load, against a local Perplexity stand-in.
+
+For each configuration and scenario a fresh backend is started in a
+subprocess (threaded Werkzeug server, empty caches, the configuration's
+environment overrides) and pointed at ``fake_perplexity.FakePerplexity``, so
+no request leaves the machine.  Requests are sent open-loop at ``--rps``:
+each one has a scheduled send time and its latency is measured from then,
+so a server that falls behind shows up in the percentiles instead of
+silently slowing the load down.
+
+Scenarios:
+  verify  POST /api/verify with one claim
+  stream  POST /api/verify/stream, reading the whole event stream
+  batch   POST /api/verify/batch with ``--batch-size`` claims
+  image   POST /api/analyze-image with an image from the corpus
+  index   POST / (the server-rendered form)
+
+Claims come from ``corpus/claims.txt`` with a Zipf-like popularity skew (a
+few rumors dominate, as when something goes viral); ``--fresh-rate`` of them
+get a unique suffix so they miss the caches.  Images are synthesized at
+start-up (camera JPEG with EXIF, edited JPEG, PNG screenshot, recompressed
+social-media JPEG) unless ``--image-dir`` is given; fresh images get random
+trailing bytes, i.e. a re-shared copy with a new hash.
+
+Throughput, p50/p95/p99 latency, and the CPU time and peak RSS of the
+backend's process tree (forensics workers included; Linux only) are
+reported per run.  ``--json`` saves them with the git commit, and
+``--baseline`` compares against an earlier file and exits non-zero when a
+run regressed by more than ``--tolerance``.
+
+    python benchmarks/load_test.py [--scenarios verify,batch,image,index] [--rps 20] [--duration 30]
+        [--config baseline --config tiered --config name:KEY=VALUE,KEY=VALUE]
+        [--llm-latency-ms 800] [--llm-error-rate 0.02] [--json out.json] [--baseline old.json]
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+
+from fake_perplexity import NOISE_STYLES, FakePerplexity
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+BACK_END = os.path.dirname(BENCHMARKS)
+CLAIMS_PATH = os.path.join(BENCHMARKS, 'corpus', 'claims.txt')
+SCENARIOS = ('verify', 'stream', 'batch', 'image', 'index')
+PRESETS = {
+    'baseline': {},
+    'tiered': {'VERIFY_MODE': 'tiered'},
+    'no-cache': {'VERDICT_CACHE_PATH': '', 'IMAGE_CACHE_PATH': ''},
+    'inline-forensics': {'FORENSICS_WORKERS': '0'},
+    'no-metrics': {'METRICS_ENABLED': '0'},
+}
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+
+def load_claims(path):
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def make_images(seed=0):
+    """A small corpus of synthetic uploads: {name: (bytes, mimetype)}."""
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+
+    def photo(width, height):
+        # Smooth gradients plus sensor-like noise compress like a real photo, unlike flat colors or pure noise
+        y, x = np.mgrid[0:height, 0:width]
+        base = np.stack([(x * 255 // width), (y * 255 // height), ((x + y) * 127 // (width + height)) + 64], axis=-1)
+        noise = rng.normal(0, 12, (height, width, 3))
+        return Image.fromarray(np.clip(base + noise, 0, 255).astype('uint8'))
+
+    def encode(image, fmt, **options):
+        out = io.BytesIO()
+        image.save(out, fmt, **options)
+        return out.getvalue()
+
+    images = {}
+
+    camera = photo(3000, 2000)
+    exif = Image.Exif()
+    exif[0x010F] = 'Canon'
+    exif[0x0110] = 'Canon EOS 80D'
+    exif[0x0132] = '2024:06:14 10:31:07'
+    images['camera.jpg'] = (encode(camera, 'JPEG', quality=92, exif=exif), 'image/jpeg')
+
+    edited = photo(1600, 1200)
+    patch = Image.open(io.BytesIO(encode(photo(400, 300), 'JPEG', quality=60)))
+    edited.paste(patch, (600, 450))
+    exif = Image.Exif()
+    exif[0x0131] = 'Adobe Photoshop 25.0'
+    images['edited.jpg'] = (encode(edited, 'JPEG', quality=90, exif=exif), 'image/jpeg')
+
+    screenshot = np.full((1920, 1080, 3), 245, dtype='uint8')
+    for row in range(120, 1800, 90):
+        screenshot[row:row + 28, 60:60 + int(rng.integers(300, 960))] = 40
+    screenshot[0:100] = (29, 161, 242)
+    images['screenshot.png'] = (encode(Image.fromarray(screenshot), 'PNG'), 'image/png')
+
+    images['social.jpg'] = (encode(photo(960, 960), 'JPEG', quality=70), 'image/jpeg')
+    return images
+
+
+def load_image_dir(path):
+    mimetypes = {'.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.png': 'image/png', '.webp': 'image/webp'}
+    images = {}
+    for name in sorted(os.listdir(path)):
+        mimetype = mimetypes.get(os.path.splitext(name)[1].lower())
+        if mimetype:
+            with open(os.path.join(path, name), 'rb') as f:
+                images[name] = (f.read(), mimetype)
+    if not images:
+        raise SystemExit(f'No .jpg/.png/.webp images in {path}')
+    return images
+
+
+class Workload:
+    """Picks claims and images with a popularity skew; thread-safe."""
+
+    def __init__(self, claims, images, skew, fresh_rate, batch_size, seed):
+        self.claims = claims
+        self.images = list(images.items())
+        self.fresh_rate = fresh_rate
+        self.batch_size = batch_size
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        order = list(range(len(claims)))
+        self._rng.shuffle(order)
+        self._order = order
+        self._weights = [1.0 / (rank + 1) ** skew for rank in range(len(claims))]
+
+    def claim(self):
+        with self._lock:
+            index = self._rng.choices(self._order, self._weights)[0]
+            fresh = self._rng.random() < self.fresh_rate
+        claim = self.claims[index]
+        return f'{claim} ({uuid.uuid4().hex[:8]})' if fresh else claim
+
+    def image(self):
+        with self._lock:
+            name, (data, mimetype) = self._rng.choice(self.images)
+            fresh = self._rng.random() < self.fresh_rate
+        return name, data + os.urandom(16) if fresh else data, mimetype
+
+    def request(self, scenario, session, base_url, timeout):
+        if scenario == 'verify':
+            return session.post(f'{base_url}/api/verify', json={'text': self.claim()}, timeout=timeout)
+        if scenario == 'stream':
+            response = session.post(f'{base_url}/api/verify/stream', json={'text': self.claim()}, stream=True,
+                                    timeout=timeout)
+            for _ in response.iter_content(chunk_size=None):
+                pass
+            return response
+        if scenario == 'batch':
+            claims = [self.claim() for _ in range(self.batch_size)]
+            return session.post(f'{base_url}/api/verify/batch', json={'claims': claims}, timeout=timeout)
+        if scenario == 'image':
+            name, data, mimetype = self.image()
+            return session.post(f'{base_url}/api/analyze-image', files={'image': (name, data, mimetype)},
+                                timeout=timeout)
+        if scenario == 'index':
+            return session.post(f'{base_url}/', data={'text': self.claim()}, timeout=timeout)
+        raise ValueError(f'unknown scenario {scenario!r}')
+
+
+def process_tree(pid):
+    """``pid`` and all of its descendants (Linux /proc)."""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The command name may contain spaces, so split after its closing parenthesis
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, ()))
+    return tree
+
+
+def cpu_seconds(pids):
+    total = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        # utime and stime are fields 14 and 15 of /proc/<pid>/stat, i.e. 11 and 12 after the name
+        total += int(fields[11]) + int(fields[12])
+    return total / CLOCK_TICKS
+
+
+def rss_bytes(pids):
+    total = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            continue
+    return total
+
+
+class ResourceSampler:
+    """Samples the CPU time and RSS of a process tree in the background while a run is going."""
+
+    def __init__(self, pid, interval=0.25):
+        self.pid = pid
+        self.interval = interval
+        self.supported = os.path.isdir(f'/proc/{pid}')
+        self.peak_rss = 0
+        self.cpu = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        pids = process_tree(self.pid)
+        self.peak_rss = max(self.peak_rss, rss_bytes(pids))
+        # Exited workers take their CPU time with them, so keep the highest total seen
+        self.cpu = max(self.cpu, cpu_seconds(pids))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        if self.supported:
+            self._sample()
+            self.cpu_start = self.cpu
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.supported:
+            self._stop.set()
+            self._thread.join()
+            self._sample()
+
+    def report(self, elapsed):
+        if not self.supported:
+            return {'cpu_seconds': None, 'cpu_percent': None, 'rss_peak_mb': None}
+        used = self.cpu - self.cpu_start
+        return {
+            'cpu_seconds': round(used, 3),
+            'cpu_percent': round(used / elapsed * 100, 1),
+            'rss_peak_mb': round(self.peak_rss / 2 ** 20, 1)
+        }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def serve(port):
+    sys.path.insert(0, BACK_END)
+    import app
+
+    app.app.run(host='127.0.0.1', port=port, threaded=True, debug=False, use_reloader=False)
+
+
+def start_backend(env, workdir):
+    port = free_port()
+    log = open(os.path.join(workdir, 'backend.log'), 'w')
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', str(port)], env=env,
+                               cwd=BACK_END, stdout=log, stderr=subprocess.STDOUT)
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            log.close()
+            with open(log.name) as f:
+                raise RuntimeError(f'Backend exited during start-up:\n{f.read()[-2000:]}')
+        try:
+            requests.get(f'{base_url}/api/llm/stats', timeout=1)
+            return process, base_url, log
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError('Backend did not start within 120s')
+
+
+def stop_backend(process, log):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+    log.close()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def drive(workload, scenario, base_url, rps, duration, max_in_flight, timeout):
+    """Open-loop load: returns [(status, latency seconds)] and the wall time until the last response."""
+    local = threading.local()
+
+    def send(scheduled):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        try:
+            status = workload.request(scenario, session, base_url, timeout).status_code
+        except requests.RequestException as e:
+            status = type(e).__name__
+        return status, time.perf_counter() - scheduled
+
+    total = max(1, int(rps * duration))
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        started = time.perf_counter() + 0.05
+        futures = []
+        for i in range(total):
+            scheduled = started + i / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(executor.submit(send, scheduled))
+        outcomes = [future.result() for future in futures]
+    return outcomes, time.perf_counter() - started
+
+
+def summarize(outcomes, elapsed):
+    statuses = {}
+    ok_latencies = []
+    for status, latency in outcomes:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+        if isinstance(status, int) and status < 400:
+            ok_latencies.append(latency)
+    ok_latencies.sort()
+    ms = lambda value: round(value * 1000, 2) if value is not None else None
+    return {
+        'requests': len(outcomes),
+        'ok': len(ok_latencies),
+        'error_rate': round(1 - len(ok_latencies) / len(outcomes), 4),
+        'status_counts': statuses,
+        'throughput_rps': round(len(ok_latencies) / elapsed, 2),
+        'latency_ms': {
+            'mean': ms(sum(ok_latencies) / len(ok_latencies)) if ok_latencies else None,
+            'p50': ms(percentile(ok_latencies, 0.50)),
+            'p95': ms(percentile(ok_latencies, 0.95)),
+            'p99': ms(percentile(ok_latencies, 0.99)),
+            'max': ms(ok_latencies[-1]) if ok_latencies else None
+        }
+    }
+
+
+def fmt(value, spec):
+    return format(value, spec) if value is not None else format('-', spec.split('.')[0])
+
+
+def parse_config(spec):
+    """``preset`` or ``name:KEY=VALUE,KEY=VALUE`` (a name that is also a preset starts from it)."""
+    name, _, assignments = spec.partition(':')
+    if not assignments and name not in PRESETS:
+        raise argparse.ArgumentTypeError(f'unknown preset {name!r} (have {", ".join(PRESETS)})')
+    settings = dict(PRESETS.get(name, {}))
+    for assignment in filter(None, assignments.split(',')):
+        key, sep, value = assignment.partition('=')
+        if not sep:
+            raise argparse.ArgumentTypeError(f'expected KEY=VALUE, got {assignment!r}')
+        settings[key.strip()] = value
+    return name, settings
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BACK_END, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=BACK_END,
+                               capture_output=True, text=True).stdout.strip()
+        return commit + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """Print a comparison against ``baseline`` and return the regressions found."""
+    previous = {(row['config'], row['scenario']): row for row in baseline['results']}
+    regressions = []
+    print(f"\nAgainst baseline {baseline['meta'].get('commit')} (tolerance {tolerance:.0%}):")
+    for row in results:
+        old = previous.get((row['config'], row['scenario']))
+        if old is None:
+            continue
+        checks = []
+        old_p95, new_p95 = old['latency_ms']['p95'], row['latency_ms']['p95']
+        # A few milliseconds either way is noise on the fast paths
+        if old_p95 is not None and new_p95 is not None and new_p95 > old_p95 * (1 + tolerance) and \
+                new_p95 - old_p95 > 5:
+            checks.append(f'p95 {old_p95:.1f} -> {new_p95:.1f} ms')
+        if row['throughput_rps'] < old['throughput_rps'] * (1 - tolerance):
+            checks.append(f"throughput {old['throughput_rps']:.2f} -> {row['throughput_rps']:.2f} rps")
+        if row['error_rate'] > old['error_rate'] + 0.01:
+            checks.append(f"errors {old['error_rate']:.1%} -> {row['error_rate']:.1%}")
+        label = f"{row['config']}/{row['scenario']}"
+        if checks:
+            regressions.append((label, checks))
+            print(f"  REGRESSION {label}: {'; '.join(checks)}")
+        else:
+            print(f"  ok         {label}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', default='verify,batch,image,index',
+                        help=f"Comma-separated, from {','.join(SCENARIOS)}")
+    parser.add_argument('--config', action='append', type=parse_config, dest='configs',
+                        help=f"Preset ({', '.join(PRESETS)}) or name:KEY=VALUE,...; repeatable")
+    parser.add_argument('--rps', type=float, default=20, help='Target requests per second')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds of load per run')
+    parser.add_argument('--max-in-flight', type=int, default=256, help='Client-side concurrency cap')
+    parser.add_argument('--timeout', type=float, default=60, help='Per-request timeout in seconds')
+    parser.add_argument('--batch-size', type=int, default=10)
+    parser.add_argument('--skew', type=float, default=1.1, help='Zipf exponent of claim popularity (0 = uniform)')
+    parser.add_argument('--fresh-rate', type=float, default=0.3, help='Share of claims/images made unique')
+    parser.add_argument('--claims', default=CLAIMS_PATH, help='Claims file, one per line')
+    parser.add_argument('--image-dir', help='Use these images instead of the synthetic corpus')
+    parser.add_argument('--llm-latency-ms', type=float, default=800)
+    parser.add_argument('--llm-jitter-ms', type=float, default=200)
+    parser.add_argument('--llm-error-rate', type=float, default=0.0)
+    parser.add_argument('--llm-rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--llm-noise', default='mixed', choices=NOISE_STYLES + ('none', 'mixed'))
+    parser.add_argument('--llm-malformed-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='Write results to this file')
+    parser.add_argument('--baseline', help='Earlier --json output to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='Allowed relative regression')
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve)
+        return
+
+    scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+    configs = args.configs or [parse_config('baseline')]
+    claims = load_claims(args.claims)
+    images = load_image_dir(args.image_dir) if args.image_dir else (make_images(args.seed) if 'image' in scenarios
+                                                                    else {})
+
+    fake = FakePerplexity(latency_ms=args.llm_latency_ms, jitter_ms=args.llm_jitter_ms,
+                          error_rate=args.llm_error_rate, rate_limit_rate=args.llm_rate_limit_rate,
+                          noise=args.llm_noise, malformed_rate=args.llm_malformed_rate, seed=args.seed)
+    fake_url = fake.start()
+
+    results = []
+    print(f"{'config':>18} {'scenario':>8} {'rps':>7} {'ok':>6} {'err%':>6} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'cpu%':>6} {'rss MB':>7}")
+    try:
+        for name, settings in configs:
+            for scenario in scenarios:
+                with tempfile.TemporaryDirectory() as workdir:
+                    # Each run gets empty caches; limits are lifted unless the configuration sets them
+                    env = dict(os.environ, PERPLEXITY_API_KEY='fake-load-test', PERPLEXITY_BASE_URL=fake_url,
+                               VERDICT_CACHE_PATH=os.path.join(workdir, 'verdicts.sqlite3'),
+                               IMAGE_CACHE_PATH=os.path.join(workdir, 'images.sqlite3'),
+                               MODEL_AB_LOG_PATH='', MODEL_REGISTRY_POLL_SECONDS='0',
+                               CLIENT_RATE_PER_MINUTE='0', LLM_RATE_PER_MINUTE='1000000',
+                               LLM_RATE_BURST='1000000', BATCH_MAX_CLAIMS=str(max(50, args.batch_size)))
+                    env.update(settings)
+                    process, base_url, log = start_backend(env, workdir)
+                    workload = Workload(claims, images, args.skew, args.fresh_rate, args.batch_size, args.seed)
+                    llm_before = fake.stats()
+                    try:
+                        with ResourceSampler(process.pid) as sampler:
+                            outcomes, elapsed = drive(workload, scenario, base_url, args.rps, args.duration,
+                                                      args.max_in_flight, args.timeout)
+                    finally:
+                        stop_backend(process, log)
+                    llm_after = fake.stats()
+                    row = dict(config=name, scenario=scenario, settings=settings, target_rps=args.rps,
+                               duration_s=round(elapsed, 2), **summarize(outcomes, elapsed),
+                               server=sampler.report(elapsed),
+                               fake_llm={key: llm_after[key] - llm_before.get(key, 0) for key in llm_after})
+                results.append(row)
+                latency, server = row['latency_ms'], row['server']
+                print(f"{name:>18} {scenario:>8} {row['throughput_rps']:>7.2f} {row['ok']:>6} "
+                      f"{row['error_rate'] * 100:>6.1f} {fmt(latency['p50'], '>9.1f')} {fmt(latency['p95'], '>9.1f')} "
+                      f"{fmt(latency['p99'], '>9.1f')} {fmt(server['cpu_percent'], '>6.1f')} "
+                      f"{fmt(server['rss_peak_mb'], '>7.1f')}")
+    finally:
+        fake.stop()
+
+    output = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'args': {key: value for key, value in vars(args).items() if key not in ('serve', 'configs')}
+        },
+        'results': results
+    }
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(output, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""Compact, memory-mapped export of the local TF-IDF + LogisticRegression model.
+
+Unpickling ``vectorizer.pkl`` and ``model.pkl`` imports scikit-learn and
+gives every worker process its own Python dict for the vocabulary.  The
+export written here is a directory of flat ``.npy`` arrays plus a small JSON
+header:
+
+* ``hashes.npy`` / ``feature_ids.npy``: the vocabulary as sorted 64-bit term
+  hashes and the feature index of each, looked up with ``np.searchsorted``;
+* ``terms.bin`` / ``term_offsets.npy``: the UTF-8 terms by feature index, used
+  to confirm hash hits so a collision can never change a prediction;
+* ``idf.npy`` and ``coef.npy``: the IDF weights and model coefficients.
+
+The arrays are opened with ``mmap_mode='r'``, so all workers on a host share
+one copy through the page cache and startup does no parsing at all.
+``CompactModel`` reproduces ``TfidfVectorizer.transform`` and
+``LogisticRegression.predict_proba`` with NumPy alone.
+"""
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+import scipy.sparse as sp
+
+FORMAT_VERSION = 1
+META_FILE = 'meta.json'
+ARRAY_FILES = ('hashes', 'feature_ids', 'term_offsets', 'idf', 'coef')
+
+
+def term_hash(term):
+    return int.from_bytes(hashlib.blake2b(term.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def file_sha256(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def export_model(vectorizer, model, directory, sources=()):
+    """Write ``vectorizer`` + ``model`` to ``directory``; ``sources`` are recorded to detect stale exports."""
+    if not hasattr(vectorizer, 'vocabulary_') or not hasattr(vectorizer, 'idf_'):
+        raise ValueError('only a fitted TfidfVectorizer can be exported')
+    params = vectorizer.get_params()
+    if params['analyzer'] != 'word' or params['tokenizer'] is not None or params['preprocessor'] is not None:
+        raise ValueError('only the default word analyzer can be exported')
+    if params['strip_accents'] is not None:
+        raise ValueError('strip_accents is not supported by the compact model')
+    if len(model.classes_) != 2 or model.coef_.shape[0] != 1:
+        raise ValueError('only binary logistic regression can be exported')
+
+    n_features = len(vectorizer.vocabulary_)
+    terms = [None] * n_features
+    for term, index in vectorizer.vocabulary_.items():
+        terms[index] = term
+    encoded = [term.encode('utf-8') for term in terms]
+    offsets = np.zeros(n_features + 1, dtype=np.uint32)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+
+    hashes = np.array([term_hash(term) for term in terms], dtype=np.uint64)
+    order = np.argsort(hashes, kind='stable')
+    stop_words = vectorizer.get_stop_words()
+
+    os.makedirs(directory, exist_ok=True)
+    arrays = {
+        'hashes': hashes[order],
+        'feature_ids': order.astype(np.int32),
+        'term_offsets': offsets,
+        'idf': np.asarray(vectorizer.idf_ if params['use_idf'] else np.ones(n_features), dtype=np.float64),
+        'coef': np.asarray(model.coef_[0], dtype=np.float64)
+    }
+    for name, values in arrays.items():
+        np.save(os.path.join(directory, f'{name}.npy'), values)
+    with open(os.path.join(directory, 'terms.bin'), 'wb') as f:
+        f.write(b''.join(encoded))
+
+    meta = {
+        'format_version': FORMAT_VERSION,
+        'n_features': n_features,
+        'lowercase': params['lowercase'],
+        'token_pattern': params['token_pattern'],
+        'stop_words': sorted(stop_words) if stop_words else [],
+        'ngram_range': list(params['ngram_range']),
+        'binary': params['binary'],
+        'sublinear_tf': params['sublinear_tf'],
+        'norm': params['norm'],
+        'intercept': float(model.intercept_[0]),
+        'classes': [int(c) if isinstance(c, (int, np.integer)) else str(c) for c in model.classes_],
+        'sources': {os.path.basename(p): file_sha256(p) for p in sources if os.path.exists(p)}
+    }
+    # The header goes last so a half-written export is never picked up
+    with open(os.path.join(directory, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=1)
+    return meta
+
+
+def is_current(directory, sources):
+    """True if ``directory`` holds an export made from exactly these ``sources``."""
+    try:
+        with open(os.path.join(directory, META_FILE)) as f:
+            recorded = json.load(f).get('sources', {})
+    except (OSError, ValueError):
+        return False
+    for path in sources:
+        if not os.path.exists(path):
+            continue
+        if recorded.get(os.path.basename(path)) != file_sha256(path):
+            return False
+    return True
+
+
+class CompactModel:
+    """Drop-in for the fitted vectorizer and model: provides ``transform``, ``predict_proba`` and ``predict``."""
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, META_FILE)) as f:
+            meta = json.load(f)
+        if meta.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"unsupported compact model format {meta.get('format_version')!r}")
+        self.meta = meta
+        self.n_features = meta['n_features']
+        self.classes_ = np.array(meta['classes'])
+        self.intercept = meta['intercept']
+        self._token = re.compile(meta['token_pattern'])
+        self._stop_words = frozenset(meta['stop_words'])
+        for name in ARRAY_FILES:
+            setattr(self, f'_{name}', np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r'))
+        self._terms = np.memmap(os.path.join(directory, 'terms.bin'), dtype=np.uint8, mode='r') \
+            if self._term_offsets[-1] else np.zeros(0, dtype=np.uint8)
+
+    def _analyze(self, text):
+        if self.meta['lowercase']:
+            text = text.lower()
+        tokens = [t for t in self._token.findall(text) if t not in self._stop_words]
+        low, high = self.meta['ngram_range']
+        if (low, high) == (1, 1):
+            return tokens
+        grams = []
+        for n in range(low, high + 1):
+            grams.extend(' '.join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return grams
+
+    def _lookup(self, terms):
+        """Map each term to its feature index, or -1 if it is not in the vocabulary."""
+        if not terms:
+            return np.zeros(0, dtype=np.int64)
+        queries = np.array([term_hash(t) for t in terms], dtype=np.uint64)
+        positions = np.searchsorted(self._hashes, queries)
+        positions[positions == len(self._hashes)] = 0
+        found = self._hashes[positions] == queries
+        features = np.where(found, self._feature_ids[positions], -1).astype(np.int64)
+        for i in np.flatnonzero(found):
+            feature = features[i]
+            start, end = self._term_offsets[feature], self._term_offsets[feature + 1]
+            if self._terms[start:end].tobytes() != terms[i].encode('utf-8'):
+                features[i] = -1
+        return features
+
+    def transform(self, texts):
+        """TF-IDF rows for ``texts`` as a CSR matrix, identical to the source vectorizer's output."""
+        docs = [self._analyze(str(t)) for t in texts]
+        vocabulary = list({term for doc in docs for term in doc})
+        feature_of = dict(zip(vocabulary, self._lookup(vocabulary).tolist()))
+
+        indptr = [0]
+        indices = []
+        counts = []
+        for doc in docs:
+            row = {}
+            for term in doc:
+                feature = feature_of[term]
+                if feature >= 0:
+                    row[feature] = row.get(feature, 0) + 1
+            for feature in sorted(row):
+                indices.append(feature)
+                counts.append(row[feature])
+            indptr.append(len(indices))
+
+        indices = np.array(indices, dtype=np.int32)
+        data = np.array(counts, dtype=np.float64)
+        indptr = np.array(indptr, dtype=np.int32)
+        if self.meta['binary']:
+            data[:] = 1.0
+        elif self.meta['sublinear_tf']:
+            data = np.log(data) + 1.0
+        data *= self._idf[indices]
+
+        norm = self.meta['norm']
+        if norm and len(data):
+            rows = np.repeat(np.arange(len(docs)), np.diff(indptr))
+            values = data * data if norm == 'l2' else np.abs(data)
+            totals = np.bincount(rows, weights=values, minlength=len(docs))
+            if norm == 'l2':
+                totals = np.sqrt(totals)
+            totals[totals == 0.0] = 1.0
+            data /= totals[rows]
+        return sp.csr_matrix((data, indices, indptr), shape=(len(docs), self.n_features))
+
+    def decision_function(self, X):
+        X = sp.csr_matrix(X)
+        rows = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))
+        weights = X.data * self._coef[X.indices]
+        return np.bincount(rows, weights=weights, minlength=X.shape[0]) + self.intercept
+
+    def predict_proba(self, X):
+        positive = 1.0 / (1.0 + np.exp(-self.decision_function(X)))
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict(self, X):
+        return self.classes_[(self.decision_function(X) > 0).astype(int)]
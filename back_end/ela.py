@@ -0,0 +1,87 @@
+"""Bounded-memory building blocks for Error Level Analysis (ELA).
+
+The original ELA converted the whole upload to RGB, re-encoded it as one
+full-resolution JPEG, decoded that again and diffed the two, so a 50 MP
+photo held several full-frame copies at once.  The ``ela`` forensic signal
+(see ``forensic_signals``) is built on these helpers instead:
+
+* ``prepare_analysis_image`` decodes at a configurable resolution
+  (``max_pixels``), using JPEG ``draft`` mode so large JPEGs are decoded
+  already downscaled by the codec, and refuses images whose decode alone
+  would exceed ``max_memory_bytes``;
+* ``recompression_errors`` recompresses and diffs tile by tile, at every
+  quality the signal needs, so only one tile's copies are alive at a time
+  (tiles are multiples of the 16 px JPEG MCU, so block boundaries line up
+  with a whole-image pass).
+"""
+import io
+import math
+
+import numpy as np
+from PIL import Image
+
+DEFAULT_MAX_PIXELS = 4_000_000
+DEFAULT_MAX_MEMORY_BYTES = 256 * 1024 * 1024
+DEFAULT_TILE_SIZE = 256
+HOTSPOT_THRESHOLD = 0.06
+
+
+def summarize(score):
+    if score < 0.02:
+        return "Low compression anomalies; image appears structurally consistent."
+    if score < 0.06:
+        return "Moderate localized anomalies; possible light editing."
+    return "Strong localized anomalies; potential heavy editing or compositing detected."
+
+
+def prepare_analysis_image(image, max_pixels=DEFAULT_MAX_PIXELS, max_memory_bytes=DEFAULT_MAX_MEMORY_BYTES):
+    """Decode ``image`` as RGB at no more than ``max_pixels``; returns (rgb_image, scale).
+
+    Must be called before the image's pixels are loaded for JPEG draft decoding
+    to apply.  Raises MemoryError if the decode would exceed ``max_memory_bytes``.
+    """
+    width, height = image.size
+    scale = min(1.0, math.sqrt(max_pixels / float(width * height)))
+    target = (max(1, int(width * scale)), max(1, int(height * scale)))
+
+    if image.format == 'JPEG' and scale < 1.0:
+        # Let libjpeg do a 1/2, 1/4 or 1/8 DCT-domain downscale instead of decoding every pixel
+        image.draft('RGB', target)
+
+    decoded_bytes = image.size[0] * image.size[1] * max(3, len(image.getbands()))
+    if decoded_bytes > max_memory_bytes:
+        raise MemoryError(
+            f"decoding {image.size[0]}x{image.size[1]} would need {decoded_bytes // (1024 * 1024)} MB "
+            f"(cap {max_memory_bytes // (1024 * 1024)} MB)"
+        )
+
+    rgb = image.convert('RGB')
+    if rgb.size != target and scale < 1.0:
+        rgb = rgb.resize(target, Image.Resampling.BILINEAR, reducing_gap=2.0)
+    return rgb, scale
+
+
+def recompression_errors(rgb, qualities, tile_size=DEFAULT_TILE_SIZE):
+    """Yield (box, {quality: errors}) for each tile of ``rgb``, recompressing one tile at a time.
+
+    ``box`` is the tile's (left, top, right, bottom) and ``errors`` the per-pixel
+    |original - recompressed at quality| summed over the channels (uint16, 0-765).
+    """
+    width, height = rgb.size
+    tile_size = max(16, tile_size - tile_size % 16)
+    for top in range(0, height, tile_size):
+        for left in range(0, width, tile_size):
+            box = (left, top, min(left + tile_size, width), min(top + tile_size, height))
+            tile = rgb.crop(box)
+            pixels = np.asarray(tile)
+            errors = {}
+            for quality in qualities:
+                buffer = io.BytesIO()
+                tile.save(buffer, 'JPEG', quality=quality)
+                buffer.seek(0)
+                recompressed = np.asarray(Image.open(buffer).convert('RGB'))
+                # uint8 max - min avoids widening the tile to a signed type
+                diff = np.maximum(pixels, recompressed)
+                diff -= np.minimum(pixels, recompressed)
+                errors[quality] = diff[..., 0].astype(np.uint16) + diff[..., 1] + diff[..., 2]
+            yield box, errors
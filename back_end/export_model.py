@@ -0,0 +1,54 @@
+"""Export model.pkl + vectorizer.pkl to the compact memory-mapped format and check parity.
+
+    python export_model.py [--out model_compact] [--check 5000]
+
+app.py loads the export instead of the pickles when it was made from the
+current model.pkl and vectorizer.pkl; re-run this after retraining.
+"""
+import argparse
+import os
+import random
+import time
+
+import joblib
+import numpy as np
+
+from compact_model import CompactModel, export_model
+
+here = os.path.dirname(os.path.abspath(__file__))
+parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+parser.add_argument('--model', default=os.path.join(here, 'model.pkl'))
+parser.add_argument('--vectorizer', default=os.path.join(here, 'vectorizer.pkl'))
+parser.add_argument('--out', default=os.path.join(here, 'model_compact'))
+parser.add_argument('--check', type=int, default=5000, help='Synthetic claims used to compare predictions')
+args = parser.parse_args()
+
+model = joblib.load(args.model)
+vectorizer = joblib.load(args.vectorizer)
+meta = export_model(vectorizer, model, args.out, sources=[args.model, args.vectorizer])
+size = sum(os.path.getsize(os.path.join(args.out, f)) for f in os.listdir(args.out))
+print(f"Exported {meta['n_features']} features to {args.out} ({size / 1024:.0f} KiB)")
+
+if args.check:
+    # Claims mixing vocabulary terms, stop words, unknown words, casing and punctuation
+    rng = random.Random(0)
+    vocabulary = list(vectorizer.vocabulary_)
+    filler = ['the', 'and', 'BREAKING', 'zzyzx', 'Ünïcode', 'http://t.co/x', '!!!', '2024', "don't", 'é']
+    texts = ['', '!!!', 'the and of']
+    for _ in range(args.check):
+        words = [rng.choice(vocabulary if rng.random() < 0.6 else filler) for _ in range(rng.randint(1, 40))]
+        texts.append(' '.join(w.upper() if rng.random() < 0.1 else w for w in words))
+
+    compact = CompactModel(args.out)
+    started = time.perf_counter()
+    expected = model.predict_proba(vectorizer.transform(texts))
+    sklearn_s = time.perf_counter() - started
+    started = time.perf_counter()
+    actual = compact.predict_proba(compact.transform(texts))
+    compact_s = time.perf_counter() - started
+
+    diff = float(np.abs(expected - actual).max())
+    print(f"Parity on {len(texts)} claims: max |predict_proba diff| = {diff:.2e}")
+    print(f"Scoring: scikit-learn {sklearn_s * 1000:.1f} ms, compact {compact_s * 1000:.1f} ms")
+    if diff > 1e-9:
+        raise SystemExit('Compact model predictions differ from the pickled model')
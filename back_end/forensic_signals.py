@@ -0,0 +1,435 @@
+"""Pluggable forensic signals over one shared decoded image.
+
+``analyze_image_bytes`` used to judge an upload by a single global ELA mean
+and the EXIF ``Software`` tag.  ``ForensicEngine`` decodes the image once, at
+bounded resolution (see ``ela.prepare_analysis_image``), into a
+``ForensicContext`` whose NumPy buffers (RGB pixels, luma, per-block
+statistics) are shared by every signal, then runs each registered signal
+kernel over it.  Kernels are vectorized NumPy, so the whole suite stays
+well under a second for a 12 MP photo.  Each returns a JSON-ready dict with
+``flagged`` and a ``score``; a flagged signal adds its ``risk`` to the
+tamper risk and takes its ``penalty`` off the authenticity score.
+
+Built-in signals, in the order they run:
+
+``jpeg_quantization``
+    Estimates the JPEG quality from the quantization tables and checks them
+    against the standard IJG tables; camera EXIF with library-standard
+    tables means the photo was re-saved by software after capture.
+``ela``
+    Error Level Analysis at several qualities, recompressed tile by tile
+    (``ela.recompression_errors``) so memory stays bounded by the tile
+    size.  The pass at ``ELA_QUALITY`` gives the global score and per-tile
+    anomaly map; the lower qualities
+    look for JPEG ghosts, regions that recompress unusually cleanly at a
+    quality below the image's own because they were saved at it before
+    being pasted in.
+``noise``
+    Per-block noise level of a high-pass residual, relative to what the
+    block's texture predicts; regions whose noise differs strongly from the
+    rest of the frame came from another camera or were smoothed.
+``copy_move``
+    Block hashing over a downscaled luma image: many textured windows that
+    match another window at the same offset indicate a region cloned
+    within the image.
+
+Screenshots and other synthetic graphics (large areas of perfectly flat
+color) skip the signals that assume camera noise.  Register another signal
+with ``@signal(name, risk, penalty)``.
+"""
+import io
+import time
+from functools import cached_property
+
+import numpy as np
+from PIL import Image
+
+from ela import DEFAULT_MAX_MEMORY_BYTES, DEFAULT_MAX_PIXELS, DEFAULT_TILE_SIZE, HOTSPOT_THRESHOLD
+from ela import prepare_analysis_image, recompression_errors, summarize
+
+ELA_QUALITY = 90
+GHOST_QUALITIES = (60, 70, 80)
+GHOST_BLOCK = 32
+NOISE_BLOCK = 32
+# Log-ratio of a block's noise to what its texture predicts (e ~ 2.7x) beyond which it is an outlier
+NOISE_DEVIATION = 1.0
+COPY_MOVE_MAX_PIXELS = 1_000_000
+
+SIGNALS = {}
+
+
+class Signal:
+    def __init__(self, name, kernel, risk, penalty):
+        self.name = name
+        self.kernel = kernel
+        self.risk = risk
+        self.penalty = penalty
+
+
+def signal(name, risk, penalty):
+    """Register ``kernel(ctx) -> dict`` as a forensic signal; signals run in registration order."""
+    def register(kernel):
+        SIGNALS[name] = Signal(name, kernel, risk, penalty)
+        return kernel
+    return register
+
+
+def not_applicable(reason):
+    return {'applicable': False, 'flagged': False, 'score': 0.0, 'reason': reason}
+
+
+def block_sums(values, block):
+    """Sums over ``block`` x ``block`` cells of a 2-D array; edge cells may be partial."""
+    rows = np.arange(0, values.shape[0], block)
+    cols = np.arange(0, values.shape[1], block)
+    dtype = np.float64 if values.dtype.kind == 'f' else np.int64
+    return np.add.reduceat(np.add.reduceat(values, rows, axis=0, dtype=dtype), cols, axis=1, dtype=dtype)
+
+
+def add_block_sums(grid, values, top, left, block):
+    """Add a tile of a 2-D array, placed at (``top``, ``left``), into the ``block`` x ``block`` cell sums ``grid``."""
+    rows = np.unique(np.append(0, np.arange(-top % block, values.shape[0], block)))
+    cols = np.unique(np.append(0, np.arange(-left % block, values.shape[1], block)))
+    sums = np.add.reduceat(np.add.reduceat(values, rows, axis=0, dtype=np.int64), cols, axis=1, dtype=np.int64)
+    np.add.at(grid, np.ix_((top + rows) // block, (left + cols) // block), sums)
+
+
+def block_view(values, block):
+    """(rows, cols, block * block) array of the full cells of a 2-D array; edge remainders are dropped."""
+    rows, cols = values.shape[0] // block, values.shape[1] // block
+    cropped = values[:rows * block, :cols * block]
+    return cropped.reshape(rows, block, cols, block).swapaxes(1, 2).reshape(rows, cols, block * block)
+
+
+def box_in_original(ctx, top, left, bottom, right):
+    """[left, top, right, bottom] in original image pixels from a box in analysis pixels."""
+    scale = ctx.scale
+    return [int(left / scale), int(top / scale),
+            min(ctx.original_size[0], int(right / scale)), min(ctx.original_size[1], int(bottom / scale))]
+
+
+class ForensicContext:
+    """The decoded analysis image and derived buffers, shared by all signals of one analysis."""
+
+    def __init__(self, image, rgb, scale, original_size, exif, tile_size=DEFAULT_TILE_SIZE):
+        self.image = image
+        self.rgb = rgb
+        self.scale = scale
+        self.original_size = original_size
+        self.exif = exif
+        self.tile_size = max(16, tile_size - tile_size % 16)
+        self.pixels = np.asarray(rgb)
+        self.results = {}
+        self._block_luma = {}
+
+    @cached_property
+    def gray(self):
+        pixels = self.pixels
+        return (pixels[..., 0] * np.float32(0.299) + pixels[..., 1] * np.float32(0.587)
+                + pixels[..., 2] * np.float32(0.114))
+
+    def block_luma(self, block):
+        """Per-block (mean, standard deviation) of luma over full ``block`` cells."""
+        if block not in self._block_luma:
+            cells = block_view(self.gray, block)
+            self._block_luma[block] = (cells.mean(axis=2), cells.std(axis=2))
+        return self._block_luma[block]
+
+    @cached_property
+    def graphics(self):
+        """True for screenshots and other synthetic images, which have large areas of perfectly flat color.
+
+        Their repeated UI elements and lack of sensor noise would trip the ghost, noise and copy-move signals.
+        """
+        _, std = self.block_luma(32)
+        return bool(std.size and (std < 0.5).mean() > 0.25)
+
+
+_standard_tables = None
+
+
+def standard_quantization_tables():
+    """{quality: (luma, chroma)} of the IJG tables libjpeg uses, read back from Pillow's own encoder."""
+    global _standard_tables
+    if _standard_tables is None:
+        tables = {}
+        tiny = Image.new('RGB', (16, 16))
+        for quality in range(1, 101):
+            buffer = io.BytesIO()
+            tiny.save(buffer, 'JPEG', quality=quality)
+            buffer.seek(0)
+            quantization = Image.open(buffer).quantization
+            tables[quality] = (np.array(quantization[0]), np.array(quantization[1]))
+        _standard_tables = tables
+    return _standard_tables
+
+
+@signal('jpeg_quantization', risk=10, penalty=5)
+def jpeg_quantization(ctx):
+    tables = getattr(ctx.image, 'quantization', None)
+    if ctx.image.format not in ('JPEG', 'MPO') or not tables:
+        return not_applicable('not a JPEG')
+    luma = np.array(tables[0])
+    chroma = np.array(tables[1]) if 1 in tables else None
+    standard = standard_quantization_tables()
+    qualities = list(standard)
+    distances = np.abs(np.stack([standard[q][0] for q in qualities]) - luma).sum(axis=1)
+    best = qualities[int(distances.argmin())]
+    matches_standard = bool(distances.min() == 0 and (chroma is None or np.array_equal(chroma, standard[best][1])))
+    from_camera = any(ctx.exif.get(tag) for tag in ('Make', 'Model'))
+    # Cameras ship their own tables; a camera photo with libjpeg's tables was re-encoded after capture
+    flagged = from_camera and matches_standard
+    return {
+        'applicable': True,
+        'flagged': flagged,
+        'score': 1.0 if flagged else 0.0,
+        'estimated_quality': best,
+        'standard_tables': matches_standard,
+        'table_distance': int(distances.min()),
+        'summary': (f"Quality ~{best} with {'standard library' if matches_standard else 'custom'} tables"
+                    + ("; camera metadata with library tables suggests re-saving after capture" if flagged else "."))
+    }
+
+
+@signal('ela', risk=20, penalty=15)
+def multi_quality_ela(ctx):
+    height, width = ctx.pixels.shape[:2]
+    tile_size = ctx.tile_size
+    quality_estimate = ctx.results.get('jpeg_quantization', {}).get('estimated_quality')
+    # Ghosts live on the original 8x8 JPEG grid, which a downscaled analysis image no longer has,
+    # and only show at qualities below the one the image was last saved at
+    ghost_qualities = [q for q in GHOST_QUALITIES if quality_estimate is None or q < quality_estimate]
+    if ctx.scale < 1.0 or ctx.graphics or len(ghost_qualities) < 2:
+        ghost_qualities = []
+    mean_luma, std_luma = ctx.block_luma(GHOST_BLOCK)
+    ghost_rows, ghost_cols = mean_luma.shape
+
+    # Recompressed tile by tile, every quality per tile, so memory stays bounded by the tile size
+    qualities = sorted(set(ghost_qualities) | {ELA_QUALITY})
+    totals = dict.fromkeys(qualities, 0)
+    tile_scores = np.zeros((-(-height // tile_size), -(-width // tile_size)))
+    ghost_sums = {quality: np.zeros((ghost_rows, ghost_cols), dtype=np.int64) for quality in ghost_qualities}
+    ghost_height, ghost_width = ghost_rows * GHOST_BLOCK, ghost_cols * GHOST_BLOCK
+    for (left, top, _, _), errors in recompression_errors(ctx.rgb, qualities, tile_size):
+        for quality, error in errors.items():
+            total = int(error.sum(dtype=np.int64))
+            totals[quality] += total
+            if quality == ELA_QUALITY:
+                tile_scores[top // tile_size, left // tile_size] = total / (error.size * 3 * 255.0)
+            # Ghost curves only use full cells
+            if quality in ghost_sums and top < ghost_height and left < ghost_width:
+                add_block_sums(ghost_sums[quality], error[:ghost_height - top, :ghost_width - left], top, left,
+                               GHOST_BLOCK)
+    scores = {quality: round(totals[quality] / (width * height * 3 * 255.0), 4) for quality in qualities}
+    ghost_errors = [ghost_sums[quality] for quality in ghost_qualities]
+
+    hotspots = []
+    for row, col in zip(*np.nonzero(tile_scores >= HOTSPOT_THRESHOLD)):
+        top, left = row * tile_size, col * tile_size
+        hotspots.append({
+            'score': round(float(tile_scores[row, col]), 4),
+            'box': box_in_original(ctx, top, left, min(top + tile_size, height), min(left + tile_size, width))
+        })
+    hotspots.sort(key=lambda h: -h['score'])
+    ela_score = scores[ELA_QUALITY]
+
+    # JPEG ghosts: each block's error curve over quality, normalized by its own mean so texture cancels
+    # out, against the typical curve; a pasted region dips at the quality it was saved at before
+    ghost_fraction = 0.0
+    ghost_quality = None
+    ghost_box = None
+    textured = (std_luma > 8) & (mean_luma > 16) & (mean_luma < 240)
+    if ghost_errors and textured.sum() >= 16:
+        curves = np.stack(ghost_errors).astype(np.float64)
+        curves /= np.maximum(curves.mean(axis=0), 1e-6)
+        typical = np.median(curves[:, textured], axis=1)
+        dips = typical[:, None, None] - curves
+        ghost = textured & (dips.max(axis=0) > 0.25)
+        ghost_count = int(ghost.sum())
+        ghost_fraction = ghost_count / float(textured.sum())
+        if ghost_count:
+            ghost_quality = ghost_qualities[int(np.bincount(dips.argmax(axis=0)[ghost]).argmax())]
+            rows, cols = np.nonzero(ghost)
+            ghost_box = box_in_original(ctx, rows.min() * GHOST_BLOCK, cols.min() * GHOST_BLOCK,
+                                        (rows.max() + 1) * GHOST_BLOCK, (cols.max() + 1) * GHOST_BLOCK)
+    # Scattered dips are noise; a pasted region is a sizeable but minority share of the frame
+    ghost_flagged = 0.03 <= ghost_fraction <= 0.5
+
+    return {
+        'applicable': True,
+        'flagged': ela_score >= HOTSPOT_THRESHOLD or ghost_flagged,
+        'score': ela_score,
+        'summary': summarize(ela_score),
+        'quality_scores': {str(quality): score for quality, score in scores.items()},
+        'ghost': {
+            'applicable': bool(ghost_errors),
+            'flagged': ghost_flagged,
+            'fraction': round(ghost_fraction, 4),
+            'quality': ghost_quality,
+            'box': ghost_box
+        },
+        'anomaly_map': {
+            'tile_scores': np.round(tile_scores, 4).tolist(),
+            'tile_size': int(round(tile_size / ctx.scale)),
+            'rows': int(tile_scores.shape[0]),
+            'cols': int(tile_scores.shape[1]),
+            'analysis_size': [width, height],
+            'analysis_scale': round(ctx.scale, 4),
+            'hotspots': hotspots[:10]
+        }
+    }
+
+
+@signal('noise', risk=10, penalty=5)
+def noise_residual(ctx):
+    if ctx.graphics:
+        return not_applicable('synthetic image')
+    gray = ctx.gray
+    if min(gray.shape) < NOISE_BLOCK * 4:
+        return not_applicable('image too small')
+    # High-pass residual: each pixel minus its 3x3 neighbourhood mean (a separable box sum)
+    rows = gray[:-2] + gray[1:-1] + gray[2:]
+    box = rows[:, :-2] + rows[:, 1:-1] + rows[:, 2:]
+    del rows
+    box /= -9
+    box += gray[1:-1, 1:-1]
+    np.abs(box, out=box)
+
+    level = block_view(box, NOISE_BLOCK).mean(axis=2)
+    del box
+    cells = block_view(gray[1:-1, 1:-1], NOISE_BLOCK)
+    mean_luma, texture = cells.mean(axis=2), cells.std(axis=2)
+    # Clipped highlights and shadows have no noise to measure
+    valid = (mean_luma > 16) & (mean_luma < 240) & (level > 0.05)
+    if valid.sum() < 16:
+        return not_applicable('too few measurable blocks')
+    # Residual level rises with texture (edges) and falls in defocused areas; compare each block
+    # with what its own texture predicts, so that only noise from elsewhere stands out
+    x = np.log1p(texture[valid])
+    y = np.log(level[valid])
+    slope, intercept = np.polyfit(x, y, 1)
+    deviation = np.zeros(level.shape)
+    deviation[valid] = y - (intercept + slope * x)
+    deviation[valid] -= np.median(deviation[valid])
+    # Single blocks stray by this much in any photo; a foreign region is a patch of them
+    inconsistent = np.zeros(level.shape, dtype=bool)
+    for outlier in (deviation > NOISE_DEVIATION, deviation < -NOISE_DEVIATION):
+        padded = np.pad(outlier, 1)
+        neighbours = (padded[:-2, 1:-1].astype(np.int8) + padded[2:, 1:-1] + padded[1:-1, :-2]
+                      + padded[1:-1, 2:])
+        inconsistent |= outlier & (neighbours >= 2)
+    fraction = float(inconsistent.sum()) / float(valid.sum())
+    flagged = 0.05 <= fraction <= 0.5
+    return {
+        'applicable': True,
+        'flagged': flagged,
+        'score': round(fraction, 4),
+        'noise_level': round(float(np.exp(np.median(y))), 3),
+        'inconsistent_fraction': round(fraction, 4),
+        'blocks': int(valid.sum())
+    }
+
+
+@signal('copy_move', risk=30, penalty=25)
+def copy_move(ctx, cell=4, window=4, step=12.0, min_texture=12.0, min_matches=60):
+    if ctx.graphics:
+        return not_applicable('synthetic image')
+    gray = ctx.gray
+    # A megapixel is plenty: clones worth flagging are far larger than the lost detail
+    factor = max(1, int(np.ceil(np.sqrt(gray.size / COPY_MOVE_MAX_PIXELS))))
+    small = block_view(gray, factor).mean(axis=2) if factor > 1 else gray
+    span = cell * window
+    if min(small.shape) < span * 4:
+        return not_applicable('image too small')
+
+    # Mean of the cell x cell square at every pixel, from an integral image
+    integral = np.zeros((small.shape[0] + 1, small.shape[1] + 1))
+    integral[1:, 1:] = small.cumsum(axis=0, dtype=np.float64).cumsum(axis=1)
+    means = (integral[cell:, cell:] - integral[:-cell, cell:] - integral[cell:, :-cell]
+             + integral[:-cell, :-cell]) / (cell * cell)
+    # A window is the window x window grid of cells starting at each pixel: stride 1, so a clone
+    # is found whatever its offset
+    rows, cols = small.shape[0] - span + 1, small.shape[1] - span + 1
+    samples = [means[i * cell:i * cell + rows, j * cell:j * cell + cols]
+               for i in range(window) for j in range(window)]
+    mean = sum(samples) / len(samples)
+    variance = sum(np.square(s) for s in samples) / len(samples) - np.square(mean)
+    textured = variance >= min_texture ** 2
+    positions = np.argwhere(textured)
+    if len(positions) < 2:
+        return {'applicable': True, 'flagged': False, 'score': 0.0, 'matches': 0}
+    # One 64-bit hash of the quantized, mean-removed cells per window
+    weights = np.random.default_rng(0).integers(1, 2 ** 62, len(samples), dtype=np.int64)
+    center = mean[textured]
+    hashes = np.zeros(len(positions), dtype=np.int64)
+    for weight, s in zip(weights, samples):
+        hashes += np.round((s[textured] - center) / step).astype(np.int64) * weight
+
+    order = np.argsort(hashes, kind='stable')
+    same = hashes[order[1:]] == hashes[order[:-1]]
+    first, second = positions[order[:-1][same]], positions[order[1:][same]]
+    shifts = second - first
+    # (dy, dx) and (-dy, -dx) are the same copy; keep one orientation
+    flip = (shifts[:, 0] < 0) | ((shifts[:, 0] == 0) & (shifts[:, 1] < 0))
+    shifts[flip] *= -1
+    # Overlapping windows of one smooth region match their neighbours; a copy has to be moved clear of itself
+    far = np.abs(shifts).max(axis=1) >= span
+    shifts, first, second = shifts[far], first[far], second[far]
+    if not len(shifts):
+        return {'applicable': True, 'flagged': False, 'score': 0.0, 'matches': 0}
+
+    unique, inverse, counts = np.unique(shifts, axis=0, return_inverse=True, return_counts=True)
+    best = int(counts.argmax())
+    matches = int(counts[best])
+    flagged = matches >= min_matches
+    result = {
+        'applicable': True,
+        'flagged': flagged,
+        'score': round(min(1.0, matches / (min_matches * 4.0)), 4),
+        'matches': matches
+    }
+    if flagged:
+        members = inverse.reshape(-1) == best
+        boxes = []
+        for points in (first[members], second[members]):
+            top, left = points.min(axis=0) * factor
+            bottom, right = (points.max(axis=0) + span) * factor
+            boxes.append(box_in_original(ctx, top, left, bottom, right))
+        result['source_box'], result['target_box'] = boxes
+        result['shift'] = [int(unique[best][1] * factor / ctx.scale), int(unique[best][0] * factor / ctx.scale)]
+    return result
+
+
+class ForensicEngine:
+    """Runs the selected signals (all registered ones by default) over one shared decode."""
+
+    def __init__(self, signals=None, max_pixels=DEFAULT_MAX_PIXELS, max_memory_bytes=DEFAULT_MAX_MEMORY_BYTES,
+                 tile_size=DEFAULT_TILE_SIZE):
+        names = list(SIGNALS) if signals is None else list(signals)
+        unknown = [name for name in names if name not in SIGNALS]
+        if unknown:
+            raise ValueError(f"unknown forensic signal(s): {', '.join(unknown)}")
+        self.signals = [SIGNALS[name] for name in names]
+        self.max_pixels = max_pixels
+        self.max_memory_bytes = max_memory_bytes
+        self.tile_size = tile_size
+
+    def analyze(self, image, exif, timings=None):
+        """Decode ``image`` once and run every signal; returns {name: result}.
+
+        Raises MemoryError if the bounded decode would exceed ``max_memory_bytes``.
+        If ``timings`` is a dict, the decode and each signal's seconds are added to it.
+        """
+        clock = time.perf_counter
+        started = clock()
+        original_size = image.size
+        rgb, scale = prepare_analysis_image(image, self.max_pixels, self.max_memory_bytes)
+        ctx = ForensicContext(image, rgb, scale, original_size, exif, self.tile_size)
+        if timings is not None:
+            timings['decode'] = timings.get('decode', 0.0) + clock() - started
+        for item in self.signals:
+            signal_started = clock()
+            ctx.results[item.name] = item.kernel(ctx)
+            if timings is not None:
+                timings[item.name] = timings.get(item.name, 0.0) + clock() - signal_started
+        return ctx.results
@@ -0,0 +1,262 @@
+"""CPU-bound image forensics and the process pool that runs it.
+
+Decoding, EXIF parsing, the forensic signals (see ``forensic_signals``) and
+the perceptual hash are pure Pillow/NumPy work.  Run in a Flask request thread they hold the GIL and stall text
+verifications, and one worker can never use more than one core.
+``analyze_image_bytes`` is a self-contained function of the upload bytes so it
+can run in a child process; ``ForensicsPool`` wraps a ``ProcessPoolExecutor``
+with a bounded queue (callers get ``PoolSaturated`` instead of piling up
+work), a per-job timeout, and automatic recovery if a worker dies.
+"""
+import io
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from PIL import Image
+from PIL.ExifTags import TAGS
+
+from ela import DEFAULT_MAX_MEMORY_BYTES, DEFAULT_MAX_PIXELS, DEFAULT_TILE_SIZE
+from forensic_signals import SIGNALS, ForensicEngine
+from image_cache import perceptual_hash
+
+
+# Workers are started from a clean process, never forked from the app: by the time the pool starts, the app runs
+# threads (LLM event loop, history writer, model registry poller), and a fork can copy one of their locks held
+DEFAULT_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+class PoolSaturated(Exception):
+    """Raised when the forensics queue is full; the caller should ask the client to retry later."""
+
+
+def analyze_image_bytes(data, ela_max_pixels=DEFAULT_MAX_PIXELS, ela_max_memory_bytes=DEFAULT_MAX_MEMORY_BYTES,
+                        ela_tile_size=DEFAULT_TILE_SIZE, forensic_signals=None):
+    """Run the full forensic analysis on an uploaded image; returns (result, phash).
+
+    ``forensic_signals`` names the signals to run (default: all registered ones).
+
+    ``result['stage_seconds']`` holds the time spent per stage; it is for metrics, not for the client.
+    """
+    timings = {}
+    started = time.perf_counter()
+    image = Image.open(io.BytesIO(data))
+    timings['open'] = time.perf_counter() - started
+    exif_data = {}
+
+    # Extract EXIF data
+    if hasattr(image, '_getexif'):
+        exif = image._getexif()
+        if exif:
+            for tag_id, value in exif.items():
+                tag = TAGS.get(tag_id, tag_id)
+                # Decode bytes to string if necessary
+                if isinstance(value, bytes):
+                    try:
+                        value = value.decode()
+                    except:
+                        value = str(value)
+                exif_data[tag] = str(value)
+
+    timings['exif'] = time.perf_counter() - started - timings['open']
+
+    # Basic Forensic Analysis Simulation (since we don't have a real forensic model yet)
+    # In a real app, we would check for compression artifacts, metadata inconsistencies, etc.
+    software = exif_data.get('Software', 'Unknown')
+    camera = exif_data.get('Model', 'Unknown')
+
+    # Simple heuristic: if 'Photoshop' or 'GIMP' is in software, flag it
+    is_suspicious = 'photoshop' in software.lower() or 'gimp' in software.lower()
+
+    # Capture dimensions first: JPEG draft decoding in the forensic engine shrinks image.size
+    width, height = image.size
+
+    # ELA, JPEG quantization, noise and copy-move signals over one decode at bounded resolution
+    ela_score = 0.0
+    ela_summary = ""
+    anomaly_map = None
+    signals = {}
+    try:
+        engine = ForensicEngine(
+            signals=forensic_signals,
+            max_pixels=ela_max_pixels,
+            max_memory_bytes=ela_max_memory_bytes,
+            tile_size=ela_tile_size
+        )
+        signals = engine.analyze(image, exif_data, timings=timings)
+    except Exception as e:
+        print(f"Forensic signals Error: {e}")
+        ela_summary = f"ELA analysis unavailable: {e}"
+    if 'ela' in signals:
+        ela_score = signals['ela']['score']
+        ela_summary = signals['ela']['summary']
+        anomaly_map = signals['ela'].pop('anomaly_map')
+    flagged_signals = [name for name, signal in signals.items() if signal['flagged']]
+
+    # Combine metadata suspicion and ELA score into an authenticity score
+    base_score = 95
+    if is_suspicious:
+        base_score -= 40
+    base_score -= min(40, int(ela_score * 100))
+    for name in flagged_signals:
+        base_score -= SIGNALS[name].penalty
+
+    # Additional image heuristics
+    has_small_resolution = (width * height) < (512 * 512)
+    extreme_aspect_ratio = (width / float(height)) > 3 or (height / float(width)) > 3
+    has_no_exif = len(exif_data) == 0
+
+    tamper_risk = 0
+    if has_small_resolution:
+        tamper_risk += 5
+    if extreme_aspect_ratio:
+        tamper_risk += 5
+    if has_no_exif:
+        tamper_risk += 10
+    if is_suspicious:
+        tamper_risk += 15
+    for name in flagged_signals:
+        tamper_risk += SIGNALS[name].risk
+    tamper_risk = max(0, min(100, tamper_risk))
+
+    authenticity_score = max(0, min(100, base_score))
+    verdict = "Tampering Detected" if authenticity_score < 60 or tamper_risk >= 40 else "Original"
+
+    result = {
+        'verdict': verdict,
+        'authenticity_score': authenticity_score,
+        'exif_metadata': {
+            'camera': camera,
+            'software': software,
+            'datetime': exif_data.get('DateTime', 'Unknown')
+        },
+        'ela_score': ela_score,
+        'ela_summary': ela_summary,
+        'ela_anomaly_map': anomaly_map,
+        'forensic_signals': signals,
+        'tamper_risk': tamper_risk,
+        'forensic_flags': {
+            'has_no_exif': has_no_exif,
+            'is_suspicious_software': is_suspicious,
+            'has_small_resolution': has_small_resolution,
+            'extreme_aspect_ratio': extreme_aspect_ratio,
+            'flagged_signals': flagged_signals,
+            'width': width,
+            'height': height
+        }
+    }
+
+    # Re-encoded or resized copies of an earlier upload keep (almost) the same perceptual hash
+    phash_started = time.perf_counter()
+    phash = perceptual_hash(image)
+    timings['phash'] = time.perf_counter() - phash_started
+    result['stage_seconds'] = timings
+    return result, phash
+
+
+class ForensicsPool:
+    """Bounded process pool for ``analyze_image_bytes``.
+
+    At most ``workers`` jobs run at once and ``max_queue`` more may wait;
+    beyond that ``run`` raises ``PoolSaturated`` immediately.  A job that
+    exceeds ``timeout`` raises ``TimeoutError`` to its caller, but keeps its
+    slot until the worker actually finishes, so a burst of slow images
+    still produces backpressure rather than an unbounded backlog.
+    ``start_method`` defaults to ``DEFAULT_START_METHOD``; ``fork`` starts
+    workers faster but is only safe before the process runs threads.
+    """
+
+    def __init__(self, workers=None, max_queue=None, timeout=30.0, start_method=None, **analysis_options):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = self.workers * 2 if max_queue is None else max_queue
+        self.timeout = timeout
+        self.analysis_options = analysis_options
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.restarts = 0
+        self._lock = threading.Lock()
+        self._context = multiprocessing.get_context(start_method or DEFAULT_START_METHOD)
+        self._executor = self._new_executor()
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=self._context)
+
+    def _job_done(self, future):
+        with self._lock:
+            self.pending -= 1
+            if future.cancelled():
+                return
+            if future.exception() is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    def submit(self, data):
+        """Queue an analysis and return its Future; raises PoolSaturated when the queue is full."""
+        with self._lock:
+            if self.pending >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise PoolSaturated(f'{self.pending} image analyses already running or queued')
+            self.pending += 1
+            executor = self._executor
+        try:
+            future = executor.submit(analyze_image_bytes, data, **self.analysis_options)
+        except BrokenProcessPool:
+            with self._lock:
+                self.pending -= 1
+                self.failed += 1
+            self._restart(executor)
+            raise
+        future.executor = executor
+        future.add_done_callback(self._job_done)
+        return future
+
+    def run(self, data):
+        """Analyze ``data`` in a worker process and return (result, phash)."""
+        future = self.submit(data)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # A job that hasn't started yet can still be dropped; a running one finishes in the background
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            raise TimeoutError(f'image analysis timed out after {self.timeout}s')
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed) and took the executor with it
+            self._restart(future.executor)
+            raise
+
+    def _restart(self, broken):
+        with self._lock:
+            # Concurrent callers see the same broken executor; only the first replaces it
+            if broken is not self._executor:
+                return
+            self._executor = self._new_executor()
+            self.restarts += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'pending': self.pending,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+                'restarts': self.restarts,
+                'timeout_seconds': self.timeout,
+                'start_method': self._context.get_start_method()
+            }
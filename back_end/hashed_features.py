@@ -0,0 +1,107 @@
+"""Vocabulary-free, multi-field features for out-of-core training.
+
+``FieldHashingVectorizer`` hashes tokens from several dataset columns into one
+fixed-size feature space, prefixing each token with its field name so "trump"
+in a tweet and "trump" as an author stay distinct.  Nothing grows with the
+data: there is no vocabulary to fit, and IDF weights are a single array
+estimated from a sample.  Training feeds it records (one value per field);
+at serving time ``transform`` takes plain claim text, which fills
+``text_field`` and leaves the other fields empty, so the fitted pair drops
+into the model registry like the TF-IDF one.  Because served claims never
+have the other fields, ``train.py`` blanks them in a share of its training
+rows and scores its holdout through ``transform``.
+"""
+import re
+
+import numpy as np
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, HashingVectorizer
+from sklearn.preprocessing import normalize
+
+DEFAULT_FIELDS = ('tweet', 'statement', 'manual_keywords', 'author')
+CATEGORICAL_FIELDS = ('author',)
+TOKEN_PATTERN = r'(?u)\b\w\w+\b'
+
+
+class FieldAnalyzer:
+    """Turn a record (tuple of field values) into field-prefixed tokens."""
+
+    def __init__(self, fields, categorical=CATEGORICAL_FIELDS, stop_words=ENGLISH_STOP_WORDS,
+                 token_pattern=TOKEN_PATTERN):
+        self.fields = tuple(fields)
+        self.categorical = frozenset(categorical)
+        self.stop_words = frozenset(stop_words or ())
+        self.token_pattern = token_pattern
+        self._token = re.compile(token_pattern)
+
+    def __getstate__(self):
+        # Compiled patterns are rebuilt rather than pickled
+        state = dict(self.__dict__)
+        del state['_token']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._token = re.compile(self.token_pattern)
+
+    def __call__(self, record):
+        tokens = []
+        for field, value in zip(self.fields, record):
+            if not value:
+                continue
+            if field in self.categorical:
+                tokens.append(f'{field}={value.strip().lower()}')
+                continue
+            tokens.extend(f'{field}:{t}' for t in self._token.findall(value.lower()) if t not in self.stop_words)
+        return tokens
+
+
+class FieldHashingVectorizer:
+    """Hashed, sublinear-TF, optionally IDF-weighted, L2-normalized features over several text fields."""
+
+    def __init__(self, fields=DEFAULT_FIELDS, text_field='tweet', n_features=2 ** 20,
+                 categorical=CATEGORICAL_FIELDS, sublinear_tf=True):
+        if text_field not in fields:
+            raise ValueError(f'text_field {text_field!r} must be one of the fields')
+        self.fields = tuple(fields)
+        self.text_field = text_field
+        self.n_features = n_features
+        self.sublinear_tf = sublinear_tf
+        self.idf_ = None
+        self._hasher = HashingVectorizer(
+            analyzer=FieldAnalyzer(self.fields, categorical=categorical),
+            n_features=n_features,
+            alternate_sign=False,
+            norm=None
+        )
+
+    def _counts(self, records):
+        X = self._hasher.transform(records)
+        X.sum_duplicates()
+        return X
+
+    def document_frequencies(self, records):
+        """Per-feature document counts for ``records`` as (indices, counts), for summing across chunks."""
+        return np.unique(self._counts(records).indices, return_counts=True)
+
+    def set_idf(self, df_counts, n_documents):
+        """Install smoothed IDF weights (as TfidfTransformer computes them) from summed document counts."""
+        self.idf_ = np.log((1.0 + n_documents) / (1.0 + np.asarray(df_counts, dtype=np.float64))) + 1.0
+
+    def transform_records(self, records):
+        X = self._counts(records).astype(np.float64)
+        if self.sublinear_tf:
+            np.log(X.data, out=X.data)
+            X.data += 1.0
+        if self.idf_ is not None:
+            X.data *= self.idf_[X.indices]
+        return normalize(X, norm='l2', copy=False)
+
+    def text_records(self, texts):
+        """Records holding only ``texts`` in ``text_field``: what a claim looks like at serving time."""
+        position = self.fields.index(self.text_field)
+        empty = ('',) * len(self.fields)
+        return [empty[:position] + (str(text),) + empty[position + 1:] for text in texts]
+
+    def transform(self, texts):
+        """Features for plain claim text, which goes in ``text_field``."""
+        return self.transform_records(self.text_records(texts))
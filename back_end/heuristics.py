@@ -0,0 +1,154 @@
+"""Cheap text heuristics feeding the meta_analysis risk layer.
+
+Sensational phrases come from a loadable, weighted, multilingual dictionary
+(``sensational_phrases.json`` by default).  ``HeuristicEngine`` compiles the
+whole dictionary into one trie-shaped regular expression: phrases sharing a
+prefix share a branch, so the scan is a single left-to-right pass in the
+regex engine whose cost barely moves whether the list has four phrases or
+thousands, instead of one substring search per phrase.  Matching is
+case-insensitive, respects word boundaries, and treats common Arabic spelling
+variants (hamza forms, ta marbuta, alef maqsura, diacritics, tatweel) as equal.
+"""
+import json
+import os
+import re
+
+DEFAULT_PHRASES_PATH = os.path.join(os.path.dirname(__file__), 'sensational_phrases.json')
+DEFAULT_FEATURE_WEIGHTS = {'many_exclamations': 10, 'all_caps_word': 10, 'many_urls': 10, 'unusual_length': 5}
+URL_PATTERN = re.compile(r'https?://\S+')
+_WORD_CHAR = re.compile(r'\w')
+
+# Applied to both phrases and scanned text before matching
+ARABIC_NORMALIZATION = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا', 'ة': 'ه', 'ى': 'ي', 'ـ': None,
+    **{chr(c): None for c in range(0x064B, 0x0653)}, 'ٰ': None
+})
+
+
+def normalize_for_matching(text):
+    return text.translate(ARABIC_NORMALIZATION)
+
+
+class HeuristicEngine:
+    def __init__(self, phrases=(), feature_weights=None, max_risk=40, max_phrase_risk=30):
+        """``phrases`` is an iterable of dicts with ``text``, ``weight`` and optional ``lang``."""
+        self.feature_weights = dict(DEFAULT_FEATURE_WEIGHTS, **(feature_weights or {}))
+        self.max_risk = max_risk
+        self.max_phrase_risk = max_phrase_risk
+
+        # Phrases that normalize to the same text are one entry with the highest weight
+        entries = {}
+        for phrase in phrases:
+            key = normalize_for_matching(phrase['text'].strip().lower())
+            if not key:
+                continue
+            weight = float(phrase.get('weight', 0))
+            if key not in entries or weight > entries[key]['weight']:
+                entries[key] = {'phrase': phrase['text'], 'weight': weight, 'lang': phrase.get('lang')}
+        self.phrases = entries
+
+        self._trie = {}
+        for key in entries:
+            node = self._trie
+            for ch in key:
+                node = node.setdefault(ch, {})
+            node[''] = key
+        # A zero-width lookahead reports a match at every word start, so overlapping phrases are all found
+        self._pattern = re.compile(r'(?<!\w)(?=(' + self._trie_pattern(self._trie) + r')(?!\w))', re.IGNORECASE) \
+            if entries else None
+
+    @classmethod
+    def load(cls, path=DEFAULT_PHRASES_PATH):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(
+            data.get('phrases', []),
+            feature_weights=data.get('feature_weights'),
+            max_risk=data.get('max_risk', 40),
+            max_phrase_risk=data.get('max_phrase_risk', 30)
+        )
+
+    @classmethod
+    def _trie_pattern(cls, node):
+        branches = [re.escape(ch) + cls._trie_pattern(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # A phrase ending here makes the rest optional; greedy, so the longest phrase wins
+        return f'(?:{pattern})?' if '' in node else pattern
+
+    def _phrases_at(self, match, scan):
+        """Every phrase starting where ``match`` does: the longest one and any shorter prefix of it."""
+        found = []
+        node = self._trie
+        end = match.start()
+        for ch in match.group(1).lower():
+            node = node.get(ch)
+            if node is None:
+                break
+            end += 1
+            if '' in node and (end == len(scan) or not _WORD_CHAR.match(scan, end)):
+                found.append(node[''])
+        return found
+
+    def match_phrases(self, text):
+        """Dictionary entries found in ``text``, highest weight first."""
+        if self._pattern is None or not text:
+            return []
+        scan = normalize_for_matching(text)
+        keys = {key for match in self._pattern.finditer(scan) for key in self._phrases_at(match, scan)}
+        return sorted((self.phrases[key] for key in keys), key=lambda p: -p['weight'])
+
+    def analyze(self, text):
+        text = text or ""
+        words = text.split()
+        num_words = len(words)
+        num_exclam = text.count('!')
+        has_all_caps_word = any(len(w) > 4 and w.isupper() for w in words)
+        num_urls = len(URL_PATTERN.findall(text))
+        matched_phrases = self.match_phrases(text)
+        phrase_risk = min(self.max_phrase_risk, sum(p['weight'] for p in matched_phrases))
+
+        weights = self.feature_weights
+        heuristic_risk = 0
+        if num_exclam >= 3:
+            heuristic_risk += weights['many_exclamations']
+        if has_all_caps_word:
+            heuristic_risk += weights['all_caps_word']
+        if num_urls >= 2:
+            heuristic_risk += weights['many_urls']
+        if num_words < 8 or num_words > 200:
+            heuristic_risk += weights['unusual_length']
+        heuristic_risk = min(self.max_risk, heuristic_risk + phrase_risk)
+
+        return {
+            'length_chars': len(text),
+            'length_words': num_words,
+            'num_exclamation_marks': num_exclam,
+            'num_urls': num_urls,
+            'has_all_caps_word': has_all_caps_word,
+            'has_sensational_phrase': bool(matched_phrases),
+            'matched_phrases': matched_phrases[:5],
+            'heuristic_risk_bonus': int(round(heuristic_risk))
+        }
+
+
+_engine = None
+
+
+def set_engine(engine):
+    """Use ``engine`` for ``compute_heuristics``."""
+    global _engine
+    _engine = engine
+    return engine
+
+
+def load_phrases(path=DEFAULT_PHRASES_PATH):
+    """Compile the phrase dictionary at ``path`` and use it for ``compute_heuristics``."""
+    return set_engine(HeuristicEngine.load(path))
+
+
+def compute_heuristics(text):
+    if _engine is None:
+        load_phrases()
+    return _engine.analyze(text)
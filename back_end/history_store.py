@@ -0,0 +1,364 @@
+"""Append-only history of claim verifications and image analyses.
+
+Every result the API returns is appended to a SQLite database: the full
+response JSON plus indexed columns (kind, time, verdict, tier, claim key,
+image hashes) and a contentless FTS5 index over the claim and the
+explanation or forensic summary.  The caller's client id (API key name or
+IP address) is kept in its own column for operators but never returned or
+searchable through ``query``/``get``, and is stripped from the stored
+responses.  That backs ``/api/history`` (full-text and
+time-range search, newest first, keyset-paginated so page 10,000 costs the
+same as page one), the ``--history`` training source in ``train.py`` and
+cache warming at startup.
+
+Requests never wait on the disk: ``append`` hands the record to a writer
+thread, which commits whatever has queued up in one transaction.  When the
+queue is full, records are dropped and counted rather than slowing requests.
+Reads use their own connection, which WAL lets run alongside the writer.
+
+Ids and ``created_at`` grow together, which is what lets time ranges become
+id ranges.  The writer stamps ``created_at`` under SQLite's write lock and
+never earlier than the newest record already stored, so this holds with
+several processes (gunicorn workers) writing to one file and across clock
+steps; records cannot be inserted with a time of their own.
+"""
+import hashlib
+import json
+import queue
+import re
+import sqlite3
+import threading
+import time
+
+from verdict_cache import normalize_claim
+
+# Verdicts train.py can learn from, as BinaryNumTarget labels (1: True/Real, 0: Fake)
+TRAINING_LABELS = {'TRUE': 1, 'FALSE': 0}
+
+_COLUMNS = 'id, kind, created_at, claim, verdict, tier, score, sha256, phash'
+_TOKEN_RE = re.compile(r'\w+\*?', re.UNICODE)
+
+
+def fts_query(text):
+    """FTS5 MATCH expression requiring every word of ``text``; a trailing ``*`` keeps a prefix search."""
+    terms = []
+    for token in _TOKEN_RE.findall(text or ''):
+        prefix = token.endswith('*')
+        terms.append('"' + token.rstrip('*') + '"' + ('*' if prefix else ''))
+    return ' '.join(terms)
+
+
+def _key_digest(key):
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+
+
+def _to_signed(value):
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+class HistoryStore:
+    """SQLite (WAL + FTS5) history with a background writer; see the module docstring."""
+
+    def __init__(self, path, queue_size=10000, batch_size=500, clock=time.time):
+        self.path = path
+        self.batch_size = batch_size
+        self._clock = clock
+        self.appended = 0
+        self.written = 0
+        self.dropped = 0
+        self.write_errors = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._writer_conn = self._connect()
+        self._writer_conn.execute(
+            'CREATE TABLE IF NOT EXISTS history ('
+            ' id INTEGER PRIMARY KEY,'
+            ' kind TEXT NOT NULL,'
+            ' created_at REAL NOT NULL,'
+            ' claim TEXT,'
+            ' claim_key TEXT,'
+            ' verdict TEXT,'
+            ' tier TEXT,'
+            ' score REAL,'
+            ' client TEXT,'
+            ' sha256 TEXT,'
+            ' phash INTEGER,'
+            ' result TEXT NOT NULL)'
+        )
+        for name, columns in (('created_at', 'created_at'), ('kind', 'kind, id'), ('claim_key', 'claim_key'),
+                              ('sha256', 'sha256')):
+            self._writer_conn.execute(f'CREATE INDEX IF NOT EXISTS history_{name} ON history ({columns})')
+        self.full_text = True
+        try:
+            # Contentless: the text already lives in history.result, the index only needs the rowids
+            self._writer_conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5("
+                "claim, body, content='', tokenize='unicode61 remove_diacritics 2')"
+            )
+        except sqlite3.OperationalError as e:
+            print(f"Warning: SQLite has no FTS5 ({e}); history search falls back to substring matching")
+            self.full_text = False
+        self._read_conn = self._connect()
+        self._writer = threading.Thread(target=self._write_loop, name='history-writer', daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=10)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def append_claim(self, text, result, client=None):
+        """Queue a claim verification result; never blocks."""
+        meta = result.get('meta_analysis') or {}
+        score = meta.get('combined_confidence_score')
+        body = ' '.join(str(result.get(field) or '') for field in ('explanation', 'historical_context'))
+        self._append(('claim', text, normalize_claim(text), result.get('verdict'), result.get('tier'),
+                      score, client, None, None), result, body)
+
+    def append_image(self, sha256, phash, result, client=None):
+        """Queue an image analysis result; never blocks."""
+        exif = result.get('exif_metadata') or {}
+        body = ' '.join(str(value or '') for value in (
+            result.get('ela_summary'), exif.get('camera'), exif.get('software'),
+            ' '.join((result.get('forensic_flags') or {}).get('flagged_signals') or [])))
+        self._append(('image', None, None, result.get('verdict'), None,
+                      result.get('authenticity_score'), client, sha256,
+                      _to_signed(phash) if phash is not None else None), result, body)
+
+    def _append(self, row, result, body):
+        if row[3] is not None and not isinstance(row[3], str):
+            row = row[:3] + (str(row[3]),) + row[4:]
+        rate_limited = result.get('rate_limited')
+        if isinstance(rate_limited, dict) and 'client' in rate_limited:
+            # Degraded answers name the caller whose quota ran out; history is readable by anyone
+            result = dict(result, rate_limited={k: v for k, v in rate_limited.items() if k != 'client'})
+        # Serialized now: callers may go on to modify the result they responded with
+        row += (json.dumps(result, ensure_ascii=False),)
+        try:
+            self._queue.put_nowait((row, body))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return
+        with self._lock:
+            self.appended += 1
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception as e:
+                print(f"Warning: Failed to write {len(batch)} history records: {e}")
+                with self._lock:
+                    self.write_errors += len(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch):
+        conn = self._writer_conn
+        # IMMEDIATE takes the write lock up front, so no other process can add a newer record before ours
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            newest = conn.execute('SELECT MAX(created_at) FROM history').fetchone()[0] or 0.0
+            for row, body in batch:
+                newest = max(newest, self._clock())
+                cur = conn.execute(
+                    'INSERT INTO history (kind, created_at, claim, claim_key, verdict, tier, score, client, '
+                    'sha256, phash, result) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', (row[0], newest) + row[1:]
+                )
+                if self.full_text:
+                    conn.execute('INSERT INTO history_fts (rowid, claim, body) VALUES (?, ?, ?)',
+                                 (cur.lastrowid, row[1] or '', body))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        with self._lock:
+            self.written += len(batch)
+
+    def flush(self):
+        """Wait until everything queued so far is on disk."""
+        self._queue.join()
+
+    def _row(self, row, full=False):
+        record = {
+            'id': row[0],
+            'kind': row[1],
+            'created_at': row[2],
+            'claim': row[3],
+            'verdict': row[4],
+            'tier': row[5],
+            'score': row[6],
+            'sha256': row[7],
+            'phash': f'{row[8] & ((1 << 64) - 1):016x}' if row[8] is not None else None
+        }
+        if full:
+            record['result'] = json.loads(row[9])
+        return {key: value for key, value in record.items() if value is not None}
+
+    def get(self, record_id):
+        """The full record with this id, or None."""
+        with self._lock:
+            row = self._read_conn.execute(f'SELECT {_COLUMNS}, result FROM history WHERE id = ?',
+                                          (record_id,)).fetchone()
+        return self._row(row, full=True) if row is not None else None
+
+    def query(self, text=None, kind=None, verdict=None, tier=None, since=None, until=None,
+              cursor=None, limit=50, full=False):
+        """Newest-first page of records matching every given filter; returns (records, next_cursor).
+
+        ``text`` is a full-text search over claims and explanations (image records: forensic summaries
+        and camera/software).  ``since``/``until`` are Unix times.  Pass ``next_cursor`` back as ``cursor``
+        for the following page; it is None on the last page.
+        """
+        where = []
+        params = []
+        source = 'history h'
+        # Bounds and order go on the FTS rowid when searching, so FTS5 walks its doclist newest first
+        # and stops after one page instead of collecting every match to sort
+        id_column = 'h.id'
+        search = fts_query(text) if text else ''
+        if search and self.full_text:
+            source = 'history_fts f JOIN history h ON h.id = f.rowid'
+            id_column = 'f.rowid'
+            where.append('history_fts MATCH ?')
+            params.append(search)
+        elif text:
+            where.append("(h.claim LIKE ? ESCAPE '\\' OR h.result LIKE ? ESCAPE '\\')")
+            pattern = '%' + re.sub(r'([%_\\])', r'\\\1', text) + '%'
+            params += [pattern, pattern]
+        # Time bounds become id bounds (ids grow with created_at, see the module docstring),
+        # and the primary key is what pages walk
+        low, high = self._id_bounds(since, until)
+        if low is not None:
+            where.append(f'{id_column} >= ?')
+            params.append(low)
+        if high is not None:
+            where.append(f'{id_column} <= ?')
+            params.append(high)
+        if cursor is not None:
+            where.append(f'{id_column} < ?')
+            params.append(int(cursor))
+        for column, value in (('kind', kind), ('verdict', verdict), ('tier', tier)):
+            if value is not None:
+                where.append(f'h.{column} = ?')
+                params.append(value)
+
+        columns = ', '.join(f'h.{column}' for column in _COLUMNS.split(', ')) + (', h.result' if full else '')
+        sql = (f'SELECT {columns} FROM {source}' + (' WHERE ' + ' AND '.join(where) if where else '')
+               + f' ORDER BY {id_column} DESC LIMIT ?')
+        with self._lock:
+            rows = self._read_conn.execute(sql, params + [limit]).fetchall()
+        records = [self._row(row, full=full) for row in rows]
+        next_cursor = str(rows[-1][0]) if len(rows) == limit else None
+        return records, next_cursor
+
+    def _id_bounds(self, since, until):
+        # One index seek each: the first record at or after ``since`` and the last at or before ``until``
+        low = high = None
+        with self._lock:
+            if since is not None:
+                row = self._read_conn.execute('SELECT id FROM history WHERE created_at >= ? '
+                                              'ORDER BY created_at LIMIT 1', (since,)).fetchone()
+                low = row[0] if row is not None else 1 << 62
+            if until is not None:
+                row = self._read_conn.execute('SELECT id FROM history WHERE created_at <= ? '
+                                              'ORDER BY created_at DESC LIMIT 1', (until,)).fetchone()
+                high = row[0] if row is not None else -1
+        return low, high
+
+    def _scan(self, sql, params, batch_size, since=None):
+        """Yield batches of rows of ``sql`` (selecting id first, ending in a WHERE clause) newest first."""
+        last_id = 1 << 62
+        # Without an id floor the final, empty batch would walk every older record
+        low = self._id_bounds(since, None)[0] if since else None
+        if low is not None:
+            sql += ' AND id >= ?'
+            params = params + [low]
+        while True:
+            with self._lock:
+                rows = self._read_conn.execute(sql + ' AND id < ? ORDER BY id DESC LIMIT ?',
+                                               params + [last_id, batch_size]).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield rows
+
+    def recent_claims(self, since=0, limit=10000, tiers=('llm',)):
+        """The newest result per distinct claim with one of ``tiers``, newer than ``since``: [(claim, result, created_at)]."""
+        marks = ', '.join('?' * len(tiers))
+        seen = set()
+        entries = []
+        for rows in self._scan(f"SELECT id, claim_key, claim, result, created_at FROM history "
+                               f"WHERE kind = 'claim' AND tier IN ({marks})", list(tiers), 1000, since):
+            for _, key, claim, result, created_at in rows:
+                if not key or key in seen:
+                    continue
+                seen.add(key)
+                entries.append((claim, json.loads(result), created_at))
+                if len(entries) >= limit:
+                    return entries
+        return entries
+
+    def recent_images(self, since=0, limit=10000):
+        """The newest analysis per distinct upload newer than ``since``: [(sha256, phash, result, first_seen)].
+
+        ``first_seen`` is the earliest sighting among the records scanned, which stop soon after ``limit``.
+        """
+        entries = {}
+        for rows in self._scan("SELECT id, sha256, phash, result, created_at FROM history "
+                               "WHERE kind = 'image' AND sha256 IS NOT NULL", [], 1000, since):
+            for _, sha256, phash, result, created_at in rows:
+                if sha256 in entries:
+                    entries[sha256][3] = created_at
+                elif len(entries) < limit:
+                    entries[sha256] = [sha256, phash & ((1 << 64) - 1), json.loads(result), created_at]
+            if len(entries) >= limit:
+                break
+        return [tuple(entry) for entry in entries.values()]
+
+    def iter_labeled(self, batch_size=10000, tiers=('llm',)):
+        """Yield batches of (claim, label) for distinct claims whose verdict is in ``TRAINING_LABELS``.
+
+        Only ``tiers`` count (by default the LLM's own verdicts, so the local model never learns from
+        itself); for a claim verified more than once, the newest verdict wins.
+        """
+        marks = ', '.join('?' * len(tiers))
+        labels = ', '.join('?' * len(TRAINING_LABELS))
+        # 8-byte digests: millions of claims fit in memory where their keys might not
+        seen = set()
+        for rows in self._scan(f"SELECT id, claim_key, claim, verdict FROM history WHERE kind = 'claim' "
+                               f"AND tier IN ({marks}) AND verdict IN ({labels})",
+                               list(tiers) + list(TRAINING_LABELS), batch_size):
+            batch = []
+            for _, key, claim, verdict in rows:
+                digest = _key_digest(key or claim)
+                if digest in seen:
+                    continue
+                seen.add(digest)
+                batch.append((claim, TRAINING_LABELS[verdict]))
+            if batch:
+                yield batch
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._read_conn.execute('SELECT kind, COUNT(*) FROM history GROUP BY kind').fetchall())
+            return {
+                'claims': counts.get('claim', 0),
+                'images': counts.get('image', 0),
+                'appended': self.appended,
+                'written': self.written,
+                'queued': self._queue.qsize(),
+                'dropped': self.dropped,
+                'write_errors': self.write_errors,
+                'full_text': self.full_text
+            }
@@ -0,0 +1,175 @@
+"""Content-hash cache and re-upload detection for /api/analyze-image.
+
+The same meme images are uploaded over and over.  Exact re-uploads are found
+by the SHA-256 of the raw bytes and answered from the stored forensic result
+without decoding anything.  Re-encoded or resized copies get a different
+SHA-256 but keep their perceptual hash (64-bit DCT pHash), so they are
+flagged as "seen before" with the earliest time that picture was seen.
+
+Perceptual lookups split the hash into 8 one-byte bands stored in indexed
+columns: two hashes within Hamming distance 7 must share at least one band,
+so only a small candidate set is ever compared.  That guarantee ends at 7;
+a larger ``max_distance`` compares against every stored hash instead.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+PHASH_SIZE = 32
+PHASH_BITS = 8
+N_BANDS = 8
+# Hashes further apart than this can differ in every band, so banded lookups would miss them
+MAX_BANDED_DISTANCE = N_BANDS - 1
+
+
+def _dct_matrix(n):
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    m = np.cos(np.pi * (2 * i + 1) * k / (2 * n))
+    m[0] *= 1 / np.sqrt(2)
+    return m * np.sqrt(2 / n)
+
+
+_DCT = _dct_matrix(PHASH_SIZE)
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def perceptual_hash(image):
+    """64-bit pHash: sign of the low-frequency DCT coefficients against their median."""
+    # A JPEG nothing has decoded yet only needs a downscaled luma plane; no-op otherwise
+    image.draft('L', (PHASH_SIZE * 4, PHASH_SIZE * 4))
+    gray = image.convert('L').resize((PHASH_SIZE, PHASH_SIZE), Image.Resampling.LANCZOS, reducing_gap=3.0)
+    pixels = np.asarray(gray, dtype=np.float64)
+    low = (_DCT @ pixels @ _DCT.T)[:PHASH_BITS, :PHASH_BITS].ravel()
+    bits = low > np.median(low[1:])
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def _to_signed(value):
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _bands(value):
+    return [(value >> (8 * i)) & 0xFF for i in range(N_BANDS)]
+
+
+class ImageCache:
+    """SQLite-backed store of forensic results keyed by content hash, with perceptual lookup."""
+
+    def __init__(self, path, max_entries=20000, max_distance=6):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        if max_distance > MAX_BANDED_DISTANCE:
+            print(f"Warning: perceptual match distance {max_distance} is above {MAX_BANDED_DISTANCE}; "
+                  "every lookup will compare against all cached images")
+        self.hits = 0
+        self.perceptual_matches = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        band_columns = ''.join(f' b{i} INTEGER NOT NULL,' for i in range(N_BANDS))
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS images ('
+            ' sha256 TEXT PRIMARY KEY,'
+            ' phash INTEGER NOT NULL,'
+            f'{band_columns}'
+            ' result TEXT NOT NULL,'
+            ' first_seen REAL NOT NULL,'
+            ' last_access REAL NOT NULL,'
+            ' times_seen INTEGER NOT NULL DEFAULT 1)'
+        )
+        for i in range(N_BANDS):
+            self._conn.execute(f'CREATE INDEX IF NOT EXISTS images_b{i} ON images (b{i})')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS images_last_access ON images (last_access)')
+        self._size = self._conn.execute('SELECT COUNT(*) FROM images').fetchone()[0]
+
+    def get(self, sha256):
+        """Return the cached entry for an exact byte-for-byte re-upload, or None."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT result, first_seen, times_seen FROM images WHERE sha256 = ?', (sha256,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                'UPDATE images SET last_access = ?, times_seen = times_seen + 1 WHERE sha256 = ?', (now, sha256)
+            )
+            self.hits += 1
+        return {'result': json.loads(row[0]), 'first_seen': row[1], 'times_seen': row[2] + 1}
+
+    def find_similar(self, phash):
+        """Return the closest earlier upload within ``max_distance`` bits as (distance, first_seen), or None."""
+        if self.max_distance > MAX_BANDED_DISTANCE:
+            sql, params = 'SELECT phash, first_seen FROM images', []
+        else:
+            sql = 'SELECT phash, first_seen FROM images WHERE ' + ' OR '.join(f'b{i} = ?' for i in range(N_BANDS))
+            params = _bands(phash)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        best = None
+        for stored, first_seen in rows:
+            distance = hamming(phash, stored & ((1 << 64) - 1))
+            if distance <= self.max_distance and (best is None or (distance, first_seen) < best):
+                best = (distance, first_seen)
+        if best is not None:
+            with self._lock:
+                self.perceptual_matches += 1
+        return best
+
+    def put(self, sha256, phash, result, first_seen=None):
+        """Store a forensic result; ``first_seen`` carries the earliest sighting of a perceptual match."""
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                'INSERT OR IGNORE INTO images (sha256, phash, '
+                + ''.join(f'b{i}, ' for i in range(N_BANDS))
+                + 'result, first_seen, last_access) VALUES (?, ?, '
+                + '?, ' * N_BANDS + '?, ?, ?)',
+                [sha256, _to_signed(phash)] + _bands(phash) + [json.dumps(result), first_seen or now, now]
+            )
+            if cur.rowcount:
+                self._size += 1
+            if self._size > self.max_entries:
+                cur = self._conn.execute(
+                    'DELETE FROM images WHERE sha256 IN ('
+                    ' SELECT sha256 FROM images ORDER BY last_access DESC LIMIT -1 OFFSET ?)',
+                    (self.max_entries,)
+                )
+                self.evictions += max(0, cur.rowcount)
+                self._size = self._conn.execute('SELECT COUNT(*) FROM images').fetchone()[0]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'perceptual_matches': self.perceptual_matches,
+                'evictions': self.evictions,
+                'size': self._size,
+                'max_entries': self.max_entries,
+                'max_distance': self.max_distance
+            }
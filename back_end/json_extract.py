@@ -0,0 +1,264 @@
+"""Tolerant extraction of the verdict JSON object from LLM output.
+
+The model is asked for bare JSON but regularly wraps it in prose or code
+fences, leaves trailing commas, or uses single quotes.  ``JSONObjectExtractor``
+scans text incrementally (it can be fed streamed deltas), finds the first
+balanced ``{...}`` that parses -- after light repair if needed -- and
+validates it against the verdict schema, so a chatty answer no longer costs
+the user a retry and a second LLM call.
+"""
+import json
+import re
+
+VERDICTS = ('TRUE', 'FALSE', 'MIXED', 'UNVERIFIABLE')
+TEXT_FIELDS = ('explanation', 'historical_context', 'first_verified', 'last_updated')
+
+# Characters that can change the scanner state; everything else is skipped in bulk
+_OUTSIDE = re.compile(r'[{}"\']')
+_IN_DOUBLE = re.compile(r'["\\]')
+_IN_SINGLE = re.compile(r"['\\]")
+_TRAILING_COMMA = re.compile(r',(\s*[}\]])')
+_BARE_LITERALS = {'True': 'true', 'False': 'false', 'None': 'null'}
+_BARE_WORD = re.compile(r'\b(True|False|None)\b')
+_SMART_QUOTES = str.maketrans({'“': '"', '”': '"', '‘': "'", '’': "'"})
+_WHITESPACE = ' \t\r\n'
+
+
+def _opens_string(text, i):
+    """Whether the quote at ``text[i]`` can start a string: JSON only puts one after ``{ [ : ,``.
+
+    Double quotes always count.  A single quote elsewhere is an apostrophe in
+    prose (``{it's complicated}``) and must not swallow the text after it.
+    """
+    if text[i] == '"':
+        return True
+    i -= 1
+    while i >= 0 and text[i] in _WHITESPACE:
+        i -= 1
+    return i >= 0 and text[i] in '{[:,'
+
+
+def validate_verdict(obj):
+    """Check ``obj`` against the verdict schema and return a normalized copy; raises ValueError."""
+    if not isinstance(obj, dict):
+        raise ValueError('verdict must be a JSON object')
+    verdict = str(obj.get('verdict', '')).strip().upper()
+    if verdict not in VERDICTS:
+        raise ValueError(f"unknown verdict {obj.get('verdict')!r}")
+    result = dict(obj)
+    result['verdict'] = verdict
+
+    confidence = obj.get('confidence')
+    if isinstance(confidence, bool) or confidence is None:
+        confidence = '0%'
+    elif isinstance(confidence, (int, float)):
+        value = confidence * 100 if 0 < confidence <= 1 else confidence
+        confidence = f"{value:g}%"
+    else:
+        confidence = str(confidence).strip()
+        if confidence and not confidence.endswith('%'):
+            confidence += '%'
+    result['confidence'] = confidence
+
+    for key in TEXT_FIELDS:
+        value = obj.get(key)
+        result[key] = '' if value is None else str(value)
+
+    sources = obj.get('sources')
+    if sources is None:
+        sources = []
+    elif isinstance(sources, (str, dict)):
+        sources = [sources]
+    result['sources'] = [s if isinstance(s, str) else json.dumps(s) for s in sources]
+    return result
+
+
+def _fix_structure(segment):
+    segment = _TRAILING_COMMA.sub(r'\1', segment)
+    return _BARE_WORD.sub(lambda m: _BARE_LITERALS[m.group(1)], segment)
+
+
+def repair_json(text):
+    """Fix the defects LLMs commonly produce: single quotes, trailing commas, Python literals.
+
+    Only the text between strings is rewritten, so string values are never altered.
+    """
+    out = []
+    i = 0
+    n = len(text)
+    segment_start = 0
+    while i < n:
+        quote = text[i]
+        if quote != '"' and quote != "'":
+            i += 1
+            continue
+        out.append(_fix_structure(text[segment_start:i]))
+        j = i + 1
+        chars = []
+        while j < n and text[j] != quote:
+            if text[j] == '\\' and j + 1 < n:
+                # \' is not a valid JSON escape; the quote needs no escaping inside "..."
+                chars.append("'" if text[j + 1] == "'" else text[j:j + 2])
+                j += 2
+                continue
+            chars.append('\\"' if text[j] == '"' else text[j])
+            j += 1
+        out.append('"' + ''.join(chars) + '"')
+        i = j + 1
+        segment_start = i
+    out.append(_fix_structure(text[segment_start:]))
+    return ''.join(out)
+
+
+def _loads(candidate):
+    try:
+        return json.loads(candidate, strict=False)
+    except json.JSONDecodeError:
+        pass
+    try:
+        return json.loads(repair_json(candidate), strict=False)
+    except json.JSONDecodeError:
+        if not any(q in candidate for q in '“”‘’'):
+            raise
+    # Typographic quotes used as delimiters: only worth trying once the cheaper repairs failed
+    return json.loads(repair_json(candidate.translate(_SMART_QUOTES)), strict=False)
+
+
+def _closers(text):
+    """Return the brackets needed to close every object/array still open at the end of ``text``."""
+    stack = []
+    quote = None
+    i = 0
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if quote is not None:
+            if ch == '\\':
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch in '"\'' and _opens_string(text, i):
+            quote = ch
+        elif ch in '{[':
+            stack.append('}' if ch == '{' else ']')
+        elif ch in '}]' and stack:
+            stack.pop()
+        i += 1
+    return ''.join(reversed(stack))
+
+
+class JSONObjectExtractor:
+    """Incrementally find the first balanced JSON object in text that satisfies ``validate``.
+
+    Call ``feed`` with each chunk; it returns the parsed object as soon as one
+    is complete (and keeps returning it afterwards), otherwise None.
+    """
+
+    def __init__(self, validate=validate_verdict):
+        self.validate = validate
+        self.result = None
+        self.last_error = None
+        self._buf = ''
+        self._pos = 0
+        self._start = -1
+        self._depth = 0
+        self._quote = None
+
+    def feed(self, chunk):
+        if self.result is not None:
+            return self.result
+        self._buf += chunk
+        buf = self._buf
+        pos = self._pos
+        while True:
+            if self._quote is not None:
+                match = (_IN_DOUBLE if self._quote == '"' else _IN_SINGLE).search(buf, pos)
+                if match is None:
+                    pos = len(buf)
+                    break
+                if match.group() == '\\':
+                    if match.end() >= len(buf):
+                        # Escape split across chunks: resume at the backslash next time
+                        pos = match.start()
+                        break
+                    pos = match.end() + 1
+                    continue
+                self._quote = None
+                pos = match.end()
+                continue
+
+            match = _OUTSIDE.search(buf, pos)
+            if match is None:
+                pos = len(buf)
+                break
+            ch = match.group()
+            pos = match.end()
+            if ch == '{':
+                if self._depth == 0:
+                    self._start = match.start()
+                self._depth += 1
+            elif self._depth == 0:
+                # Quotes and stray braces in surrounding prose don't matter
+                continue
+            elif ch == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    parsed = self._accept(buf[self._start:pos])
+                    if parsed is not None:
+                        self.result = parsed
+                        self._pos = pos
+                        return parsed
+                    # Not our object (e.g. braces in prose); look for the next one after its opening brace
+                    pos = self._start + 1
+                    self._start = -1
+            elif _opens_string(buf, match.start()):
+                self._quote = ch
+        self._pos = pos
+        return None
+
+    def _accept(self, candidate):
+        try:
+            obj = _loads(candidate)
+            return self.validate(obj) if self.validate else obj
+        except ValueError as e:
+            self.last_error = e
+            return None
+
+    def close(self):
+        """Finish the stream: return the result or raise json.JSONDecodeError."""
+        if self.result is not None:
+            return self.result
+        # A truncated answer may still be recoverable once closed off.  If the open
+        # candidate is not one (an unbalanced brace or a stray quote in prose),
+        # scan again from just after its opening brace, as feed() does on "}".
+        while self._depth > 0 and self._start >= 0:
+            tail = self._buf[self._start:]
+            if self._quote is not None:
+                tail += self._quote
+            parsed = self._accept(tail + _closers(tail))
+            if parsed is not None:
+                self.result = parsed
+                return parsed
+            self._pos = self._start + 1
+            self._start = -1
+            self._depth = 0
+            self._quote = None
+            if self.feed('') is not None:
+                return self.result
+        reason = f': {self.last_error}' if self.last_error else ''
+        raise json.JSONDecodeError(f'No valid verdict object found{reason}', self._buf, 0)
+
+
+def extract_verdict(content):
+    """Parse the verdict out of a complete LLM response; raises json.JSONDecodeError on failure."""
+    content = content or ''
+    # Fast path: one well-formed object, possibly fenced or wrapped in prose
+    start, end = content.find('{'), content.rfind('}')
+    if 0 <= start < end:
+        try:
+            return validate_verdict(json.loads(content[start:end + 1], strict=False))
+        except ValueError:
+            pass
+    extractor = JSONObjectExtractor()
+    extractor.feed(content)
+    return extractor.close()
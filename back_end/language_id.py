@@ -0,0 +1,73 @@
+"""Fast language identification for incoming claims.
+
+Claims arrive in Arabic script (Modern Standard Arabic and Tunisian Derja),
+French, English and Tunizi, Derja written in Latin letters with digits for
+the sounds Latin lacks ("3ajel", "fadhi7a", "9bal").  Routing a claim to the
+right local model only needs those four buckets, so instead of a general
+language model this counts scripts and a few hundred marker words in one
+regex pass: a few microseconds per claim, no dependencies and no files.
+
+* More Arabic-script than Latin letters (URLs aside) is ``ar``.
+* Latin text is scored on Tunizi markers (digit-letter words and common
+  Derja words), French function words and accents, and English function
+  words; Tunizi wins ties since it borrows French words freely, and text
+  with no markers at all falls back to ``en``, the training set's language.
+"""
+import re
+
+LANGUAGES = ('ar', 'en', 'fr', 'tunizi')
+DEFAULT_LANGUAGE = 'en'
+
+_URL_RE = re.compile(r'(?:https?://|www\.)\S+', re.IGNORECASE)
+_ARABIC_RE = re.compile('[؀-ۿݐ-ݿࢠ-ࣿﭐ-﷿ﹰ-﻿]')
+_LATIN_RE = re.compile('[a-zA-ZÀ-ɏ]')
+_WORD_RE = re.compile(r"[a-zà-ÿ0-9']+")
+# 3ajel, fadhi7a, s7i7, 9bal: a digit standing for a letter, next to letters (but not "5g", "covid19" or "3rd")
+_ARABIZI_RE = re.compile(r'[a-z]*[235789][a-z]{2,}|[a-z]+[235789][a-z]*')
+_ORDINAL_RE = re.compile(r'\d+(?:st|nd|rd|th|er|re|e|eme|ème)')
+_FRENCH_ACCENTS = frozenset('éèêëàâçîïôûùœ')
+
+TUNIZI_WORDS = frozenset('''
+    ahna ama ana barcha barsha bech bch bjeh brabi chbik chkoun chnia chnoua chnowa chouf choufou chouft
+    ejjeya elli ena enti fama famma fel hadha hedha hedhi houma houwa hiya illi jeya kifech kifach kima
+    klem kol lezem lil mch mech mel mouch mich mta mte3 nheb nhar rabbi sahbi tawa taw tsaker walla wela
+    wach wakt wa9t yesser yekhi yezzi zeda zada khater 5ater partagiwha
+'''.split())
+FRENCH_WORDS = frozenset('''
+    le la les des une est et du de pour dans que qui pas sur au aux avec ce cette ces il elle ils sont
+    plus ne se nous vous leur été par ses son sa tous tout avant après va vont fait selon mais ou où
+'''.split())
+ENGLISH_WORDS = frozenset('''
+    the is are was were and of to in that for it with will on this you be have has from by at an not
+    they their your can all who what after before which would been about there than its his her
+'''.split())
+
+
+def detect_language(text):
+    """Return one of ``LANGUAGES`` for a claim."""
+    text = _URL_RE.sub(' ', text or '')
+    arabic = len(_ARABIC_RE.findall(text))
+    if arabic and arabic >= len(_LATIN_RE.findall(text)):
+        return 'ar'
+
+    tunizi = french = english = 0
+    for word in _WORD_RE.findall(text.lower()):
+        if word in TUNIZI_WORDS:
+            tunizi += 1
+        elif _ARABIZI_RE.fullmatch(word) and not _ORDINAL_RE.fullmatch(word):
+            tunizi += 2
+        elif word in FRENCH_WORDS:
+            french += 1
+        elif word in ENGLISH_WORDS:
+            english += 1
+        elif not _FRENCH_ACCENTS.isdisjoint(word):
+            french += 1
+    if tunizi and tunizi >= max(french, english):
+        return 'tunizi'
+    if french > english:
+        return 'fr'
+    return DEFAULT_LANGUAGE
+
+
+def detect_languages(texts):
+    return [detect_language(str(text)) for text in texts]
@@ -0,0 +1,192 @@
+"""Concurrent Perplexity client for the verification endpoints.
+
+Flask request threads used to block on a synchronous ``sonar-pro`` call each,
+so throughput was capped at workers / LLM latency.  ``LLMExecutor`` runs an
+``AsyncPerplexity`` client on one background event loop instead: requests are
+multiplexed over a pooled keep-alive HTTP connection set, bounded by a
+concurrency semaphore, timed out per attempt and retried with jittered
+exponential backoff on 429/5xx.  Callers get a ``concurrent.futures.Future``
+so they can keep doing local work while the LLM request is in flight, or a
+plain generator of content deltas from ``stream`` for incremental responses.
+"""
+import asyncio
+import queue
+import random
+import threading
+
+import httpx
+from perplexity import APIConnectionError, APIStatusError, AsyncPerplexity, DefaultAsyncHttpxClient
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMExecutor:
+    def __init__(self, api_key, base_url=None, model='sonar-pro', max_concurrency=64,
+                 timeout=60.0, max_retries=3, backoff_base=0.5, backoff_max=8.0,
+                 max_connections=100, max_keepalive=50):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self._stats_lock = threading.Lock()
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='llm-executor', daemon=True)
+        self._thread.start()
+
+        async def _setup():
+            # The semaphore and HTTP pool must be created on the loop that will use them
+            self._semaphore = asyncio.Semaphore(max_concurrency)
+            http_client = DefaultAsyncHttpxClient(
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive,
+                                    keepalive_expiry=30.0),
+                timeout=httpx.Timeout(timeout, connect=10.0)
+            )
+            # Retries are handled here so that they respect our jitter and concurrency slot
+            self._client = AsyncPerplexity(api_key=api_key, base_url=base_url, max_retries=0,
+                                           http_client=http_client)
+
+        asyncio.run_coroutine_threadsafe(_setup(), self._loop).result()
+
+    def submit(self, messages, **kwargs):
+        """Schedule a chat completion and return a Future resolving to the message content."""
+        return asyncio.run_coroutine_threadsafe(self._complete(messages, kwargs), self._loop)
+
+    def complete(self, messages, **kwargs):
+        return self.submit(messages, **kwargs).result()
+
+    def stream(self, messages, **kwargs):
+        """Yield content deltas as the model produces them; raises if the call fails.
+
+        Closing the generator early (e.g. the HTTP client went away) cancels the upstream request.
+        """
+        deltas = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(self._stream(messages, kwargs, deltas), self._loop)
+        try:
+            while True:
+                kind, value = deltas.get()
+                if kind == 'delta':
+                    yield value
+                elif kind == 'error':
+                    raise value
+                else:
+                    return
+        finally:
+            future.cancel()
+
+    def _backoff(self, attempt, error):
+        retry_after = None
+        response = getattr(error, 'response', None)
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get('retry-after'))
+            except (TypeError, ValueError):
+                retry_after = None
+        # Full jitter keeps synchronized clients from retrying in lockstep
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+    async def _complete(self, messages, kwargs):
+        async with self._semaphore:
+            with self._stats_lock:
+                self.in_flight += 1
+            try:
+                attempt = 0
+                while True:
+                    try:
+                        response = await asyncio.wait_for(
+                            self._client.chat.completions.create(model=self.model, messages=messages, **kwargs),
+                            timeout=self.timeout
+                        )
+                        with self._stats_lock:
+                            self.completed += 1
+                        return response.choices[0].message.content
+                    except (asyncio.TimeoutError, APIConnectionError, APIStatusError) as e:
+                        retryable = not isinstance(e, APIStatusError) or e.status_code in RETRYABLE_STATUS
+                        if not retryable or attempt >= self.max_retries:
+                            with self._stats_lock:
+                                self.failed += 1
+                            if isinstance(e, asyncio.TimeoutError):
+                                raise TimeoutError(f'LLM call timed out after {self.timeout}s') from e
+                            raise
+                        with self._stats_lock:
+                            self.retries += 1
+                        await asyncio.sleep(self._backoff(attempt, e))
+                        attempt += 1
+            finally:
+                with self._stats_lock:
+                    self.in_flight -= 1
+
+    async def _stream(self, messages, kwargs, deltas):
+        async with self._semaphore:
+            with self._stats_lock:
+                self.in_flight += 1
+            try:
+                attempt = 0
+                while True:
+                    started = False
+                    try:
+                        response = await asyncio.wait_for(
+                            self._client.chat.completions.create(model=self.model, messages=messages,
+                                                                 stream=True, **kwargs),
+                            timeout=self.timeout
+                        )
+                        try:
+                            chunks = response.__aiter__()
+                            while True:
+                                # The timeout applies per chunk so long answers aren't cut off
+                                try:
+                                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=self.timeout)
+                                except StopAsyncIteration:
+                                    break
+                                delta = chunk.choices[0].delta.content if chunk.choices else None
+                                if delta:
+                                    started = True
+                                    deltas.put(('delta', delta))
+                        finally:
+                            await response.close()
+                        with self._stats_lock:
+                            self.completed += 1
+                        deltas.put(('done', None))
+                        return
+                    except (asyncio.TimeoutError, APIConnectionError, APIStatusError) as e:
+                        retryable = not isinstance(e, APIStatusError) or e.status_code in RETRYABLE_STATUS
+                        # Once tokens have reached the caller a retry would duplicate them
+                        if started or not retryable or attempt >= self.max_retries:
+                            with self._stats_lock:
+                                self.failed += 1
+                            if isinstance(e, asyncio.TimeoutError):
+                                e = TimeoutError(f'LLM stream stalled for {self.timeout}s')
+                            deltas.put(('error', e))
+                            return
+                        with self._stats_lock:
+                            self.retries += 1
+                        await asyncio.sleep(self._backoff(attempt, e))
+                        attempt += 1
+                    except Exception as e:
+                        with self._stats_lock:
+                            self.failed += 1
+                        deltas.put(('error', e))
+                        return
+            finally:
+                with self._stats_lock:
+                    self.in_flight -= 1
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'in_flight': self.in_flight,
+                'completed': self.completed,
+                'failed': self.failed,
+                'retries': self.retries,
+                'max_concurrency': self.max_concurrency,
+                'timeout_seconds': self.timeout
+            }
@@ -0,0 +1,233 @@
+"""Prometheus-style metrics and per-request stage timing.
+
+A small, dependency-free subset of the Prometheus client: counters, gauges
+(including ones read from a callback at scrape time) and cumulative
+histograms, rendered in the text exposition format by ``Registry.render``
+for a ``/metrics`` endpoint.  A disabled registry hands out the same metric
+objects, but every update returns before taking a lock, and requests get
+the no-op ``NULL_TIMER`` instead of a ``RequestTimer``, so instrumentation
+left in the hot path costs an attribute check.
+
+``RequestTimer`` times the named stages of one request, feeding a stage
+histogram and, optionally, a ``Server-Timing`` header so a single slow
+response can be broken down in the browser's network panel.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+NULL_STAGE = nullcontext()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape("" if value is None else value)}"' for name, value in (*zip(names, values), *extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _sort_key(item):
+    # Label values may mix types (e.g. status codes), so order by their text
+    return tuple(map(str, item[0]))
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self._registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(map(labels.get, self.labelnames))
+
+    def _samples(self):
+        with self._lock:
+            return [(self.name, key, (), value) for key, value in sorted(self._values.items(), key=_sort_key)]
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for name, key, extra, value in self._samples():
+            lines.append(f'{name}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}')
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if not self._registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        if not self._registry.enabled:
+            return
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        if not self._registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class CallbackGauge(_Metric):
+    """Gauge whose samples come from ``callback()`` at scrape time: a number, or {label tuple: number}."""
+    kind = 'gauge'
+
+    def __init__(self, registry, name, documentation, callback, labelnames=()):
+        super().__init__(registry, name, documentation, labelnames)
+        self._callback = callback
+
+    def _samples(self):
+        try:
+            values = self._callback()
+        except Exception:
+            return []
+        if values is None:
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [(self.name, key, (), value) for key, value in sorted(values.items(), key=_sort_key)]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        if not self._registry.enabled:
+            return
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _samples(self):
+        samples = []
+        with self._lock:
+            items = sorted(((key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()),
+                           key=_sort_key)
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float('inf')), counts):
+                cumulative += bucket_count
+                samples.append((f'{self.name}_bucket', key, (('le', _format_value(float(bound))),), cumulative))
+            samples.append((f'{self.name}_sum', key, (), total))
+            samples.append((f'{self.name}_count', key, (), count))
+        return samples
+
+
+class Registry:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._metrics = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._add(Gauge(self, name, documentation, labelnames))
+
+    def callback_gauge(self, name, documentation, callback, labelnames=()):
+        return self._add(CallbackGauge(self, name, documentation, callback, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(self, name, documentation, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class _Stage:
+    __slots__ = ('timer', 'name', 'started')
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.timer.record(self.name, time.perf_counter() - self.started)
+
+
+class RequestTimer:
+    """Stage durations of one request, recorded into ``histogram`` labelled with ``route`` and the stage."""
+
+    def __init__(self, histogram, route):
+        self.histogram = histogram
+        self.route = route
+        self.started = time.perf_counter()
+        self.stages = []
+
+    def stage(self, name):
+        """Context manager timing one stage."""
+        return _Stage(self, name)
+
+    def record(self, name, seconds):
+        self.stages.append((name, seconds))
+        self.histogram.observe(seconds, route=self.route, stage=name)
+
+    def server_timing(self):
+        """Value for a ``Server-Timing`` header: each stage and the total, in milliseconds."""
+        parts = [f'{name};dur={seconds * 1000:.2f}' for name, seconds in self.stages]
+        parts.append(f'total;dur={(time.perf_counter() - self.started) * 1000:.2f}')
+        return ', '.join(parts)
+
+
+class _NullTimer:
+    """Stands in for a ``RequestTimer`` when timing is off."""
+
+    def stage(self, name):
+        return NULL_STAGE
+
+    def record(self, name, seconds):
+        pass
+
+
+NULL_TIMER = _NullTimer()
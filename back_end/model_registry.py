@@ -0,0 +1,272 @@
+"""Hot-reloadable registry of local classifier versions with A/B routing.
+
+Each subdirectory of the registry is one version: a ``model.pkl`` +
+``vectorizer.pkl`` pair and/or a ``model_compact/`` export of it (preferred
+when it matches the pickles).  An optional ``registry.json`` picks what is
+served::
+
+    {"active": "20261017-120000", "candidate": "20261020-090000", "candidate_percent": 10}
+
+Without it the newest version (by name, so timestamps work) is active.  A
+polling thread watches the directory; new or changed versions are loaded off
+the request path and swapped in by replacing one immutable ``Snapshot``, so
+requests in flight finish on the models they started with and nothing is
+dropped.  ``candidate_percent`` of claims (chosen by a stable hash of the
+normalized claim, so a claim always lands on the same arm) are answered by
+the candidate; for those, both models' scores go to the A/B log.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import joblib
+
+from compact_model import CompactModel, META_FILE, export_model, is_current as compact_is_current
+from verdict_cache import normalize_claim
+
+CONTROL_FILE = 'registry.json'
+COMPACT_DIR = 'model_compact'
+
+
+def load_model_dir(directory, compact_dir=None):
+    """Load (model, vectorizer, format) from a directory of pickles and/or a compact export."""
+    model_path = os.path.join(directory, 'model.pkl')
+    vectorizer_path = os.path.join(directory, 'vectorizer.pkl')
+    compact_dir = compact_dir or os.path.join(directory, COMPACT_DIR)
+    # The compact export is memory-mapped (shared across workers) and needs no scikit-learn import
+    if compact_dir and os.path.isfile(os.path.join(compact_dir, META_FILE)) and \
+            compact_is_current(compact_dir, [model_path, vectorizer_path]):
+        compact = CompactModel(compact_dir)
+        return compact, compact, 'compact'
+    if os.path.exists(model_path) and os.path.exists(vectorizer_path):
+        if compact_dir and os.path.isdir(compact_dir):
+            print(f"Warning: compact model export in {compact_dir} is stale; run export_model.py. Loading pickles instead.")
+        return joblib.load(model_path), joblib.load(vectorizer_path), 'pickle'
+    raise FileNotFoundError(f'no model.pkl/vectorizer.pkl or compact export in {directory}')
+
+
+def publish_version(registry_dir, model, vectorizer, version=None):
+    """Write a new version (pickles + compact export when possible) into the registry atomically; returns its name."""
+    version = version or time.strftime('%Y%m%d-%H%M%S')
+    os.makedirs(registry_dir, exist_ok=True)
+    # Build it under a hidden name and rename, so the watcher never sees a half-written version
+    staging = tempfile.mkdtemp(prefix='.staging-', dir=registry_dir)
+    try:
+        model_path = os.path.join(staging, 'model.pkl')
+        vectorizer_path = os.path.join(staging, 'vectorizer.pkl')
+        joblib.dump(model, model_path)
+        joblib.dump(vectorizer, vectorizer_path)
+        try:
+            export_model(vectorizer, model, os.path.join(staging, COMPACT_DIR), sources=[model_path, vectorizer_path])
+        except ValueError as e:
+            # e.g. hashed features have no vocabulary to export; the pickles are served instead
+            print(f"Note: no compact export for version {version}: {e}")
+        os.rename(staging, os.path.join(registry_dir, version))
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return version
+
+
+def _dir_signature(directory):
+    latest = 0.0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            try:
+                latest = max(latest, os.stat(os.path.join(root, name)).st_mtime)
+            except OSError:
+                pass
+    return latest
+
+
+class ModelVersion:
+    """One loaded model/vectorizer pair; immutable once published in a snapshot."""
+
+    def __init__(self, version, model, vectorizer, fmt, signature=None):
+        self.version = version
+        self.model = model
+        self.vectorizer = vectorizer
+        self.format = fmt
+        self.signature = signature
+        self.loaded_at = time.time()
+        # Set by the app: near-duplicate index over this vectorizer's feature space
+        self.similarity_index = None
+
+    def describe(self):
+        described = {'version': self.version, 'format': self.format, 'loaded_at': self.loaded_at}
+        if hasattr(self.vectorizer, 'languages'):
+            # Per-language models (train.py --multilingual)
+            described['languages'] = list(self.vectorizer.languages)
+            described['default_language'] = self.vectorizer.default
+        return described
+
+
+class Snapshot:
+    """What is being served at one moment; requests hold on to one for their whole lifetime."""
+
+    def __init__(self, active, candidate=None, candidate_percent=0.0):
+        self.active = active
+        self.candidate = candidate
+        self.candidate_percent = candidate_percent if candidate is not None else 0.0
+
+    def routes_to_candidate(self, text):
+        if self.candidate is None or self.candidate_percent <= 0:
+            return False
+        digest = hashlib.sha1((normalize_claim(text) or text).encode('utf-8')).digest()
+        return int.from_bytes(digest[:4], 'big') % 10000 < self.candidate_percent * 100
+
+
+class ModelRegistry:
+    def __init__(self, directory, fallback_dir=None, fallback_compact_dir=None, poll_seconds=5.0,
+                 ab_log_path=None, on_activate=None):
+        self.directory = directory
+        self.fallback_dir = fallback_dir
+        self.fallback_compact_dir = fallback_compact_dir
+        self.poll_seconds = poll_seconds
+        self.ab_log_path = ab_log_path
+        self.on_activate = on_activate
+        self.snapshot = None
+        self.reloads = 0
+        self.reload_errors = 0
+        self.last_error = None
+        self.served = {}
+        self.ab_compared = 0
+        self.ab_agreed = 0
+        self._signature = None
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+        self.refresh()
+
+    def start(self):
+        """Watch the registry directory in a daemon thread."""
+        if self.poll_seconds > 0:
+            threading.Thread(target=self._watch, name='model-registry', daemon=True).start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_seconds)
+            self.refresh()
+
+    def _versions(self):
+        if not self.directory or not os.path.isdir(self.directory):
+            return {}
+        return {
+            entry.name: _dir_signature(entry.path)
+            for entry in os.scandir(self.directory)
+            if entry.is_dir() and not entry.name.startswith('.')
+        }
+
+    def _read_control(self):
+        path = os.path.join(self.directory, CONTROL_FILE) if self.directory else None
+        if not path or not os.path.exists(path):
+            return {}, None
+        with open(path) as f:
+            return json.load(f), os.stat(path).st_mtime
+
+    def _load(self, version, signature):
+        # Reuse what is already in memory unless the version's files changed
+        current = self.snapshot
+        for loaded in (current.active, current.candidate) if current else ():
+            if loaded is not None and loaded.version == version and loaded.signature == signature:
+                return loaded
+        model, vectorizer, fmt = load_model_dir(os.path.join(self.directory, version))
+        return ModelVersion(version, model, vectorizer, fmt, signature)
+
+    def refresh(self):
+        """Re-scan the registry and swap in any change; returns True if the snapshot changed."""
+        with self._lock:
+            signature = None
+            try:
+                versions = self._versions()
+                control, control_mtime = self._read_control()
+                signature = (tuple(sorted(versions.items())), control_mtime)
+                if signature == self._signature:
+                    return False
+
+                if versions:
+                    active_name = control.get('active') or max(versions)
+                    if active_name not in versions:
+                        raise ValueError(f'active version {active_name!r} not found in {self.directory}')
+                    active = self._load(active_name, versions[active_name])
+                    candidate = None
+                    candidate_name = control.get('candidate')
+                    if candidate_name and candidate_name != active_name:
+                        if candidate_name not in versions:
+                            raise ValueError(f'candidate version {candidate_name!r} not found in {self.directory}')
+                        candidate = self._load(candidate_name, versions[candidate_name])
+                    percent = min(100.0, max(0.0, float(control.get('candidate_percent', 0))))
+                    snapshot = Snapshot(active, candidate, percent)
+                elif self.snapshot is None and self.fallback_dir:
+                    # No versions published yet: serve the model shipped next to app.py
+                    model, vectorizer, fmt = load_model_dir(self.fallback_dir, self.fallback_compact_dir)
+                    snapshot = Snapshot(ModelVersion('default', model, vectorizer, fmt))
+                else:
+                    self._signature = signature
+                    return False
+
+                previous = self.snapshot
+                if previous is None or previous.active is not snapshot.active:
+                    if self.on_activate is not None:
+                        self.on_activate(snapshot.active)
+                self.snapshot = snapshot
+                self._signature = signature
+                if previous is not None:
+                    self.reloads += 1
+                    candidate_note = (f", candidate {snapshot.candidate.version} at {snapshot.candidate_percent:g}%"
+                                      if snapshot.candidate else '')
+                    print(f"Model registry: serving {snapshot.active.version}{candidate_note}.")
+                return True
+            except Exception as e:
+                # Keep serving the previous snapshot; a broken upload must not take the model down
+                self.reload_errors += 1
+                self.last_error = str(e)
+                # Don't retry until the directory changes again
+                self._signature = signature
+                print(f"Warning: Model registry reload failed: {e}")
+                return False
+
+    def record(self, served_counts, comparisons=()):
+        """Count scored claims per version; ``comparisons`` are (text, served, scores-by-version) for the A/B log."""
+        with self._log_lock:
+            for version, count in served_counts.items():
+                self.served[version] = self.served.get(version, 0) + count
+            if not comparisons:
+                return
+            lines = []
+            for text, served, scores in comparisons:
+                labels = {score['label'] for score in scores.values() if score}
+                self.ab_compared += 1
+                self.ab_agreed += len(labels) == 1
+                lines.append(json.dumps({
+                    'ts': time.time(),
+                    'claim_sha1': hashlib.sha1((normalize_claim(text) or text).encode('utf-8')).hexdigest(),
+                    'served': served,
+                    'scores': scores
+                }))
+            if self.ab_log_path:
+                try:
+                    with open(self.ab_log_path, 'a') as f:
+                        f.write('\n'.join(lines) + '\n')
+                except OSError as e:
+                    print(f"Warning: Failed to write A/B score log: {e}")
+
+    def stats(self):
+        snapshot = self.snapshot
+        with self._log_lock:
+            return {
+                'active': snapshot.active.describe() if snapshot else None,
+                'candidate': snapshot.candidate.describe() if snapshot and snapshot.candidate else None,
+                'candidate_percent': snapshot.candidate_percent if snapshot else 0.0,
+                'available_versions': sorted(self._versions()),
+                'reloads': self.reloads,
+                'reload_errors': self.reload_errors,
+                'last_error': self.last_error,
+                'served': dict(self.served),
+                'ab_compared': self.ab_compared,
+                'ab_agreement': round(self.ab_agreed / self.ab_compared, 4) if self.ab_compared else None,
+                'ab_log_path': self.ab_log_path
+            }
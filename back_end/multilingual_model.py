@@ -0,0 +1,163 @@
+"""Per-language vectorizer/classifier pairs served as one model version.
+
+``train.py --multilingual`` fits one character n-gram TF-IDF vectorizer and
+classifier per language (see ``language_id``), so Arabic, French and Tunizi
+claims are no longer scored through an English word vocabulary.  Together
+they stand in for the single pair everywhere the app expects one:
+
+* ``MultilingualVectorizer.transform`` routes each claim to its language's
+  vectorizer and places the row in that language's block of columns, plus
+  one tiny marker column naming the language.  Rows of different languages
+  never share a column, so the near-duplicate index keeps working, and a
+  row (or a slice of the matrix) still says which model should score it.
+* ``MultilingualClassifier.predict_proba`` reads the marker and scores each
+  row with its language's classifier on that block alone.
+
+Languages without a model of their own (too little training data) are
+routed to ``default``.  Both halves are plain picklables, so they publish to
+and load from the model registry like any other pair; there is no compact
+export for character n-grams, so the pickles are served.
+"""
+import re
+
+import numpy as np
+import scipy.sparse as sp
+
+from heuristics import normalize_for_matching
+from language_id import detect_languages
+
+# Small enough not to move cosine similarities between rows, big enough to survive float32
+LANGUAGE_MARK = 1e-3
+_ELONGATION_RE = re.compile(r'(\w)\1{2,}')
+
+
+def preprocess(text):
+    """Vectorizer preprocessor: lowercase, fold Arabic spelling variants, and squeeze "barchaaaa" to "barchaa"."""
+    return _ELONGATION_RE.sub(r'\1\1', normalize_for_matching(text.lower()))
+
+
+def _n_features(vectorizer):
+    if hasattr(vectorizer, 'vocabulary_'):
+        return len(vectorizer.vocabulary_)
+    return vectorizer.transform(['']).shape[1]
+
+
+class MultilingualVectorizer:
+    """Route claims to per-language vectorizers; each language owns a block of columns."""
+
+    routes_languages = True
+
+    def __init__(self, vectorizers, default):
+        if default not in vectorizers:
+            raise ValueError(f'default language {default!r} has no vectorizer')
+        self.languages = tuple(sorted(vectorizers))
+        self.vectorizers = dict(vectorizers)
+        self.default = default
+        self.blocks = {}
+        start = 0
+        for language in self.languages:
+            width = _n_features(self.vectorizers[language])
+            self.blocks[language] = (start, start + width)
+            start += width
+        # One marker column per language after the blocks
+        self.marker_start = start
+        self.n_features = start + len(self.languages)
+
+    def route(self, language):
+        """The language whose model answers claims detected as ``language``."""
+        return language if language in self.vectorizers else self.default
+
+    def transform(self, texts, languages=None):
+        """Block-diagonal features for ``texts``; ``languages`` skips detection when already known."""
+        texts = [str(t) for t in texts]
+        if languages is None:
+            languages = detect_languages(texts)
+        groups = {}
+        for row, language in enumerate(languages):
+            groups.setdefault(self.route(language), []).append(row)
+
+        blocks, order = [], []
+        for language, positions in groups.items():
+            block = sp.csr_matrix(self.vectorizers[language].transform([texts[i] for i in positions]))
+            start = self.blocks[language][0]
+            marker = self.marker_start + self.languages.index(language)
+            # Append the marker as the last entry of every row; it sorts after all block columns
+            ends = block.indptr[1:]
+            indices = np.insert(block.indices.astype(np.int64) + start, ends, marker)
+            data = np.insert(block.data, ends, LANGUAGE_MARK)
+            indptr = block.indptr + np.arange(len(positions) + 1)
+            blocks.append(sp.csr_matrix((data, indices, indptr), shape=(len(positions), self.n_features)))
+            order.extend(positions)
+        if not blocks:
+            return sp.csr_matrix((0, self.n_features))
+        X = blocks[0] if len(blocks) == 1 else sp.vstack(blocks, format='csr')
+        if order != sorted(order):
+            X = X[np.argsort(order)]
+        return X
+
+    def row_languages(self, X):
+        return row_languages(X, self.languages, self.marker_start, self.default)
+
+
+def row_languages(X, languages, marker_start, default):
+    """The model language of each row of a matrix made by ``MultilingualVectorizer.transform``."""
+    X = sp.csr_matrix(X)
+    found = np.full(X.shape[0], languages.index(default), dtype=np.int64)
+    markers = X.indices >= marker_start
+    rows = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))[markers]
+    found[rows] = X.indices[markers] - marker_start
+    return [languages[i] for i in found]
+
+
+def _is_binary_linear(clf):
+    coef = getattr(clf, 'coef_', None)
+    return coef is not None and coef.shape[0] == 1 and list(getattr(clf, 'classes_', ())) == [0, 1] \
+        and hasattr(clf, 'intercept_') and getattr(clf, 'loss', 'log_loss') == 'log_loss'
+
+
+class MultilingualClassifier:
+    """Score each row with its language's binary classifier; provides ``predict_proba`` and ``predict``."""
+
+    def __init__(self, classifiers, vectorizer):
+        if set(classifiers) != set(vectorizer.languages):
+            raise ValueError('need exactly one classifier per vectorizer language')
+        self.classifiers = dict(classifiers)
+        self.languages = vectorizer.languages
+        self.blocks = dict(vectorizer.blocks)
+        self.marker_start = vectorizer.marker_start
+        self.default = vectorizer.default
+        self.classes_ = np.array([0, 1])
+        # Binary linear classifiers (the usual case) collapse into one weight vector over all blocks plus an
+        # intercept per language, so a batch is scored with a single sparse product instead of per-block slices
+        self._coef = None
+        if all(_is_binary_linear(clf) for clf in self.classifiers.values()):
+            self._coef = np.zeros(vectorizer.n_features)
+            self._intercepts = np.zeros(len(self.languages))
+            for i, language in enumerate(self.languages):
+                start, end = self.blocks[language]
+                self._coef[start:end] = self.classifiers[language].coef_[0]
+                self._intercepts[i] = self.classifiers[language].intercept_[0]
+
+    def row_languages(self, X):
+        return row_languages(X, self.languages, self.marker_start, self.default)
+
+    def predict_proba(self, X):
+        X = sp.csr_matrix(X)
+        if self._coef is not None:
+            languages = np.array([self.languages.index(language) for language in self.row_languages(X)])
+            positive = 1.0 / (1.0 + np.exp(-(X @ self._coef + self._intercepts[languages])))
+            return np.column_stack([1.0 - positive, positive])
+        languages = np.array(self.row_languages(X))
+        proba = np.zeros((X.shape[0], 2))
+        for language in np.unique(languages):
+            rows = np.flatnonzero(languages == language)
+            start, end = self.blocks[language]
+            clf = self.classifiers[language]
+            scores = clf.predict_proba(X[rows][:, start:end])
+            # Columns follow each classifier's own classes_, the output is always [fake, real]
+            for column, label in enumerate(clf.classes_):
+                proba[rows, int(label)] = scores[:, column]
+        return proba
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
@@ -0,0 +1,636 @@
+"""Claim verification pipeline shared by every route that verifies text.
+
+``VerificationPipeline`` owns the whole flow from claim text to verdict:
+language ID, local model scoring against the current model snapshot,
+heuristics, the verdict cache and near-duplicate index, the tiered local
+answer, LLM admission (coalescing, global rate, client quotas), the
+Perplexity prompt and verdict parsing, and the degraded and local-only
+fallbacks.  It knows nothing about HTTP: ``app.py`` turns requests into
+calls (``verify``, ``stream``, ``verify_batch``) and results into JSON,
+SSE events or the HTML form, so the API and the form can no longer drift
+apart.  ``VerificationError`` carries the failures a route must report,
+with the HTTP status they map to.
+"""
+import json
+import time
+from concurrent.futures import Future
+
+from heuristics import compute_heuristics
+from json_extract import JSONObjectExtractor, extract_verdict
+from language_id import detect_languages
+from metrics import NULL_TIMER
+from similarity_index import same_anchors
+from tiering import local_tier_result
+from verdict_cache import normalize_claim
+
+NO_ENGINE_ERROR = 'Perplexity API Key not configured and no local model available'
+RATE_LIMITED_ERROR = 'Rate limit exceeded and no local model available'
+
+
+class VerificationError(Exception):
+    """A claim that could not be verified; ``status`` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=500, rate_limited=None):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.rate_limited = rate_limited
+
+    def to_dict(self):
+        body = {'error': self.message}
+        if self.rate_limited is not None:
+            body['rate_limited'] = self.rate_limited
+        return body
+
+
+def llm_messages(text):
+    prompt = (
+        "Act as a universal fact-checking assistant with access to historical records dating back to the 1800s and 1900s. "
+        "For the following statement, provide a verdict (TRUE, FALSE, MIXED, UNVERIFIABLE), confidence score (0-100%), "
+        "and a concise but thorough explanation including relevant historical evidence, scientific findings, and authoritative references. "
+        "Crucially, investigate historical context to see if this claim has roots in the 19th or 20th centuries. "
+        "List sources and indicate the first time the claim was verified or disproven in history, plus the last update.\n\n"
+        f"Statement: '{text}'\n\n"
+        "Respond ONLY in valid JSON format with the following keys: "
+        "'verdict' (enum: TRUE, FALSE, MIXED, UNVERIFIABLE), "
+        "'confidence' (string, e.g. '95%'), "
+        "'explanation' (string), "
+        "'historical_context' (string), "
+        "'first_verified' (string, date or era), "
+        "'last_updated' (string, date or era), "
+        "'sources' (list of strings)."
+    )
+
+    return [
+        {"role": "system", "content": "You are a rigorous fact-checking AI that outputs only valid JSON."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def parse_llm_content(content):
+    """Extract and validate the model's verdict JSON; raises json.JSONDecodeError on unparseable output."""
+    return extract_verdict(content)
+
+
+def attach_local_analysis(result, text, ml_result, heuristics=None):
+    """Attach the local model output and the cheap meta_analysis layer to an LLM verdict."""
+    # Attach local NLP model output if available so frontend can show dual-engine verdicts
+    if ml_result is not None:
+        result['ml_model'] = ml_result
+
+    # --- Heuristic + combined scoring layer ---
+    # Parse LLM confidence (string like "95%") into a float 0-100
+    llm_conf = 0.0
+    try:
+        if isinstance(result.get('confidence'), str):
+            llm_conf = float(result['confidence'].replace('%', '').strip())
+    except Exception:
+        llm_conf = 0.0
+
+    if heuristics is None:
+        heuristics = compute_heuristics(text)
+    heuristic_risk = heuristics['heuristic_risk_bonus']
+
+    # Combined risk score from LLM + local model (+ heuristics)
+    combined_score = llm_conf
+    engines_agree = None
+    ml_conf = ml_result['confidence'] if ml_result and 'confidence' in ml_result else None
+    if ml_result and ml_conf is not None:
+        # If engines agree, average them closer to their agreement; if they disagree, penalize confidence
+        engines_agree = (ml_result.get('label') == ('Real' if result.get('verdict') == 'TRUE' else 'Fake'))
+        if engines_agree:
+            combined_score = (llm_conf * 0.6) + (ml_conf * 0.4)
+        else:
+            combined_score = max(0, (llm_conf * 0.5) + (ml_conf * 0.5) - 15)
+
+    combined_score = max(0, min(100, combined_score + heuristic_risk * 0.5))
+
+    result['meta_analysis'] = {
+        'combined_confidence_score': round(combined_score, 1),
+        'engines_agree': engines_agree,
+        'heuristics': heuristics
+    }
+
+    return result
+
+
+def local_only_result(ml_result):
+    return {
+        'verdict': 'UNVERIFIABLE',
+        'confidence': f"{ml_result['confidence']}%",
+        'explanation': 'LLM fact-checking is unavailable. Showing local classifier output only.',
+        'historical_context': '',
+        'first_verified': '',
+        'last_updated': '',
+        'sources': [],
+        'ml_model': ml_result,
+        'tier': 'local_fallback'
+    }
+
+
+def transform_claims(vectorizer, texts, languages=None):
+    # Per-language models take the languages detected up front instead of detecting them again
+    if languages is not None and getattr(vectorizer, 'routes_languages', False):
+        return vectorizer.transform(texts, languages=languages)
+    return vectorizer.transform(texts)
+
+
+def score_with(version, X, languages=None):
+    """One ml_result per row of ``X`` from a single model version; ``languages`` are the claims' detected languages."""
+    ml_results = []
+    if hasattr(version.model, 'predict_proba'):
+        for proba in version.model.predict_proba(X):
+            fake_prob = float(proba[0])
+            real_prob = float(proba[1]) if len(proba) > 1 else 1.0 - fake_prob
+            if real_prob >= fake_prob:
+                ml_label = 'Real'
+                ml_conf = real_prob
+            else:
+                ml_label = 'Fake'
+                ml_conf = fake_prob
+            ml_results.append({
+                'label': ml_label,
+                'confidence': round(ml_conf * 100, 1),
+                'raw_probs': {
+                    'real': round(real_prob, 4),
+                    'fake': round(fake_prob, 4)
+                },
+                'model_version': version.version
+            })
+    else:
+        for pred in version.model.predict(X):
+            ml_label = 'Real' if int(pred) == 1 else 'Fake'
+            ml_results.append({
+                'label': ml_label,
+                'confidence': 0,
+                'model_version': version.version
+            })
+    if languages is not None:
+        for ml_result, language in zip(ml_results, languages):
+            ml_result['language'] = language
+    if hasattr(version.model, 'row_languages'):
+        # Which per-language model answered (languages without one go to the default model)
+        for ml_result, model_language in zip(ml_results, version.model.row_languages(X)):
+            ml_result['model_language'] = model_language
+    return ml_results
+
+
+class VerificationPipeline:
+    """Verify claims against the local engines, the verdict cache and the LLM, within the configured limits.
+
+    Every component may be None (no local model, no cache, no API key); the
+    pipeline answers with whatever is left, or raises ``VerificationError``.
+    """
+
+    def __init__(self, metrics, model_registry=None, verdict_cache=None, llm=None, tier_stats=None,
+                 llm_flights=None, llm_bucket=None, client_quotas=None, verify_mode='full',
+                 local_confidence_threshold=90.0):
+        self.model_registry = model_registry
+        self.verdict_cache = verdict_cache
+        self.llm = llm
+        self.tier_stats = tier_stats
+        self.llm_flights = llm_flights
+        self.llm_bucket = llm_bucket
+        self.client_quotas = client_quotas
+        self.verify_mode = verify_mode
+        self.local_confidence_threshold = local_confidence_threshold
+        self.cache_lookups = metrics.counter('ba7ath_verdict_cache_lookups_total', 'Verdict cache lookups by outcome',
+                                             ('result',))
+        self.verdicts = metrics.counter('ba7ath_verdicts_total', 'Claims answered, by tier', ('tier',))
+        self.tier_decisions = metrics.counter('ba7ath_local_tier_decisions_total',
+                                              'Tiered-mode decisions by claim language and outcome',
+                                              ('language', 'outcome'))
+        self.llm_failures = metrics.counter('ba7ath_llm_failures_total', 'LLM calls that failed (errors and timeouts)',
+                                            ('route',))
+        self.llm_parse_failures = metrics.counter('ba7ath_llm_parse_failures_total',
+                                                  'LLM answers with no parseable verdict JSON', ('route',))
+
+    # --- Local engines ---
+
+    def current_models(self):
+        """The model snapshot a request should use from start to finish, or None without a local model."""
+        return self.model_registry.snapshot if self.model_registry is not None else None
+
+    def vectorize(self, texts, models, languages=None):
+        """Return the active model's TF-IDF matrix for ``texts``, or None when the local model is unavailable."""
+        if models is None or not texts:
+            return None
+        try:
+            return transform_claims(models.active.vectorizer, texts, languages)
+        except Exception as e:
+            print(f"Warning: local NLP vectorization failed: {e}")
+            return None
+
+    def predict(self, X, texts, models, languages=None):
+        """Score an already-vectorized batch; one ml_result (or None) per claim.
+
+        Claims routed to an A/B candidate are answered by it and scored by both
+        models, and both scores are logged.
+        """
+        if X is None:
+            return [None] * len(texts)
+        try:
+            ml_results = score_with(models.active, X, languages)
+            served = {models.active.version: len(texts)}
+            comparisons = []
+            routed = [i for i, text in enumerate(texts) if models.routes_to_candidate(text)]
+            if routed:
+                candidate = models.candidate
+                routed_languages = [languages[i] for i in routed] if languages is not None else None
+                candidate_X = transform_claims(candidate.vectorizer, [texts[i] for i in routed], routed_languages)
+                candidate_results = score_with(candidate, candidate_X, routed_languages)
+                for i, candidate_result in zip(routed, candidate_results):
+                    comparisons.append((texts[i], candidate.version, {
+                        models.active.version: ml_results[i],
+                        candidate.version: candidate_result
+                    }))
+                    ml_results[i] = candidate_result
+                served[models.active.version] -= len(routed)
+                served[candidate.version] = len(routed)
+            self.model_registry.record(served, comparisons)
+            return ml_results
+        except Exception as e:
+            print(f"Warning: local NLP model prediction failed: {e}")
+            return [None] * len(texts)
+
+    # --- Verdict cache ---
+
+    def lookup_cached(self, text, X=None, models=None):
+        """Return a copy of the cached verdict for an exact or near-duplicate claim, or None."""
+        if self.verdict_cache is None:
+            return None
+        cached = self.verdict_cache.get(text)
+        if cached is not None:
+            self.cache_lookups.inc(result='exact')
+            result = dict(cached['verdict'])
+            result['cache'] = {
+                'match': 'exact',
+                'cached_at': cached['created_at']
+            }
+            return result
+        similarity_index = models.active.similarity_index if models is not None else None
+        if similarity_index is not None and X is not None:
+            for key, similarity in similarity_index.query(X):
+                cached = self.verdict_cache.get_key(key)
+                if cached is None:
+                    continue
+                # A negation, a year or a name the vectors can't see may be the whole difference
+                if not same_anchors(text, cached['claim'], models.active.vectorizer):
+                    similarity_index.reject()
+                    continue
+                result = dict(cached['verdict'])
+                result['cache'] = {
+                    'match': 'near',
+                    'similarity': round(similarity, 4),
+                    'matched_claim': cached['claim'],
+                    'cached_at': cached['created_at']
+                }
+                self.cache_lookups.inc(result='near')
+                return result
+        self.cache_lookups.inc(result='miss')
+        return None
+
+    def remember(self, text, result, X=None, models=None):
+        if self.verdict_cache is not None:
+            self.verdict_cache.put(text, result)
+            similarity_index = models.active.similarity_index if models is not None else None
+            if similarity_index is not None and X is not None:
+                similarity_index.add([normalize_claim(text)], X)
+
+    # --- Tiers and fallbacks ---
+
+    def record_tier(self, tier, started):
+        self.tier_stats.record(tier, time.perf_counter() - started)
+        self.verdicts.inc(tier=tier)
+
+    def record_tier_decision(self, escalated, ml_result):
+        language = (ml_result or {}).get('language')
+        self.tier_stats.record_decision(escalated=escalated, language=language)
+        self.tier_decisions.inc(language=language or 'unknown', outcome='escalated' if escalated else 'local')
+
+    def answer_locally(self, text, ml_result, heuristics, started):
+        """In tiered mode, return the full local-tier response if it is confident enough, else None."""
+        if self.verify_mode != 'tiered':
+            return None
+        local = local_tier_result(ml_result, heuristics, self.local_confidence_threshold)
+        self.record_tier_decision(local is None, ml_result)
+        if local is None:
+            return None
+        local['tier'] = 'local'
+        self.record_tier('local', started)
+        return attach_local_analysis(local, text, ml_result, heuristics)
+
+    def degraded_result(self, text, ml_result, heuristics, refusal):
+        """The local model's verdict for a claim turned away by the LLM limits, or None without a local model."""
+        if ml_result is None:
+            return None
+        result = local_tier_result(ml_result, heuristics, 0) or local_only_result(ml_result)
+        result['explanation'] = (
+            f"Fact-checking capacity is exhausted ({refusal['scope']} rate limit), so this is the local "
+            f"classifier's verdict ({ml_result['label']}, {ml_result['confidence']}%) without LLM review. "
+            f"Retry in {refusal['retry_after_seconds']:g}s for a full check."
+        )
+        result['tier'] = 'degraded'
+        result['rate_limited'] = refusal
+        return attach_local_analysis(result, text, ml_result, heuristics)
+
+    # --- LLM ---
+
+    def submit_llm(self, text):
+        """Start a Perplexity verdict request; returns a Future resolving to the raw message content."""
+        return self.llm.submit(llm_messages(text))
+
+    def admit_llm(self, text, client, start=None):
+        """Join the LLM call in flight for this claim or start one, within the client quota and global rate.
+
+        Only a call that starts is charged, one token from the client's quota and
+        one from the global rate; joining a call already in flight is free.
+        Returns (future, is_leader, refusal); refusal describes the limit hit when no call was admitted.
+        """
+        def admit():
+            admitted, retry_after, client_id = self.client_quotas.try_acquire(*client)
+            if not admitted:
+                return False, {'scope': 'client', 'client': client_id, 'retry_after_seconds': round(retry_after, 2)}
+            if self.llm_bucket is None:
+                return True, None
+            admitted, retry_after = self.llm_bucket.try_acquire()
+            return admitted, None if admitted else {'scope': 'global', 'retry_after_seconds': round(retry_after, 2)}
+
+        return self.llm_flights.call(normalize_claim(text) or text, start or (lambda: self.submit_llm(text)), admit)
+
+    # --- Whole requests ---
+
+    def verify(self, text, client, timer=NULL_TIMER, route='verify_claim'):
+        """Verify one claim for ``client`` (API key, remote address); returns the result or raises VerificationError."""
+        started = time.perf_counter()
+
+        # Exact cache hits don't need any model work beyond the meta layer
+        models = self.current_models()
+        with timer.stage('language_id'):
+            languages = detect_languages([text])
+        with timer.stage('vectorize'):
+            X = self.vectorize([text], models, languages)
+        with timer.stage('cache_lookup'):
+            cached = self.lookup_cached(text, X, models)
+
+        # Start the LLM call first so the local model and heuristics run while it is in flight
+        # (tiered mode has to see the local verdict before deciding to escalate)
+        future = None
+        leader = False
+        refusal = None
+        if cached is None and self.llm is not None and self.verify_mode != 'tiered':
+            future, leader, refusal = self.admit_llm(text, client)
+
+        with timer.stage('predict'):
+            ml_result = self.predict(X, [text], models, languages)[0]
+        with timer.stage('heuristics'):
+            heuristics = compute_heuristics(text)
+
+        if cached is not None:
+            cached['tier'] = 'cache'
+            self.record_tier('cache', started)
+            return attach_local_analysis(cached, text, ml_result, heuristics)
+
+        local = self.answer_locally(text, ml_result, heuristics, started)
+        if local is not None:
+            return local
+        if self.verify_mode == 'tiered' and self.llm is not None:
+            future, leader, refusal = self.admit_llm(text, client)
+
+        if refusal is not None:
+            # Over a rate limit: answer from the local model rather than failing the request
+            degraded = self.degraded_result(text, ml_result, heuristics, refusal)
+            if degraded is None:
+                raise VerificationError(RATE_LIMITED_ERROR, status=429, rate_limited=refusal)
+            self.record_tier('degraded', started)
+            return degraded
+
+        if future is None:
+            # If LLM is not available, fall back to local model only
+            if ml_result is None:
+                raise VerificationError(NO_ENGINE_ERROR)
+            self.record_tier('local_fallback', started)
+            return local_only_result(ml_result)
+
+        try:
+            # Only the wait left after the local work above; the call started earlier
+            with timer.stage('llm'):
+                content = future.result()
+            with timer.stage('parse'):
+                result = parse_llm_content(content)
+            # Requests that joined another's call get the same verdict; the leader caches it once
+            if leader:
+                self.remember(text, result, X, models)
+            else:
+                result['coalesced'] = True
+            result['tier'] = 'llm'
+            self.record_tier('llm', started)
+            return attach_local_analysis(result, text, ml_result, heuristics)
+        except json.JSONDecodeError:
+            self.llm_parse_failures.inc(route=route)
+            raise VerificationError('Failed to parse AI response')
+        except Exception as e:
+            self.llm_failures.inc(route=route)
+            raise VerificationError(f'Error calling AI API: {str(e)}')
+
+    def stream(self, text, client, timer=NULL_TIMER, route='verify_claim_stream'):
+        """Verify one claim as a sequence of (event, data) pairs: ``local``, LLM ``token``s, then ``result`` or ``error``."""
+        started = time.perf_counter()
+
+        # Local engines answer in milliseconds, so send them before the LLM starts talking
+        models = self.current_models()
+        with timer.stage('language_id'):
+            languages = detect_languages([text])
+        with timer.stage('vectorize'):
+            X = self.vectorize([text], models, languages)
+        with timer.stage('predict'):
+            ml_result = self.predict(X, [text], models, languages)[0]
+        with timer.stage('heuristics'):
+            heuristics = compute_heuristics(text)
+        yield 'local', {'ml_model': ml_result, 'heuristics': heuristics}
+
+        with timer.stage('cache_lookup'):
+            cached = self.lookup_cached(text, X, models)
+        if cached is not None:
+            cached['tier'] = 'cache'
+            self.record_tier('cache', started)
+            yield 'result', attach_local_analysis(cached, text, ml_result, heuristics)
+            return
+
+        local = self.answer_locally(text, ml_result, heuristics, started)
+        if local is not None:
+            yield 'result', local
+            return
+
+        if self.llm is None:
+            if ml_result is None:
+                yield 'error', {'error': NO_ENGINE_ERROR}
+                return
+            self.record_tier('local_fallback', started)
+            yield 'result', local_only_result(ml_result)
+            return
+
+        # A streaming leader publishes its full answer through this future for any identical claims that join it
+        future, leader, refusal = self.admit_llm(text, client, start=Future)
+        if refusal is not None:
+            degraded = self.degraded_result(text, ml_result, heuristics, refusal)
+            if degraded is None:
+                yield 'error', {'error': RATE_LIMITED_ERROR, 'rate_limited': refusal}
+                return
+            self.record_tier('degraded', started)
+            yield 'result', degraded
+            return
+
+        if not leader:
+            # Someone else is already asking about this claim; wait for their answer instead of streaming our own
+            try:
+                with timer.stage('llm'):
+                    content = future.result()
+                with timer.stage('parse'):
+                    result = parse_llm_content(content)
+            except json.JSONDecodeError:
+                self.llm_parse_failures.inc(route=route)
+                yield 'error', {'error': 'Failed to parse AI response'}
+                return
+            except Exception as e:
+                self.llm_failures.inc(route=route)
+                yield 'error', {'error': f'Error calling AI API: {str(e)}'}
+                return
+            result['coalesced'] = True
+            result['tier'] = 'llm'
+            self.record_tier('llm', started)
+            yield 'result', attach_local_analysis(result, text, ml_result, heuristics)
+            return
+
+        extractor = JSONObjectExtractor()
+        content = []
+        llm_started = time.perf_counter()
+        try:
+            for delta in self.llm.stream(llm_messages(text)):
+                content.append(delta)
+                yield 'token', {'delta': delta}
+                # Stop as soon as the verdict object is complete; any trailing prose is not needed
+                if extractor.feed(delta) is not None:
+                    break
+            result = extractor.close()
+            future.set_result(''.join(content))
+        except json.JSONDecodeError as e:
+            self.llm_parse_failures.inc(route=route)
+            future.set_exception(e)
+            yield 'error', {'error': 'Failed to parse AI response'}
+            return
+        except Exception as e:
+            self.llm_failures.inc(route=route)
+            future.set_exception(e)
+            yield 'error', {'error': f'Error calling AI API: {str(e)}'}
+            return
+        finally:
+            # The client went away mid-stream; don't leave joined requests waiting
+            if not future.done():
+                future.set_exception(RuntimeError('LLM stream was abandoned'))
+
+        # Streaming interleaves parsing with the LLM's output, so they are timed as one stage
+        timer.record('llm_stream', time.perf_counter() - llm_started)
+        self.remember(text, result, X, models)
+        result['tier'] = 'llm'
+        self.record_tier('llm', started)
+        yield 'result', attach_local_analysis(result, text, ml_result, heuristics)
+
+    def verify_batch(self, texts, client, timer=NULL_TIMER, route='verify_batch'):
+        """One result per claim (a verdict or ``{'error': ...}``), in order, with one vectorize/predict call.
+
+        Every claim is counted in the tier stats like a request of its own, with
+        the batch's latency; duplicates count once per occurrence.
+        """
+        started = time.perf_counter()
+        models = self.current_models()
+        with timer.stage('language_id'):
+            languages = detect_languages(texts)
+        with timer.stage('vectorize'):
+            X = self.vectorize(texts, models, languages)
+
+        # Deduplicate on the cache key; the first occurrence stands in for its duplicates
+        groups = {}
+        for pos, text in enumerate(texts):
+            groups.setdefault(normalize_claim(text) or text, []).append(pos)
+
+        tiered = self.verify_mode == 'tiered'
+        if tiered:
+            with timer.stage('predict'):
+                ml_results = self.predict(X, texts, models, languages)
+
+        verdicts = {}
+        errors = {}
+        pending = {}
+        limited = {}
+        escalated = {}
+        for key, positions in groups.items():
+            first = positions[0]
+            cached = self.lookup_cached(texts[first], X[first] if X is not None else None, models)
+            if cached is not None:
+                cached['tier'] = 'cache'
+                verdicts[key] = cached
+                continue
+            if tiered:
+                local = local_tier_result(ml_results[first], compute_heuristics(texts[first]),
+                                          self.local_confidence_threshold)
+                escalated[key] = local is None
+                if local is not None:
+                    local['tier'] = 'local'
+                    verdicts[key] = local
+                    continue
+            if self.llm is not None:
+                # The executor's semaphore bounds how many of these hit Perplexity at once; the batch is
+                # charged one quota token per distinct claim that starts a call, none for cache hits,
+                # local answers, duplicates or claims joining a call already in flight
+                future, leader, refusal = self.admit_llm(texts[first], client)
+                if refusal is not None:
+                    limited[key] = refusal
+                else:
+                    pending[key] = (future, leader)
+
+        if not tiered:
+            with timer.stage('predict'):
+                ml_results = self.predict(X, texts, models, languages)
+
+        for key, (future, leader) in pending.items():
+            first = groups[key][0]
+            try:
+                with timer.stage('llm'):
+                    content = future.result()
+                with timer.stage('parse'):
+                    verdicts[key] = parse_llm_content(content)
+                if leader:
+                    self.remember(texts[first], verdicts[key], X[first] if X is not None else None, models)
+                else:
+                    verdicts[key]['coalesced'] = True
+                verdicts[key]['tier'] = 'llm'
+            except json.JSONDecodeError:
+                self.llm_parse_failures.inc(route=route)
+                errors[key] = 'Failed to parse AI response'
+            except Exception as e:
+                self.llm_failures.inc(route=route)
+                errors[key] = f'Error calling AI API: {str(e)}'
+
+        results = [None] * len(texts)
+        for key, positions in groups.items():
+            for pos in positions:
+                ml_result = ml_results[pos]
+                if key in verdicts:
+                    result = attach_local_analysis(dict(verdicts[key]), texts[pos], ml_result)
+                elif key in limited:
+                    result = self.degraded_result(texts[pos], ml_result, compute_heuristics(texts[pos]),
+                                                  limited[key]) or \
+                        {'error': RATE_LIMITED_ERROR, 'rate_limited': limited[key]}
+                elif key in errors:
+                    result = {'error': errors[key]}
+                elif ml_result is not None:
+                    result = local_only_result(ml_result)
+                else:
+                    result = {'error': NO_ENGINE_ERROR}
+                if key in escalated:
+                    self.record_tier_decision(escalated[key], ml_result)
+                if 'error' not in result:
+                    self.record_tier(result['tier'], started)
+                results[pos] = result
+        return results
@@ -0,0 +1,180 @@
+"""Admission control for the LLM path: coalescing, rate limits and client quotas.
+
+When a rumor goes viral, many clients submit the same claim at once.
+``SingleFlight`` gives concurrent requests for the same normalized claim one
+shared in-flight LLM call, so only the first of them costs an upstream
+request.  ``TokenBucket`` enforces the global upstream rate (Perplexity's
+quota), and ``ClientQuotas`` keeps one bucket per API key (or per IP address
+for anonymous clients) so a single client can't spend it all.  Nothing here
+blocks: a request that is over a limit is told so immediately, together with
+how long until it would be admitted, and the app answers it from the local
+model instead.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens per second, holding at most ``burst``."""
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        if rate <= 0:
+            raise ValueError('token bucket rate must be positive')
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self._clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.rejected = 0
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, n=1):
+        """Take ``n`` tokens if available; returns (admitted, seconds until ``n`` tokens would be available)."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= n:
+                self._tokens -= n
+                self.admitted += 1
+                return True, 0.0
+            self.rejected += 1
+            return False, (n - self._tokens) / self.rate
+
+    def stats(self):
+        with self._lock:
+            self._refill()
+            return {
+                'rate_per_minute': round(self.rate * 60, 3),
+                'burst': self.burst,
+                'available': round(self._tokens, 2),
+                'admitted': self.admitted,
+                'rejected': self.rejected
+            }
+
+
+class ClientQuotas:
+    """Per-client token buckets.
+
+    ``keys`` maps API keys to ``{"name": ..., "per_minute": ..., "burst": ...}``;
+    requests with a listed key share that key's bucket, anything else gets the
+    default quota per remote address, so inventing keys doesn't buy more.  A
+    default ``per_minute`` of 0 leaves anonymous clients unlimited.
+    """
+
+    def __init__(self, per_minute, burst, keys=None, max_clients=10000):
+        self.per_minute = per_minute
+        self.burst = burst
+        self.max_clients = max_clients
+        self._keys = {}
+        for api_key, quota in (keys or {}).items():
+            name = quota.get('name') or 'key-' + hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:8]
+            key_per_minute = float(quota.get('per_minute', per_minute))
+            if key_per_minute <= 0:
+                raise ValueError(f'quota for {name} must allow a positive rate per minute')
+            self._keys[api_key] = (name, key_per_minute, float(quota.get('burst', burst)))
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    @classmethod
+    def load(cls, path, per_minute, burst, max_clients=10000):
+        with open(path) as f:
+            return cls(per_minute, burst, keys=json.load(f), max_clients=max_clients)
+
+    def client_id(self, api_key, remote_addr):
+        if api_key and api_key in self._keys:
+            return self._keys[api_key][0]
+        return f'ip:{remote_addr or "unknown"}'
+
+    def _bucket(self, client, api_key):
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is not None:
+                self._buckets.move_to_end(client)
+                return bucket
+            _, per_minute, burst = self._keys.get(api_key, (None, self.per_minute, self.burst))
+            bucket = TokenBucket(per_minute / 60.0, burst)
+            self._buckets[client] = bucket
+            # Idle anonymous clients are forgotten first; a fresh bucket starts full anyway
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+            return bucket
+
+    def try_acquire(self, api_key, remote_addr, n=1):
+        """Returns (admitted, retry_after_seconds, client_id)."""
+        client = self.client_id(api_key, remote_addr)
+        if api_key not in self._keys and self.per_minute <= 0:
+            return True, 0.0, client
+        admitted, retry_after = self._bucket(client, api_key if api_key in self._keys else None).try_acquire(n)
+        if not admitted:
+            with self._lock:
+                self.rejected += 1
+        return admitted, retry_after, client
+
+    def stats(self):
+        with self._lock:
+            named = {name for name, _, _ in self._keys.values()}
+            return {
+                'default_per_minute': self.per_minute,
+                'default_burst': self.burst,
+                'configured_keys': len(self._keys),
+                'tracked_clients': len(self._buckets),
+                'rejected': self.rejected,
+                'keys': {client: bucket.stats() for client, bucket in self._buckets.items() if client in named}
+            }
+
+
+class SingleFlight:
+    """Share one in-flight ``concurrent.futures.Future`` among concurrent callers with the same key."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.joined = 0
+
+    def call(self, key, start, admit=None):
+        """Join the call in flight for ``key`` or begin one with ``start()``.
+
+        ``admit`` is consulted only when a new call would start (joining costs
+        nothing upstream); if it refuses, ``(None, False, refusal)`` is returned.
+        Otherwise the result is ``(future, is_leader, None)``.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.joined += 1
+                return future, False, None
+            if admit is not None:
+                admitted, refusal = admit()
+                if not admitted:
+                    return None, False, refusal
+            future = start()
+            self._calls[key] = future
+            self.leaders += 1
+        # Outside the lock: the callback runs immediately if the future is already done
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future, True, None
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'leaders': self.leaders,
+                'joined': self.joined,
+                'coalesce_rate': round(self.joined / (self.joined + self.leaders), 4)
+                if self.joined + self.leaders else None
+            }
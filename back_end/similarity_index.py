@@ -0,0 +1,188 @@
+"""Near-duplicate claim index over the local TF-IDF vector space.
+
+Paraphrases of the same rumor rarely normalize to the same cache key, but
+their TF-IDF vectors sit close together.  Each verified claim is hashed with
+random-hyperplane LSH (sign of a Rademacher projection, which preserves
+cosine similarity) and bucketed by bands, so a lookup only scores the few
+stored claims that share a band with the query instead of the whole corpus.
+
+The projection signs are derived from a hash of the feature index rather
+than a stored matrix, so memory does not grow with the vectorizer vocabulary
+(this also covers hashing vectorizers with millions of columns).
+
+Cosine similarity is blind to whatever the vectorizer drops: stop words
+(negations among them) and words outside its vocabulary, such as years and
+most names.  "Vaccines do not cause autism" and "Vaccines cause autism" are
+the same vector, so ``same_anchors`` must also pass before a near match may
+reuse a verdict: both claims need the same negations, the same numbers, and
+the same words the vectorizer cannot see.
+"""
+import re
+import threading
+from array import array
+
+import numpy as np
+import scipy.sparse as sp
+
+from language_id import ENGLISH_WORDS, FRENCH_WORDS
+
+_MASK64 = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+NEGATIONS = frozenset('''
+    not no never none nothing nobody nowhere neither nor cannot without
+    ne pas jamais aucun aucune rien ni sans non
+    mech mouch mich mch mahouch
+    لا لم لن ليس ليست غير مش موش ماهوش
+'''.split())
+_ANCHOR_TOKEN_RE = re.compile(r"[^\W_]+(?:'[^\W_]+)*")
+
+
+def _anchor_tokens(text):
+    return set(_ANCHOR_TOKEN_RE.findall((text or '').lower().replace('\u2019', "'")))
+
+
+def _is_negation(token):
+    return token in NEGATIONS or token.endswith("n't")
+
+
+def same_anchors(claim, other, vectorizer=None):
+    """True when a near match between two claims cannot flip the verdict through what cosine ignores.
+
+    The claims must contain the same negations and the same numbers, and (given
+    the ``vectorizer`` that produced the vectors) every other word found in one
+    claim only must be visible to it; words it drops are compared by hand,
+    except common English and French function words.
+    """
+    claim_tokens = _anchor_tokens(claim)
+    other_tokens = _anchor_tokens(other)
+    differing = claim_tokens ^ other_tokens
+    if not differing:
+        return True
+    hidden = []
+    for token in differing:
+        if _is_negation(token) or any(c.isdigit() for c in token):
+            return False
+        if token not in ENGLISH_WORDS and token not in FRENCH_WORDS:
+            hidden.append(token)
+    if not hidden or vectorizer is None:
+        return True
+    X = sp.csr_matrix(vectorizer.transform(hidden))
+    # Per-language vectorizers add a language marker column to every row
+    floor = 1 if getattr(vectorizer, 'routes_languages', False) else 0
+    return bool((np.diff(X.indptr) > floor).all())
+
+
+class SimilarityIndex:
+    """Incremental cosine-similarity index for L2-normalized sparse rows."""
+
+    def __init__(self, threshold=0.85, bands=16, rows=12, max_candidates=2000, seed=1337):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        self.max_candidates = max_candidates
+        n_bits = bands * rows
+        rng = np.random.default_rng(seed)
+        self._mul = rng.integers(1, 2 ** 63, size=n_bits, dtype=np.uint64) | np.uint64(1)
+        self._add = rng.integers(0, 2 ** 63, size=n_bits, dtype=np.uint64)
+        self._band_weights = (np.uint64(1) << np.arange(rows, dtype=np.uint64))
+        self._lock = threading.RLock()
+        self._buckets = {}
+        self._key_ids = {}
+        self._keys = []
+        self._indptr = array('q', [0])
+        self._indices = array('i')
+        self._data = array('f')
+        self.lookups = 0
+        self.matched = 0
+        self.rejected = 0
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _signatures(self, X):
+        """Return one integer bucket key per (row, band) for a CSR matrix."""
+        X = X.tocsr()
+        n_rows = X.shape[0]
+        n_bits = self.bands * self.rows
+        if X.nnz:
+            # Only materialize projection rows for the columns this batch actually uses
+            cols, inverse = np.unique(X.indices, return_inverse=True)
+            signs = ((cols.astype(np.uint64)[:, None] * self._mul[None, :] + self._add[None, :]) & _MASK64) >> np.uint64(63)
+            planes = np.where(signs == 1, 1.0, -1.0).astype(np.float32)
+            compact = sp.csr_matrix((X.data.astype(np.float32), inverse.ravel(), X.indptr), shape=(n_rows, len(cols)))
+            proj = np.asarray(compact @ planes)
+        else:
+            proj = np.zeros((n_rows, n_bits), dtype=np.float32)
+        bits = (proj > 0).reshape(n_rows, self.bands, self.rows).astype(np.uint64)
+        band_keys = (bits * self._band_weights).sum(axis=2, dtype=np.uint64)
+        band_ids = np.arange(self.bands, dtype=np.uint64) << np.uint64(self.rows)
+        return band_keys | band_ids[None, :]
+
+    def add(self, keys, X):
+        """Insert rows of ``X`` under the matching cache ``keys``; already-indexed keys are skipped."""
+        X = X.tocsr()
+        signatures = self._signatures(X)
+        with self._lock:
+            for row, key in enumerate(keys):
+                if key in self._key_ids:
+                    continue
+                start, end = X.indptr[row], X.indptr[row + 1]
+                if start == end:
+                    continue
+                item_id = len(self._keys)
+                self._keys.append(key)
+                self._key_ids[key] = item_id
+                self._indices.extend(X.indices[start:end].tolist())
+                self._data.extend(X.data[start:end].tolist())
+                self._indptr.append(len(self._indices))
+                for bucket in signatures[row].tolist():
+                    self._buckets.setdefault(bucket, []).append(item_id)
+
+    def query(self, X, limit=5):
+        """Return up to ``limit`` (key, similarity) pairs above the threshold for a single-row ``X``."""
+        X = X.tocsr()
+        with self._lock:
+            self.lookups += 1
+            if X.nnz == 0 or not self._keys:
+                return []
+            candidates = set()
+            for bucket in self._signatures(X)[0].tolist():
+                candidates.update(self._buckets.get(bucket, ()))
+                if len(candidates) >= self.max_candidates:
+                    break
+            if not candidates:
+                return []
+            ids = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            indptr = np.frombuffer(self._indptr, dtype=np.int64)
+            indices = np.frombuffer(self._indices, dtype=np.int32)
+            data = np.frombuffer(self._data, dtype=np.float32)
+            starts, ends = indptr[ids], indptr[ids + 1]
+            lengths = ends - starts
+            gather = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+            dense = np.zeros(X.shape[1], dtype=np.float32)
+            dense[X.indices] = X.data
+            products = dense[indices[gather]] * data[gather]
+            sims = np.add.reduceat(products, np.concatenate(([0], np.cumsum(lengths)[:-1])))
+            order = np.argsort(-sims)[:limit]
+            matches = [(self._keys[ids[i]], float(sims[i])) for i in order if sims[i] >= self.threshold]
+            if matches:
+                self.matched += 1
+            # Release the buffer views so later inserts can grow the arrays
+            del indptr, indices, data
+        return matches
+
+    def reject(self):
+        """Count a match turned down by ``same_anchors``."""
+        with self._lock:
+            self.rejected += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._keys),
+                'buckets': len(self._buckets),
+                'lookups': self.lookups,
+                'matched_lookups': self.matched,
+                'rejected_matches': self.rejected,
+                'threshold': self.threshold
+            }
@@ -0,0 +1,64 @@
+"""Batch traffic must show up in /api/tiers/stats like the same claims sent one by one."""
+import json
+import os
+import sys
+from concurrent.futures import Future
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import Registry  # noqa: E402
+from pipeline import VerificationPipeline  # noqa: E402
+from rate_limits import ClientQuotas, SingleFlight  # noqa: E402
+from tiering import TierStats  # noqa: E402
+from verdict_cache import VerdictCache  # noqa: E402
+
+CLIENT = (None, '203.0.113.7')
+SCORES = {
+    'The dam has burst': {'label': 'Fake', 'confidence': 97.0, 'language': 'en'},
+    'Le barrage a cédé': {'label': 'Fake', 'confidence': 55.0, 'language': 'fr'},
+    'Schools close tomorrow': {'label': 'Real', 'confidence': 60.0, 'language': 'en'},
+}
+SCORES['the dam has burst!'] = SCORES['The dam has burst']
+
+
+class InstantLLM:
+    def submit(self, messages):
+        future = Future()
+        future.set_result(json.dumps({'verdict': 'FALSE', 'confidence': 80, 'explanation': 'Debunked.'}))
+        return future
+
+
+def make_pipeline(tmp_path, verify_mode, cache_name='cache.sqlite3'):
+    pipeline = VerificationPipeline(Registry(), verdict_cache=VerdictCache(str(tmp_path / cache_name)),
+                                    llm=InstantLLM(), tier_stats=TierStats(), llm_flights=SingleFlight(),
+                                    client_quotas=ClientQuotas(0, 0), verify_mode=verify_mode)
+    # Stand-in for the local model: fixed scores per claim
+    pipeline.predict = lambda X, texts, models, languages=None: [dict(SCORES[t]) for t in texts]
+    return pipeline
+
+
+def tier_counts(pipeline):
+    return {tier: row['requests'] for tier, row in pipeline.tier_stats.report()['tiers'].items() if row['requests']}
+
+
+def test_batch_records_tiers_per_claim(tmp_path):
+    pipeline = make_pipeline(tmp_path, 'full')
+    pipeline.remember('Schools close tomorrow', {'verdict': 'TRUE'})
+    results = pipeline.verify_batch(['The dam has burst', 'Schools close tomorrow', 'the dam has burst!'], CLIENT)
+    assert [r['tier'] for r in results] == ['llm', 'cache', 'llm']
+    assert tier_counts(pipeline) == {'llm': 2, 'cache': 1}
+
+
+def test_batch_records_tiered_decisions_by_language(tmp_path):
+    pipeline = make_pipeline(tmp_path, 'tiered')
+    texts = ['The dam has burst', 'Le barrage a cédé', 'The dam has burst']
+    results = pipeline.verify_batch(texts, CLIENT)
+    assert [r['tier'] for r in results] == ['local', 'llm', 'local']
+
+    batched = pipeline.tier_stats.report()
+    single = make_pipeline(tmp_path, 'tiered', 'single.sqlite3')
+    for text in texts:
+        single.verify(text, CLIENT)
+    assert batched['by_language'] == single.tier_stats.report()['by_language']
+    assert batched['escalations'] == 1 and batched['tiered_decisions'] == 3
+    assert tier_counts(pipeline) == tier_counts(single) == {'local': 2, 'llm': 1}
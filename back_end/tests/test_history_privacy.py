@@ -0,0 +1,43 @@
+"""History is readable without authentication, so it must never hand out who sent a claim."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history_store import HistoryStore  # noqa: E402
+
+DEGRADED = {
+    'verdict': 'FALSE',
+    'tier': 'degraded',
+    'rate_limited': {'scope': 'client', 'client': 'ip:198.51.100.23', 'retry_after_seconds': 4.2}
+}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.sqlite3'))
+    store.append_claim('The dam has burst', DEGRADED, client='ip:198.51.100.23')
+    store.append_image('ab' * 32, 0x0123456789ABCDEF, {'verdict': 'Original'}, client='newsroom')
+    store.flush()
+    return store
+
+
+def test_records_do_not_name_the_client(store):
+    records, _ = store.query(full=True)
+    assert len(records) == 2
+    for record in records + [store.get(record['id']) for record in records]:
+        assert 'client' not in record
+        assert '198.51.100.23' not in repr(record) and 'newsroom' not in repr(record)
+    assert records[1]['result']['rate_limited'] == {'scope': 'client', 'retry_after_seconds': 4.2}
+
+
+def test_client_is_not_a_query_filter(store):
+    with pytest.raises(TypeError):
+        store.query(client='ip:198.51.100.23')
+
+
+def test_client_is_still_stored_for_operators(store):
+    rows = store._read_conn.execute('SELECT client FROM history ORDER BY id').fetchall()
+    assert rows == [('ip:198.51.100.23',), ('newsroom',)]
@@ -0,0 +1,50 @@
+"""Time-range history queries must stay exact when writers' clocks disagree or step backwards."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history_store import HistoryStore  # noqa: E402
+
+
+def clock(*stamps):
+    stamps = iter(stamps)
+    return lambda: next(stamps)
+
+
+def rows(store):
+    return store._read_conn.execute('SELECT id, created_at FROM history ORDER BY id').fetchall()
+
+
+def test_created_at_never_goes_back_across_writers(tmp_path):
+    path = str(tmp_path / 'history.sqlite3')
+    # Two workers sharing one file; the second one's clock runs an hour behind, then steps back further
+    ahead = HistoryStore(path, clock=clock(10000.0, 10010.0))
+    behind = HistoryStore(path, clock=clock(6400.0, 5000.0, 10020.0))
+    ahead.append_claim('first', {'verdict': 'TRUE', 'tier': 'llm'})
+    ahead.flush()
+    behind.append_claim('second', {'verdict': 'FALSE', 'tier': 'llm'})
+    behind.flush()
+    behind.append_claim('third', {'verdict': 'FALSE', 'tier': 'llm'})
+    behind.flush()
+    ahead.append_claim('fourth', {'verdict': 'TRUE', 'tier': 'llm'})
+    ahead.flush()
+    behind.append_claim('fifth', {'verdict': 'TRUE', 'tier': 'llm'})
+    behind.flush()
+
+    stamps = [created_at for _, created_at in rows(ahead)]
+    assert stamps == sorted(stamps) == [10000.0, 10000.0, 10000.0, 10010.0, 10020.0]
+
+
+def test_time_range_matches_created_at(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.sqlite3'), clock=clock(*(1000.0 + 10 * i for i in range(10))))
+    for i in range(10):
+        store.append_claim(f'claim {i}', {'verdict': 'TRUE', 'tier': 'llm'})
+    store.flush()
+
+    records, _ = store.query(since=1020, until=1050)
+    assert [r['claim'] for r in records] == ['claim 5', 'claim 4', 'claim 3', 'claim 2']
+    assert all(1020 <= r['created_at'] <= 1050 for r in records)
+    records, _ = store.query(text='claim', since=1075)
+    assert [r['claim'] for r in records] == ['claim 9', 'claim 8']
+    assert [claim for claim, _, _ in store.recent_claims(since=1065)] == ['claim 9', 'claim 8', 'claim 7']
@@ -0,0 +1,34 @@
+"""Perceptual lookups must find every cached copy within the configured distance, including above 7 bits."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_cache import ImageCache, hamming  # noqa: E402
+
+STORED = 0x0123456789ABCDEF
+
+
+def flip(value, bits):
+    for bit in bits:
+        value ^= 1 << bit
+    return value
+
+
+@pytest.mark.parametrize('max_distance, bits, found', [
+    (6, [0, 8, 16, 24, 32, 40], True),
+    (6, [0, 8, 16, 24, 32, 40, 48], False),
+    (7, [0, 8, 16, 24, 32, 40, 48], True),
+    # One bit in every byte: no band in common, only a full scan sees it
+    (8, [0, 8, 16, 24, 32, 40, 48, 56], True),
+    (10, [0, 1, 8, 16, 24, 32, 40, 48, 56, 57], True),
+    (10, [0, 1, 2, 8, 16, 24, 32, 40, 48, 56, 57], False),
+])
+def test_find_similar_within_distance(tmp_path, max_distance, bits, found):
+    cache = ImageCache(str(tmp_path / 'images.sqlite3'), max_distance=max_distance)
+    cache.put('a' * 64, STORED, {'verdict': 'Original'}, first_seen=100.0)
+    query = flip(STORED, bits)
+    assert hamming(query, STORED) == len(bits)
+    assert cache.find_similar(query) == ((len(bits), 100.0) if found else None)
@@ -0,0 +1,41 @@
+"""Apostrophes and stray braces in prose must not hide the verdict object that follows."""
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_extract import JSONObjectExtractor, extract_verdict  # noqa: E402
+
+VERDICT = '{"verdict": "FALSE", "confidence": 0.9, "explanation": "It\'s a doctored photo."}'
+PROSE = [
+    "Note {it's complicated}: ",
+    "My take {well, 'tis a rumour}: ",
+    "{don't} share this. ",
+    "I'd rate it {roughly} as: ",
+]
+
+
+@pytest.mark.parametrize('prose', PROSE)
+def test_extract_verdict_after_apostrophe_in_braces(prose):
+    assert extract_verdict(prose + VERDICT)['verdict'] == 'FALSE'
+
+
+@pytest.mark.parametrize('prose', PROSE)
+def test_streamed_verdict_after_apostrophe_in_braces(prose):
+    text = prose + VERDICT + " Hope that's useful {"
+    extractor = JSONObjectExtractor()
+    for i in range(0, len(text), 3):
+        extractor.feed(text[i:i + 3])
+    assert extractor.close()['explanation'] == "It's a doctored photo."
+
+
+def test_single_quoted_verdict_still_repaired():
+    assert extract_verdict("Here: {'verdict': 'true', 'explanation': 'it\\'s real'}")['verdict'] == 'TRUE'
+
+
+def test_no_object_still_fails_cleanly():
+    with pytest.raises(json.JSONDecodeError):
+        extract_verdict("Note {it's complicated} and nothing else")
@@ -0,0 +1,90 @@
+"""Client quotas charge only the requests that start an LLM call, never the ones joining one."""
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import Registry  # noqa: E402
+from pipeline import VerificationError, VerificationPipeline  # noqa: E402
+from rate_limits import ClientQuotas, SingleFlight  # noqa: E402
+from tiering import TierStats  # noqa: E402
+
+CLIENT = (None, '203.0.113.7')
+ANSWER = json.dumps({'verdict': 'FALSE', 'confidence': 90, 'explanation': 'Debunked.'})
+
+
+class HeldLLM:
+    """Every call stays in flight until ``release``, so concurrent requests can join it."""
+
+    def __init__(self):
+        self.calls = []
+
+    def submit(self, messages):
+        future = Future()
+        self.calls.append(future)
+        return future
+
+    def release(self):
+        for future in self.calls:
+            future.set_result(ANSWER)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.001)
+
+
+@pytest.fixture
+def setup():
+    llm = HeldLLM()
+    quotas = ClientQuotas(per_minute=1, burst=2)
+    pipeline = VerificationPipeline(Registry(), llm=llm, tier_stats=TierStats(), llm_flights=SingleFlight(),
+                                    client_quotas=quotas)
+    return pipeline, llm, quotas
+
+
+def test_joining_an_in_flight_call_is_free(setup):
+    pipeline, llm, quotas = setup
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(pipeline.verify('The dam has burst', CLIENT)),
+                                daemon=True) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: pipeline.llm_flights.stats()['joined'] == 4)
+    llm.release()
+    for thread in threads:
+        thread.join()
+    assert len(llm.calls) == 1
+    assert [r['verdict'] for r in results] == ['FALSE'] * 5
+    assert quotas.stats()['rejected'] == 0
+
+
+def test_batch_is_charged_per_call_it_starts(setup):
+    pipeline, llm, quotas = setup
+    # Holds one of the two tokens until released; the batch below joins it
+    leader = threading.Thread(target=pipeline.verify, args=('The dam has burst', CLIENT), daemon=True)
+    leader.start()
+    wait_for(lambda: pipeline.llm_flights.stats()['in_flight'] == 1)
+    texts = ['The dam has burst', 'the dam has burst!', 'Schools close tomorrow', 'Schools close tomorrow']
+    results = []
+    batch = threading.Thread(target=lambda: results.extend(pipeline.verify_batch(texts, CLIENT)), daemon=True)
+    batch.start()
+    wait_for(lambda: len(llm.calls) == 2)
+    llm.release()
+    batch.join()
+    leader.join()
+    assert len(llm.calls) == 2
+    assert [r.get('verdict') for r in results] == ['FALSE'] * 4
+    assert quotas.stats()['rejected'] == 0
+    # Both tokens are spent now: the next new claim is over quota
+    with pytest.raises(VerificationError) as error:
+        pipeline.verify('Bread prices doubled', CLIENT)
+    assert error.value.rate_limited['scope'] == 'client'
@@ -0,0 +1,72 @@
+"""Near-duplicate cache hits must not reuse a verdict across a negation or a different number."""
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import Registry  # noqa: E402
+from pipeline import VerificationPipeline  # noqa: E402
+from similarity_index import SimilarityIndex, same_anchors  # noqa: E402
+from verdict_cache import VerdictCache  # noqa: E402
+
+CACHED = {
+    'Vaccines cause autism in children': 'FALSE',
+    'The president was born in Kenya': 'FALSE',
+    'The moon landing in 1969 was faked': 'FALSE',
+}
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    # Like the served model: English stop words (negations included) and a capped vocabulary
+    vectorizer = TfidfVectorizer(stop_words='english', max_features=4000)
+    vectorizer.fit(list(CACHED) + ['Bread prices doubled in Tunis this month', 'Children were vaccinated'])
+    index = SimilarityIndex(threshold=0.85)
+    models = SimpleNamespace(active=SimpleNamespace(vectorizer=vectorizer, similarity_index=index))
+    cache = VerdictCache(str(tmp_path / 'cache.sqlite3'))
+    pipeline = VerificationPipeline(Registry(), verdict_cache=cache)
+    for claim, verdict in CACHED.items():
+        pipeline.remember(claim, {'verdict': verdict}, vectorizer.transform([claim]), models)
+    return pipeline, models
+
+
+def lookup(pipeline_and_models, text):
+    pipeline, models = pipeline_and_models
+    return pipeline.lookup_cached(text, models.active.vectorizer.transform([text]), models)
+
+
+@pytest.mark.parametrize('claim', [
+    'Vaccines do not cause autism in children',
+    'Vaccines never cause autism in children',
+    "Vaccines don't cause autism in children",
+    'The president was not born in Kenya',
+])
+def test_negation_is_not_a_near_duplicate(pipeline, claim):
+    assert lookup(pipeline, claim) is None
+
+
+def test_different_year_is_not_a_near_duplicate(pipeline):
+    assert lookup(pipeline, 'The moon landing in 1972 was faked') is None
+
+
+def test_paraphrase_still_matches(pipeline):
+    result = lookup(pipeline, 'vaccines CAUSE autism in the children!')
+    assert result is not None
+    assert result['verdict'] == 'FALSE'
+    assert result['cache']['match'] == 'near'
+
+
+def test_rejections_are_counted(pipeline):
+    lookup(pipeline, 'Vaccines never cause autism in children')
+    _, models = pipeline
+    assert models.active.similarity_index.stats()['rejected_matches'] == 1
+
+
+def test_same_anchors_out_of_vocabulary_word():
+    vectorizer = TfidfVectorizer().fit(['the minister resigned today'])
+    assert not same_anchors('the minister Ghannouchi resigned today', 'the minister Jebali resigned today', vectorizer)
+    assert same_anchors('the minister resigned today', 'minister resigned today', vectorizer)
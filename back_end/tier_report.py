@@ -0,0 +1,80 @@
+"""Tune LOCAL_CONFIDENCE_THRESHOLD for tiered verification against labeled data.
+
+For each candidate threshold this reports how many claims the local tier
+would answer on its own, how accurate those local answers are, and the
+expected mean latency once escalated claims pay for the LLM call.
+
+    python tier_report.py Truth_Seeker_Model_Dataset.csv --llm-latency-ms 4000
+"""
+import argparse
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from heuristics import compute_heuristics
+from tiering import local_tier_confidence
+
+parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+parser.add_argument('csv', help='Labeled CSV file')
+parser.add_argument('--text-column', default='tweet')
+parser.add_argument('--label-column', default='BinaryNumTarget', help='1 = real/true, 0 = fake')
+parser.add_argument('--model', default=os.path.join(os.path.dirname(__file__), 'model.pkl'))
+parser.add_argument('--vectorizer', default=os.path.join(os.path.dirname(__file__), 'vectorizer.pkl'))
+parser.add_argument('--llm-latency-ms', type=float, default=4000.0,
+                    help='Mean LLM-tier latency, e.g. from /api/tiers/stats')
+parser.add_argument('--thresholds', default='50,60,70,75,80,85,90,92,94,96,98,99')
+parser.add_argument('--limit', type=int, default=None, help='Only use the first N rows')
+parser.add_argument('--json', help='Also write the report to this file')
+args = parser.parse_args()
+
+model = joblib.load(args.model)
+vectorizer = joblib.load(args.vectorizer)
+
+df = pd.read_csv(args.csv, usecols=[args.text_column, args.label_column], nrows=args.limit)
+df = df.dropna()
+texts = df[args.text_column].astype(str).tolist()
+labels = df[args.label_column].astype(int).to_numpy()
+
+# Local tier cost: vectorize + predict + heuristics, measured per claim
+started = time.perf_counter()
+proba = model.predict_proba(vectorizer.transform(texts))
+heuristics = [compute_heuristics(t) for t in texts]
+local_ms = (time.perf_counter() - started) / max(1, len(texts)) * 1000
+
+real_prob = proba[:, 1]
+predicted = (real_prob >= proba[:, 0]).astype(int)
+confidence = np.array([
+    local_tier_confidence(
+        {'label': 'Real' if p == 1 else 'Fake', 'confidence': round(max(r, 1 - r) * 100, 1)}, h
+    ) or 0.0
+    for p, r, h in zip(predicted, real_prob, heuristics)
+])
+
+rows = []
+for threshold in [float(t) for t in args.thresholds.split(',')]:
+    answered = confidence >= threshold
+    n_local = int(answered.sum())
+    escalation_rate = 1 - n_local / len(texts) if len(texts) else 0.0
+    rows.append({
+        'threshold': threshold,
+        'local_answered': n_local,
+        'escalation_rate': round(escalation_rate, 4),
+        'local_accuracy': round(float((predicted[answered] == labels[answered]).mean()), 4) if n_local else None,
+        'expected_mean_latency_ms': round(local_ms + escalation_rate * args.llm_latency_ms, 2)
+    })
+
+print(f"{len(texts)} labeled claims, local tier {local_ms:.3f} ms/claim, LLM tier {args.llm_latency_ms:.0f} ms")
+print(f"{'threshold':>9} {'answered':>9} {'escalate':>9} {'local acc':>10} {'mean ms':>9}")
+for row in rows:
+    acc = f"{row['local_accuracy']:.4f}" if row['local_accuracy'] is not None else '-'
+    print(f"{row['threshold']:>9.1f} {row['local_answered']:>9} {row['escalation_rate']:>9.4f} "
+          f"{acc:>10} {row['expected_mean_latency_ms']:>9.1f}")
+
+if args.json:
+    with open(args.json, 'w') as f:
+        json.dump({'claims': len(texts), 'local_ms_per_claim': local_ms,
+                   'llm_latency_ms': args.llm_latency_ms, 'thresholds': rows}, f, indent=2)
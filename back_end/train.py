@@ -1,56 +1,314 @@
+"""Train the local fake-news classifier and publish it to the model registry.
+
+    python train.py                         # TF-IDF + LogisticRegression on the tweet column, in memory
+    python train.py --streaming             # out-of-core: chunked CSV, hashed multi-field features, SGD
+    python train.py --perplexity-example    # also ask Perplexity about one row (needs PERPLEXITY_API_KEY)
+    python train.py --multilingual          # character n-gram TF-IDF + LogisticRegression per claim language
+    python train.py --history history.sqlite3   # add the LLM's TRUE/FALSE verdicts from the API history
+
+Streaming mode reads the CSV in chunks, hashes tweet, statement,
+manual_keywords and author into one fixed-size feature space in a pool of
+worker processes, and learns with ``SGDClassifier.partial_fit`` in the main
+process, so memory depends on the chunk size, not on the dataset size.
+Served claims only have the tweet, so ``--field-dropout`` of the training
+rows are hashed from the tweet alone, and the headline holdout accuracy is
+scored on the tweet alone too.
+
+Multilingual mode splits the claims by language (``language_id``) and fits
+one character n-gram model per language with enough rows, so dialect
+spellings share features; the other languages are answered by the largest
+one.  The Truth Seeker tweets are English, so the Arabic, French and Tunizi
+models come from ``--history``, the claims users actually sent.
+"""
+import argparse
 import os
-import pandas as pd
+import shutil
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
 import joblib
-from sklearn.model_selection import train_test_split
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import classification_report
-from dotenv import load_dotenv
-from perplexity import Perplexity
-
-# Load environment variables
-load_dotenv()
-api_key = os.getenv('PERPLEXITY_API_KEY')
-client = Perplexity(api_key=api_key)
-
-# Load dataset
-df = pd.read_csv('Truth_Seeker_Model_Dataset.csv')
-# Filter NA if needed
-df = df.dropna(subset=[
-    'author', 'statement', 'target', 'BinaryNumTarget',
-    'manual_keywords', 'tweet', '5_label_majority_answer', '3_label_majority_answer'
-])
-
-# Features and label
-feature_columns = [
-    'author',           # Categorical
-    'statement',        # Text
-    'manual_keywords',  # Text/Keywords
-    'tweet'             # Tweet Text
-]
-X_text = df['tweet'].astype(str)
-y = df['BinaryNumTarget'].astype(int)  # 1: True/Real, 0: Fake
-
-# Vectorize tweet text (you can concatenate statement and keywords if preferred)
-vectorizer = TfidfVectorizer(stop_words='english', max_features=4000)
-X = vectorizer.fit_transform(X_text)
-
-# Model training
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-clf = LogisticRegression(max_iter=1000)
-clf.fit(X_train, y_train)
-
-# Evaluation
-y_pred = clf.predict(X_test)
-print(classification_report(y_test, y_pred))
-
-# Save the model and vectorizer
-joblib.dump(clf, 'model.pkl')
-joblib.dump(vectorizer, 'vectorizer.pkl')
-print("Model and vectorizer saved to disk.")
-
-# Perplexity API prediction example
+import numpy as np
+import pandas as pd
+
+from compact_model import export_model
+from hashed_features import DEFAULT_FIELDS, FieldHashingVectorizer
+from history_store import HistoryStore
+from language_id import detect_languages
+from model_registry import publish_version
+from multilingual_model import MultilingualClassifier, MultilingualVectorizer, preprocess
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+LABEL_COLUMN = 'BinaryNumTarget'  # 1: True/Real, 0: Fake
+CLASSES = np.array([0, 1])
+
+# Set in each worker process by _init_worker
+_worker_vectorizer = None
+
+
+def _init_worker(vectorizer):
+    global _worker_vectorizer
+    _worker_vectorizer = vectorizer
+
+
+def _document_frequencies(chunk):
+    records = chunk[0]
+    return len(records), _worker_vectorizer.document_frequencies(records)
+
+
+def _vectorize(chunk):
+    """Hash a chunk: training rows (text-only where ``text_only``) plus the held-out rows both ways.
+
+    Returns (X, X_test_served, labels, is_test); ``X_test_served`` holds the held-out rows as the
+    served model sees them, with only the text field.
+    """
+    records, labels, is_test, text_only = chunk
+    vectorizer = _worker_vectorizer
+    position = vectorizer.fields.index(vectorizer.text_field)
+    texts = [record[position] for record in records]
+    served = vectorizer.text_records(texts)
+    if text_only.any():
+        records = [served[i] if drop else record for i, (record, drop) in enumerate(zip(records, text_only))]
+    test = np.flatnonzero(is_test)
+    return (vectorizer.transform_records(records), vectorizer.transform_records([served[i] for i in test]),
+            labels, is_test)
+
+
+def read_chunks(path, fields, text_field, chunksize, test_percent, nrows=None):
+    """Yield (records, labels, is_test) per CSV chunk; the holdout split is a stable hash of the text."""
+    for chunk in pd.read_csv(path, usecols=list(fields) + [LABEL_COLUMN], chunksize=chunksize, nrows=nrows):
+        chunk = chunk.dropna(subset=[LABEL_COLUMN, text_field])
+        if chunk.empty:
+            continue
+        columns = [chunk[field].fillna('').astype(str).tolist() for field in fields]
+        records = list(zip(*columns))
+        texts = columns[list(fields).index(text_field)]
+        is_test = np.fromiter((zlib.crc32(t.encode('utf-8')) % 100 < test_percent for t in texts),
+                              dtype=bool, count=len(texts))
+        yield records, chunk[LABEL_COLUMN].astype(int).to_numpy(), is_test
+
+
+def read_history_chunks(path, fields, text_field, chunksize, test_percent):
+    """Like read_chunks, for claims the LLM labelled TRUE or FALSE in the API history (other fields empty)."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f'no history database at {path}')
+    store = HistoryStore(path)
+    empty = ('',) * len(fields)
+    position = list(fields).index(text_field)
+    for batch in store.iter_labeled(batch_size=chunksize):
+        records = [empty[:position] + (claim,) + empty[position + 1:] for claim, _ in batch]
+        is_test = np.fromiter((zlib.crc32(claim.encode('utf-8')) % 100 < test_percent for claim, _ in batch),
+                              dtype=bool, count=len(batch))
+        yield records, np.array([label for _, label in batch]), is_test
+
+
+def ordered_map(pool, fn, items, lookahead):
+    """Like pool.map, but only ``lookahead`` items are ever in flight, so memory stays bounded."""
+    if pool is None:
+        yield from map(fn, items)
+        return
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= lookahead:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def print_report(confusion):
+    """classification_report-style summary from a 2x2 confusion matrix (rows: true, columns: predicted)."""
+    total = confusion.sum()
+    print(f"{'':>12} {'precision':>9} {'recall':>9} {'f1-score':>9} {'support':>9}")
+    for label in CLASSES:
+        tp = confusion[label, label]
+        predicted = confusion[:, label].sum()
+        support = confusion[label].sum()
+        precision = tp / predicted if predicted else 0.0
+        recall = tp / support if support else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        print(f"{label:>12} {precision:>9.2f} {recall:>9.2f} {f1:>9.2f} {support:>9}")
+    accuracy = np.trace(confusion) / total if total else 0.0
+    print(f"{'accuracy':>12} {'':>9} {'':>9} {accuracy:>9.2f} {total:>9}")
+
+
+def train_tfidf(args):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import classification_report
+    from sklearn.model_selection import train_test_split
+
+    # Load dataset
+    df = pd.read_csv(args.csv)
+    # Filter NA if needed
+    df = df.dropna(subset=[
+        'author', 'statement', 'target', LABEL_COLUMN,
+        'manual_keywords', 'tweet', '5_label_majority_answer', '3_label_majority_answer'
+    ])
+    X_text = df['tweet'].astype(str)
+    y = df[LABEL_COLUMN].astype(int)
+    if args.history:
+        claims, labels = [], []
+        for records, batch_labels, _ in read_history_chunks(args.history, ('tweet',), 'tweet', 50000, 0):
+            claims += [record[0] for record in records]
+            labels += batch_labels.tolist()
+        print(f"Adding {len(claims)} labelled claims from {args.history}")
+        X_text = pd.concat([X_text, pd.Series(claims, dtype=str)], ignore_index=True)
+        y = pd.concat([y, pd.Series(labels, dtype=int)], ignore_index=True)
+
+    # Vectorize tweet text
+    vectorizer = TfidfVectorizer(stop_words='english', max_features=4000)
+    X = vectorizer.fit_transform(X_text)
+
+    # Model training
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=args.test_percent / 100, random_state=42)
+    clf = LogisticRegression(max_iter=1000)
+    clf.fit(X_train, y_train)
+
+    # Evaluation
+    y_pred = clf.predict(X_test)
+    print(classification_report(y_test, y_pred))
+    return clf, vectorizer
+
+
+def train_multilingual(args):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+
+    df = pd.read_csv(args.csv, usecols=['tweet', LABEL_COLUMN]).dropna()
+    texts = df['tweet'].astype(str).tolist()
+    labels = df[LABEL_COLUMN].astype(int).tolist()
+    if args.history:
+        n_csv = len(texts)
+        for records, batch_labels, _ in read_history_chunks(args.history, ('tweet',), 'tweet', 50000, 0):
+            texts += [record[0] for record in records]
+            labels += batch_labels.tolist()
+        print(f"Adding {len(texts) - n_csv} labelled claims from {args.history}")
+    labels = np.array(labels)
+    languages = np.array(detect_languages(texts))
+    is_test = np.fromiter((zlib.crc32(t.encode('utf-8')) % 100 < args.test_percent for t in texts),
+                          dtype=bool, count=len(texts))
+
+    vectorizers, classifiers, trained_rows = {}, {}, {}
+    for language in sorted(set(languages.tolist())):
+        rows = np.flatnonzero(languages == language)
+        train = rows[~is_test[rows]]
+        if len(train) < args.min_language_rows or len(np.unique(labels[train])) < 2:
+            print(f"{language}: {len(rows)} rows, too few to train; routed to the default model")
+            continue
+        # char_wb n-grams stay inside words, so spelling variants of one word still share most features
+        vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=(2, 5), preprocessor=preprocess,
+                                     sublinear_tf=True, min_df=2, max_features=args.max_features)
+        X_train = vectorizer.fit_transform([texts[i] for i in train])
+        clf = LogisticRegression(max_iter=1000)
+        clf.fit(X_train, labels[train])
+        vectorizers[language], classifiers[language], trained_rows[language] = vectorizer, clf, len(train)
+    if not vectorizers:
+        raise SystemExit(f'No language has {args.min_language_rows} training rows with both labels')
+
+    default = max(trained_rows, key=trained_rows.get)
+    vectorizer = MultilingualVectorizer(vectorizers, default)
+    clf = MultilingualClassifier(classifiers, vectorizer)
+    for language in sorted(set(languages.tolist())):
+        test = np.flatnonzero((languages == language) & is_test)
+        if not len(test):
+            continue
+        confusion = np.zeros((2, 2), dtype=np.int64)
+        X_test = vectorizer.transform([texts[i] for i in test], languages=languages[test].tolist())
+        np.add.at(confusion, (labels[test], clf.predict(X_test)), 1)
+        print(f"\n{language} ({trained_rows.get(language, 0)} training rows, "
+              f"model: {vectorizer.route(language)}):")
+        print_report(confusion)
+    return clf, vectorizer
+
+
+def train_streaming(args):
+    from sklearn.linear_model import SGDClassifier
+
+    fields = tuple(args.fields.split(','))
+    vectorizer = FieldHashingVectorizer(fields=fields, text_field=args.text_field, n_features=args.n_features)
+    clf = SGDClassifier(loss='log_loss', alpha=args.alpha, random_state=42)
+    rng = np.random.default_rng(42)
+
+    def chunks(nrows=None):
+        sources = [read_chunks(args.csv, fields, args.text_field, args.chunksize, args.test_percent, nrows=nrows)]
+        # The IDF sample (nrows) comes from the CSV alone
+        if args.history and nrows is None:
+            sources.append(read_history_chunks(args.history, fields, args.text_field, args.chunksize,
+                                               args.test_percent))
+        for source in sources:
+            for records, labels, is_test in source:
+                # Drawn afresh every epoch, so each row is seen both ways over several epochs
+                text_only = (rng.random(len(records)) < args.field_dropout) & ~is_test
+                yield records, labels, is_test, text_only
+
+    workers = args.workers or os.cpu_count() or 1
+    lookahead = 2 * workers
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(vectorizer,))
+    else:
+        _init_worker(vectorizer)
+    try:
+        if args.idf_rows:
+            # IDF from a sample: document frequencies only need to be representative, not exhaustive
+            started = time.perf_counter()
+            df_counts = np.zeros(args.n_features, dtype=np.int64)
+            n_documents = 0
+            for n, (indices, counts) in ordered_map(pool, _document_frequencies, chunks(args.idf_rows), lookahead):
+                df_counts[indices] += counts
+                n_documents += n
+            vectorizer.set_idf(df_counts, n_documents)
+            del df_counts
+            if pool is not None:
+                # Workers need the fitted IDF too
+                pool.shutdown()
+                pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(vectorizer,))
+            print(f"IDF estimated from {n_documents} rows in {time.perf_counter() - started:.1f}s")
+
+        confusion = np.zeros((2, 2), dtype=np.int64)
+        all_fields_confusion = np.zeros((2, 2), dtype=np.int64)
+        for epoch in range(args.epochs):
+            started = time.perf_counter()
+            seen = 0
+            last_epoch = epoch == args.epochs - 1
+            for X, X_test_served, labels, is_test in ordered_map(pool, _vectorize, chunks(), lookahead):
+                train = np.flatnonzero(~is_test)
+                if len(train):
+                    # Shuffle within the chunk so a CSV sorted by label doesn't bias SGD
+                    train = rng.permutation(train)
+                    clf.partial_fit(X[train], labels[train], classes=CLASSES)
+                    seen += len(train)
+                # Progressive validation: held-out rows are scored by the model as trained so far, never fit on
+                test = np.flatnonzero(is_test)
+                if last_epoch and len(test) and hasattr(clf, 'coef_'):
+                    np.add.at(confusion, (labels[test], clf.predict(X_test_served)), 1)
+                    np.add.at(all_fields_confusion, (labels[test], clf.predict(X[test])), 1)
+            elapsed = time.perf_counter() - started
+            print(f"Epoch {epoch + 1}/{args.epochs}: {seen} training rows in {elapsed:.1f}s "
+                  f"({seen / elapsed if elapsed else 0:.0f} rows/s, {workers} workers)")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    print(f"Holdout as served (claims fill only the {args.text_field} field):")
+    print_report(confusion)
+    print(f"\nHoldout with every field ({', '.join(fields)}), which served claims never have:")
+    print_report(all_fields_confusion)
+    return clf, vectorizer
+
+
 def classify_with_perplexity(statement, tweet):
+    from dotenv import load_dotenv
+    from perplexity import Perplexity
+
+    load_dotenv()
+    client = Perplexity(api_key=os.getenv('PERPLEXITY_API_KEY'))
     prompt = (
         "You are a fake news expert. Statement: '{}'. Tweet: '{}'. "
         "Classify if the tweet shares real or fake news (return 'Real' or 'Fake' with confidence score)."
@@ -64,10 +322,67 @@ def classify_with_perplexity(statement, tweet):
     )
     return response.choices[0].message.content
 
-# Example usage
-sample_row = df.iloc[0]
-perplexity_result = classify_with_perplexity(
-    sample_row['statement'],
-    sample_row['tweet']
-)
-print("Perplexity API result:", perplexity_result)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('csv', nargs='?', default='Truth_Seeker_Model_Dataset.csv')
+    parser.add_argument('--streaming', action='store_true', help='Out-of-core training with hashed features')
+    parser.add_argument('--multilingual', action='store_true',
+                        help='One character n-gram model per claim language (ar, en, fr, tunizi)')
+    parser.add_argument('--test-percent', type=float, default=20, help='Share of rows held out for evaluation')
+    parser.add_argument('--fields', default=','.join(DEFAULT_FIELDS), help='Columns hashed in streaming mode')
+    parser.add_argument('--text-field', default='tweet', help='Column that claims are matched against at serving time')
+    parser.add_argument('--n-features', type=int, default=2 ** 20, help='Hashed feature space size')
+    parser.add_argument('--field-dropout', type=float, default=0.5,
+                        help='Share of training rows hashed from --text-field alone, as claims are served')
+    parser.add_argument('--chunksize', type=int, default=50000, help='CSV rows per chunk')
+    parser.add_argument('--idf-rows', type=int, default=500000, help='Rows sampled for IDF weights (0 disables IDF)')
+    parser.add_argument('--epochs', type=int, default=1)
+    parser.add_argument('--alpha', type=float, default=1e-5, help='SGD L2 regularization strength')
+    parser.add_argument('--workers', type=int, default=0, help='Hashing processes (default: CPU count)')
+    parser.add_argument('--min-language-rows', type=int, default=200,
+                        help='Training rows a language needs for its own model in multilingual mode')
+    parser.add_argument('--max-features', type=int, default=100000,
+                        help='Character n-grams kept per language in multilingual mode')
+    parser.add_argument('--history', help='Also train on the LLM-labelled claims in this history database')
+    parser.add_argument('--no-publish', action='store_true', help="Don't publish the result to the model registry")
+    parser.add_argument('--perplexity-example', action='store_true',
+                        help='Classify the first row with Perplexity as well (makes a live API call)')
+    args = parser.parse_args()
+
+    if args.streaming:
+        clf, vectorizer = train_streaming(args)
+    elif args.multilingual:
+        clf, vectorizer = train_multilingual(args)
+    else:
+        clf, vectorizer = train_tfidf(args)
+
+    # Save the model and vectorizer
+    joblib.dump(clf, 'model.pkl')
+    joblib.dump(vectorizer, 'vectorizer.pkl')
+    print("Model and vectorizer saved to disk.")
+
+    # Compact memory-mapped copy that app.py loads instead of the pickles
+    try:
+        export_model(vectorizer, clf, 'model_compact', sources=['model.pkl', 'vectorizer.pkl'])
+        print("Compact model exported to model_compact/.")
+    except ValueError as e:
+        # An export of the previous model would only be reported as stale
+        shutil.rmtree('model_compact', ignore_errors=True)
+        print(f"No compact export for this model ({e}); app.py will load the pickles.")
+
+    # Publish as a new version; running servers pick it up from models/ without a restart
+    if not args.no_publish:
+        version = publish_version(os.getenv('MODEL_REGISTRY_DIR', 'models'), clf, vectorizer)
+        print(f"Published model version {version}.")
+
+    if resource is not None:
+        print(f"Peak memory: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+    if args.perplexity_example:
+        sample_row = pd.read_csv(args.csv, nrows=1).iloc[0]
+        print("Perplexity API result:", classify_with_perplexity(sample_row['statement'], sample_row['tweet']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Validation of image uploads while they stream in.
+
+Werkzeug used to spool a whole multipart upload (to a temp file beyond
+500 KB) before the route saw it, and ``Image.open`` was the first check on
+what it was.  ``GuardedRequest`` swaps in ``GuardedUpload`` as the sink for
+uploaded files, so checks run as the body arrives:
+
+* the first bytes must carry the signature of a format forensics can
+  analyze, so anything else is refused after a few bytes;
+* once the image header has arrived, the declared dimensions are read
+  (``Image.open`` parses headers only) and images with more pixels than
+  ``max_pixels`` are refused before their body is read, let alone decoded;
+* the upload is held in memory, capped at ``max_bytes``.
+
+The request as a whole is bounded by Flask's ``MAX_CONTENT_LENGTH``, which
+rejects an oversized ``Content-Length`` before reading anything.
+"""
+import io
+import warnings
+
+from flask import Request, current_app
+from PIL import Image, UnidentifiedImageError
+
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024
+DEFAULT_MAX_PIXELS = 100_000_000
+
+# (format, offset, signature); WebP also needs its RIFF header, checked in sniff_format
+SIGNATURES = (
+    ('JPEG', 0, b'\xff\xd8\xff'),
+    ('PNG', 0, b'\x89PNG\r\n\x1a\n'),
+    ('GIF', 0, b'GIF87a'),
+    ('GIF', 0, b'GIF89a'),
+    ('WEBP', 8, b'WEBP'),
+    ('BMP', 0, b'BM'),
+    ('TIFF', 0, b'II*\x00'),
+    ('TIFF', 0, b'MM\x00*'),
+)
+SIGNATURE_BYTES = 12
+# Header probes at growing prefix sizes; JPEG EXIF and ICC segments can push the frame header past 64 KB
+PROBE_SIZES = (64, 1024, 16 * 1024, 128 * 1024, 512 * 1024)
+# Pillow only reads these from the complete file (a TIFF directory may even sit at the end)
+WHOLE_FILE_FORMATS = {'WEBP', 'TIFF'}
+
+
+class UploadRejected(Exception):
+    """An upload refused before analysis; ``status`` is the HTTP status to answer with."""
+
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
+
+
+def sniff_format(head):
+    """Image format named by the leading bytes, or None."""
+    for name, offset, signature in SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            if name == 'WEBP' and head[:4] != b'RIFF':
+                continue
+            return name
+    return None
+
+
+def header_dimensions(data):
+    """(width, height) from the image header in ``data``, or None if it isn't complete yet."""
+    try:
+        with warnings.catch_warnings():
+            # The pixel limit is enforced by the caller; the header alone is harmless
+            warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+            with Image.open(io.BytesIO(data)) as image:
+                return image.size
+    except Image.DecompressionBombError:
+        raise UploadRejected('Image dimensions are too large (possible decompression bomb)', 413)
+    except (UnidentifiedImageError, SyntaxError, OSError, EOFError, ValueError):
+        return None
+
+
+class GuardedUpload(io.BytesIO):
+    """In-memory upload sink that validates the image header as bytes arrive."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, max_pixels=DEFAULT_MAX_PIXELS):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.max_pixels = max_pixels
+        self.format = None
+        self.dimensions = None
+        self._next_probe = 0
+
+    def write(self, data):
+        if self.tell() + len(data) > self.max_bytes:
+            raise UploadRejected(f'Image is larger than {self.max_bytes // (1024 * 1024)} MB', 413)
+        written = super().write(data)
+        if self.dimensions is None:
+            self._check(final=False)
+        return written
+
+    def _check(self, final):
+        size = self.tell()
+        if self.format is None:
+            if size < SIGNATURE_BYTES and not final:
+                return
+            self.format = sniff_format(self.getvalue()[:SIGNATURE_BYTES])
+            if self.format is None:
+                raise UploadRejected('Unsupported file type: expected a JPEG, PNG, GIF, WebP, BMP or TIFF image', 415)
+        if self.format in WHOLE_FILE_FORMATS and not final:
+            return
+        probe = final
+        while self._next_probe < len(PROBE_SIZES) and size >= PROBE_SIZES[self._next_probe]:
+            self._next_probe += 1
+            probe = True
+        if not probe:
+            return
+        dimensions = header_dimensions(self.getvalue())
+        if dimensions is None:
+            if final:
+                raise UploadRejected('Could not read the image header', 400)
+            return
+        width, height = dimensions
+        if width * height > self.max_pixels:
+            raise UploadRejected(f'Image is {width}x{height}, more than the {self.max_pixels:,} pixels allowed', 413)
+        self.dimensions = (width, height)
+
+    def finish(self):
+        """Validate what the stream didn't get to (small files, WebP, TIFF) and return the upload bytes."""
+        if self.dimensions is None:
+            self._check(final=True)
+        return self.getvalue()
+
+
+def read_upload(file):
+    """Bytes of an uploaded ``FileStorage``, finishing validation if it streamed through ``GuardedUpload``."""
+    if isinstance(file.stream, GuardedUpload):
+        return file.stream.finish()
+    return file.read()
+
+
+class GuardedRequest(Request):
+    """Flask request that streams file uploads into ``GuardedUpload``.
+
+    Limits come from the app's ``UPLOAD_MAX_BYTES`` and ``UPLOAD_MAX_PIXELS`` config.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        config = current_app.config
+        return GuardedUpload(max_bytes=config.get('UPLOAD_MAX_BYTES', DEFAULT_MAX_BYTES),
+                             max_pixels=config.get('UPLOAD_MAX_PIXELS', DEFAULT_MAX_PIXELS))
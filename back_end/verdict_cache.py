@@ -0,0 +1,175 @@
+"""Persistent claim-verdict cache for /api/verify.
+
+Verdicts returned by the LLM are stored in a small SQLite database keyed on
+the normalized claim text, so the same viral claim only pays for one
+Perplexity round trip per TTL window and the cache survives restarts.
+"""
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+_URL_RE = re.compile(r"(?:https?://|www\.)\S+", re.IGNORECASE)
+_PUNCT_RE = re.compile(r"[^\w\s]|_", re.UNICODE)
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_claim(text):
+    """Return the cache key for a claim: no URLs, punctuation, case or extra whitespace."""
+    text = unicodedata.normalize('NFKC', text or '')
+    text = _URL_RE.sub(' ', text)
+    text = text.casefold()
+    text = _PUNCT_RE.sub(' ', text)
+    return _WS_RE.sub(' ', text).strip()
+
+
+class VerdictCache:
+    """SQLite-backed verdict store with TTL expiry and LRU eviction."""
+
+    def __init__(self, path, max_entries=50000, ttl_seconds=86400):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS verdicts ('
+            ' key TEXT PRIMARY KEY,'
+            ' claim TEXT NOT NULL,'
+            ' verdict TEXT NOT NULL,'
+            ' created_at REAL NOT NULL,'
+            ' last_access REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS verdicts_last_access ON verdicts (last_access)')
+        self._size = self._conn.execute('SELECT COUNT(*) FROM verdicts').fetchone()[0]
+
+    def get(self, text):
+        """Return the cached entry for ``text`` or None on a miss or expired entry."""
+        entry = self.get_key(normalize_claim(text))
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def get_key(self, key):
+        """Like ``get`` for an already-normalized key, without touching the hit/miss counters."""
+        now = time.time()
+        with self._lock:
+            row = None
+            if key:
+                row = self._conn.execute(
+                    'SELECT claim, verdict, created_at FROM verdicts WHERE key = ?', (key,)
+                ).fetchone()
+            if row is not None and self.ttl_seconds and now - row[2] > self.ttl_seconds:
+                self._conn.execute('DELETE FROM verdicts WHERE key = ?', (key,))
+                self._size -= 1
+                row = None
+            if row is None:
+                return None
+            self._conn.execute('UPDATE verdicts SET last_access = ? WHERE key = ?', (now, key))
+        return {
+            'key': key,
+            'claim': row[0],
+            'verdict': json.loads(row[1]),
+            'created_at': row[2]
+        }
+
+    def put(self, text, verdict):
+        """Store an LLM verdict for ``text``, evicting least-recently-used entries past the bound."""
+        key = normalize_claim(text)
+        if not key:
+            return
+        now = time.time()
+        payload = json.dumps(verdict)
+        with self._lock:
+            cur = self._conn.execute(
+                'INSERT OR IGNORE INTO verdicts (key, claim, verdict, created_at, last_access) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (key, text, payload, now, now)
+            )
+            if cur.rowcount:
+                self._size += 1
+            else:
+                self._conn.execute(
+                    'UPDATE verdicts SET claim = ?, verdict = ?, created_at = ?, last_access = ? WHERE key = ?',
+                    (text, payload, now, now, key)
+                )
+            if self._size > self.max_entries:
+                self._evict()
+
+    def warm(self, entries):
+        """Add (text, verdict, created_at) entries that aren't cached yet, keeping their age; returns the count added.
+
+        Entries past the TTL are skipped, so a warmed verdict expires when it would have anyway.
+        """
+        now = time.time()
+        rows = []
+        for text, verdict, created_at in entries:
+            key = normalize_claim(text)
+            if key and not (self.ttl_seconds and now - created_at > self.ttl_seconds):
+                rows.append((key, text, json.dumps(verdict), created_at, created_at))
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                before = self._conn.total_changes
+                self._conn.executemany(
+                    'INSERT OR IGNORE INTO verdicts (key, claim, verdict, created_at, last_access) '
+                    'VALUES (?, ?, ?, ?, ?)', rows
+                )
+                added = self._conn.total_changes - before
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._size += added
+            if self._size > self.max_entries:
+                self._evict()
+        return added
+
+    def iter_claims(self, batch_size=10000):
+        """Yield batches of (key, claim) pairs for unexpired entries, oldest first."""
+        cutoff = time.time() - self.ttl_seconds if self.ttl_seconds else 0
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    'SELECT rowid, key, claim FROM verdicts WHERE rowid > ? AND created_at >= ? '
+                    'ORDER BY rowid LIMIT ?',
+                    (last_rowid, cutoff, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            last_rowid = rows[-1][0]
+            yield [(key, claim) for _, key, claim in rows]
+
+    def _evict(self):
+        # Other workers may share the file, so trust the table rather than our own counter.
+        cur = self._conn.execute(
+            'DELETE FROM verdicts WHERE key IN ('
+            ' SELECT key FROM verdicts ORDER BY last_access DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
+        self.evictions += max(0, cur.rowcount)
+        self._size = self._conn.execute('SELECT COUNT(*) FROM verdicts').fetchone()[0]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'size': self._size,
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds
+            }
@@ -0,0 +1,12 @@
+"""WSGI entry point for the API-only server profile.
+
+    gunicorn --workers 4 --threads 8 wsgi:application
+
+Serves the JSON API without the HTML form, the debugger or the reloader;
+set ``SERVER_PROFILE=full`` to keep the form.
+"""
+import os
+
+os.environ.setdefault('SERVER_PROFILE', 'api')
+
+from app import app as application  # noqa: E402
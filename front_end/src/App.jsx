@@ -13,6 +13,38 @@ const COLORS = {
   DARK: '#9D2627'          // brown-red-4
 };
 
+// --- HELPERS ---
+
+// Read a Server-Sent Events response body and call onEvent(event, data) for each message
+const readEventStream = async (response, onEvent) => {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  const dispatch = (block) => {
+    let event = 'message';
+    const dataLines = [];
+    block.split('\n').forEach((line) => {
+      if (line.startsWith('event:')) event = line.slice(6).trim();
+      else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+    });
+    if (dataLines.length > 0) onEvent(event, JSON.parse(dataLines.join('\n')));
+  };
+
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let boundary = buffer.indexOf('\n\n');
+    while (boundary !== -1) {
+      dispatch(buffer.slice(0, boundary));
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf('\n\n');
+    }
+  }
+  if (buffer.trim()) dispatch(buffer);
+};
+
 // --- COMPONENTS ---
 
 // 1. Navigation Bar (Brown-Red Theme)
@@ -263,17 +295,20 @@ const UploadPage = ({ onResult }) => {
   const [selectedFile, setSelectedFile] = useState(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
+  const [progress, setProgress] = useState(null);
 
   const handleSubmit = async (e) => {
     e.preventDefault();
     setLoading(true);
     setError('');
+    setProgress(null);
 
     try {
       if (activeMode === 'text') {
           if (!inputText.trim()) throw new Error("Please enter text to analyze.");
           
-          const response = await fetch(`${API_BASE_URL}/verify`, {
+          // Stream progressive events: local verdict first, then LLM tokens, then the merged result
+          const response = await fetch(`${API_BASE_URL}/verify/stream`, {
             method: 'POST',
             headers: {
               'Content-Type': 'application/json',
@@ -286,7 +321,20 @@ const UploadPage = ({ onResult }) => {
             throw new Error(errorData.error || 'Failed to verify claim');
           }
 
-          const data = await response.json();
+          let data = null;
+          setProgress({ local: null, tokens: '' });
+          await readEventStream(response, (event, payload) => {
+            if (event === 'local') {
+              setProgress(prev => ({ ...prev, local: payload }));
+            } else if (event === 'token') {
+              setProgress(prev => ({ ...prev, tokens: prev.tokens + payload.delta }));
+            } else if (event === 'result') {
+              data = payload;
+            } else if (event === 'error') {
+              throw new Error(payload.error || 'Failed to verify claim');
+            }
+          });
+          if (!data) throw new Error('Verification stream ended without a result');
           
           // Map backend response to frontend format
           const confidenceValue = parseInt(data.confidence.replace('%', '')) || 0;
@@ -309,7 +357,8 @@ const UploadPage = ({ onResult }) => {
                 historical_context: data.historical_context,
                 sources: data.sources,
                 ml_model: data.ml_model,
-                meta_analysis: data.meta_analysis
+                meta_analysis: data.meta_analysis,
+                tier: data.tier
               }
           });
       } else {
@@ -347,6 +396,7 @@ const UploadPage = ({ onResult }) => {
       setError(err.message);
     } finally {
       setLoading(false);
+      setProgress(null);
     }
   };
 
@@ -432,6 +482,29 @@ const UploadPage = ({ onResult }) => {
               </div>
             )}
 
+            {loading && progress && (
+              <div className="mt-6 border-2 border-black p-4 bg-gray-50 space-y-3">
+                {progress.local?.ml_model ? (
+                  <div className="flex flex-wrap items-center gap-4 text-xs">
+                    <span className="font-bold text-gray-500 uppercase">Local NLP Engine</span>
+                    <span className="font-black text-black">{progress.local.ml_model.label}</span>
+                    <span className="font-bold text-black">{progress.local.ml_model.confidence}%</span>
+                    <span className="font-bold text-gray-500 uppercase">
+                      Heuristic Risk +{progress.local.heuristics?.heuristic_risk_bonus ?? 0}
+                    </span>
+                  </div>
+                ) : (
+                  <p className="text-xs font-bold text-gray-400 uppercase">Running local engines...</p>
+                )}
+                <div>
+                  <span className="text-[10px] font-bold uppercase mb-1 block" style={{ color: COLORS.PRIMARY }}>AI Reasoning (live)</span>
+                  <pre className="text-xs text-gray-800 whitespace-pre-wrap max-h-40 overflow-y-auto font-mono">
+                    {progress.tokens || 'Waiting for the fact-checking engine...'}
+                  </pre>
+                </div>
+              </div>
+            )}
+
             {error && (
               <div className="mt-6 p-4 text-white font-bold text-sm flex items-center gap-3" style={{ backgroundColor: COLORS.PRIMARY }}>
                 <AlertTriangle size={20}/> {error}